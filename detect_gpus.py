@@ -4,119 +4,76 @@ GPU Detection Script for GPU Benchmark v3
 Professional GPU hardware detection and system profiling
 """
 
-import subprocess
 import sys
 import json
-import re
+import argparse
 from datetime import datetime
 
+import nvidia_smi
+import probe_cache
+import system_inventory
+from results_dir import results_path
+
 
 class GPUDetector:
-    def __init__(self):
+    def __init__(self, root='/'):
         self.gpu_info = []
         self.system_info = {}
+        self.root = root
         
-    def run_command(self, command):
-        """Run a command and return output, or None if failed"""
-        try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                return None
-        except Exception as e:
-            print(f"Error running command '{command}': {e}")
-            return None
-    
     def detect_nvidia_gpus(self):
-        """Detect NVIDIA GPUs using nvidia-smi"""
+        """Detect NVIDIA GPUs from the shared nvidia-smi snapshot"""
         print("STATUS: Detecting NVIDIA GPUs...")
         
-        # Check if nvidia-smi is available
-        nvidia_smi_output = self.run_command("nvidia-smi --query-gpu=index,name,driver_version,memory.total,power.max_limit,temperature.gpu --format=csv,noheader,nounits")
-        
-        if nvidia_smi_output:
-            lines = nvidia_smi_output.split('\n')
-            for line in lines:
-                if line.strip():
-                    parts = [part.strip() for part in line.split(',')]
-                    if len(parts) >= 6:
-                        gpu_info = {
-                            'vendor': 'NVIDIA',
-                            'index': parts[0],
-                            'name': parts[1],
-                            'driver_version': parts[2],
-                            'memory_total_mb': parts[3],
-                            'power_max_limit_w': parts[4],
-                            'temperature_c': parts[5] if parts[5] != '[Not Supported]' else 'N/A'
-                        }
-                        self.gpu_info.append(gpu_info)
-        
-        # Get additional NVIDIA GPU details
-        nvidia_details = self.run_command("nvidia-smi --query-gpu=gpu_name,compute_cap,gpu_bus_id,gpu_uuid --format=csv,noheader")
-        if nvidia_details:
-            lines = nvidia_details.split('\n')
-            for i, line in enumerate(lines):
-                if line.strip() and i < len(self.gpu_info):
-                    parts = [part.strip() for part in line.split(',')]
-                    if len(parts) >= 4:
-                        self.gpu_info[i].update({
-                            'compute_capability': parts[1],
-                            'bus_id': parts[2],
-                            'uuid': parts[3]
-                        })
+        # Numbers keep the strings nvidia-smi printed, as gpu_detection_results.json always had them
+        for gpu in nvidia_smi.get_snapshot().gpus:
+            self.gpu_info.append({
+                'vendor': 'NVIDIA',
+                'index': str(gpu.index),
+                'name': gpu.name,
+                'driver_version': gpu.driver_version,
+                'memory_total_mb': str(gpu.memory_total_mb) if gpu.memory_total_mb is not None else 'N/A',
+                'power_max_limit_w': f"{gpu.power_max_limit_w:.2f}" if gpu.power_max_limit_w is not None else 'N/A',
+                'temperature_c': str(gpu.temperature_c) if gpu.temperature_c is not None else 'N/A',
+                'compute_capability': gpu.compute_capability,
+                'bus_id': gpu.bus_id,
+                'uuid': gpu.uuid
+            })
     
     def detect_other_gpus(self):
-        """Detect other GPUs using lspci"""
-        print("STATUS: Detecting additional GPUs via lspci...")
+        """Detect other GPUs from sysfs and attach PCI details to NVIDIA GPUs"""
+        print("STATUS: Detecting additional GPUs via sysfs...")
+        
+        nvidia_by_bus_id = {nvidia_smi.normalize_bus_id(gpu['bus_id']): gpu
+                            for gpu in self.gpu_info if gpu.get('bus_id')}
         
-        lspci_output = self.run_command("lspci | grep -i 'vga\\|3d\\|display'")
-        if lspci_output:
-            lines = lspci_output.split('\n')
-            for line in lines:
-                if line.strip():
-                    # Parse lspci output
-                    parts = line.split(': ')
-                    if len(parts) >= 2:
-                        pci_id = parts[0]
-                        gpu_desc = parts[1]
-                        
-                        # Skip if already detected by nvidia-smi
-                        if any('NVIDIA' in gpu.get('name', '') for gpu in self.gpu_info):
-                            if 'NVIDIA' in gpu_desc:
-                                continue
-                        
-                        vendor = 'Unknown'
-                        if 'NVIDIA' in gpu_desc:
-                            vendor = 'NVIDIA'
-                        elif 'AMD' in gpu_desc or 'ATI' in gpu_desc:
-                            vendor = 'AMD'
-                        elif 'Intel' in gpu_desc:
-                            vendor = 'Intel'
-                        
-                        gpu_info = {
-                            'vendor': vendor,
-                            'name': gpu_desc,
-                            'pci_id': pci_id,
-                            'detection_method': 'lspci'
-                        }
-                        
-                        # Only add if not already in the list
-                        if not any(gpu.get('name') == gpu_desc for gpu in self.gpu_info):
-                            self.gpu_info.append(gpu_info)
+        for device in system_inventory.list_display_controllers(self.root, probe_cache.lookup_pci_names):
+            pci_details = {
+                'numa_node': device['numa_node'],
+                'pcie_link': device['pcie_link']
+            }
+            
+            # Already detected by nvidia-smi, only add the PCI details
+            gpu = nvidia_by_bus_id.get(device['pci_id'])
+            if gpu is not None:
+                gpu.update(pci_details)
+                continue
+            
+            gpu_info = {
+                'vendor': device['vendor'],
+                'name': device['name'],
+                'pci_id': device['pci_id'],
+                'detection_method': 'sysfs'
+            }
+            gpu_info.update(pci_details)
+            self.gpu_info.append(gpu_info)
     
     def get_system_info(self):
         """Get system information"""
         print("STATUS: Gathering system information...")
         
-        self.system_info = {
-            'hostname': self.run_command("hostname"),
-            'kernel': self.run_command("uname -r"),
-            'os': self.run_command("cat /etc/os-release | grep PRETTY_NAME | cut -d'=' -f2 | tr -d '\"'"),
-            'cpu': self.run_command("cat /proc/cpuinfo | grep 'model name' | head -1 | cut -d':' -f2 | xargs"),
-            'memory_gb': self.run_command("free -g | grep Mem | awk '{print $2}'"),
-            'detection_time': datetime.now().isoformat()
-        }
+        self.system_info = system_inventory.get_system_info(self.root)
+        self.system_info['detection_time'] = datetime.now().isoformat()
     
     def display_results(self):
         """Display detection results"""
@@ -158,11 +115,18 @@ class GPUDetector:
                 print(f"   Bus ID: {gpu['bus_id']}")
             if 'pci_id' in gpu:
                 print(f"   PCI ID: {gpu['pci_id']}")
+            if gpu.get('numa_node') is not None:
+                print(f"   NUMA Node: {gpu['numa_node']}")
+            link = gpu.get('pcie_link')
+            if link and link.get('current_gen'):
+                print(f"   PCIe Link: Gen{link['current_gen']} x{link['current_width']} "
+                      f"(max Gen{link['max_gen']} x{link['max_width']})")
         
         print(f"\nTotal GPUs Found: {len(self.gpu_info)}")
     
     def save_results(self, filename='gpu_detection_results.json'):
         """Save results to JSON file"""
+        filename = results_path(filename)
         results = {
             'system_info': self.system_info,
             'gpu_info': self.gpu_info,
@@ -191,6 +155,8 @@ class GPUDetector:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="GPU hardware detection")
+    parser.parse_args()
     detector = GPUDetector()
     gpu_info = detector.run_detection()
     
@@ -10,13 +10,14 @@ echo "======================================"
 python3 detect_gpus.py
 
 # Extract and display quick summary
-if [ -f "gpu_detection_results.json" ]; then
+RESULTS_JSON="${GPUBENCH_RESULTS_DIR:-.}/gpu_detection_results.json"
+if [ -f "$RESULTS_JSON" ]; then
     echo ""
     echo "SYSTEM SUMMARY:"
     echo "==============="
-    TOTAL_GPUS=$(python3 -c "import json; data=json.load(open('gpu_detection_results.json')); print(data['total_gpus'])" 2>/dev/null)
-    NVIDIA_GPUS=$(python3 -c "import json; data=json.load(open('gpu_detection_results.json')); print(len([g for g in data['gpu_info'] if g['vendor'] == 'NVIDIA']))" 2>/dev/null)
-    OTHER_GPUS=$(python3 -c "import json; data=json.load(open('gpu_detection_results.json')); print(len([g for g in data['gpu_info'] if g['vendor'] != 'NVIDIA']))" 2>/dev/null)
+    TOTAL_GPUS=$(python3 -c "import json; data=json.load(open('$RESULTS_JSON')); print(data['total_gpus'])" 2>/dev/null)
+    NVIDIA_GPUS=$(python3 -c "import json; data=json.load(open('$RESULTS_JSON')); print(len([g for g in data['gpu_info'] if g['vendor'] == 'NVIDIA']))" 2>/dev/null)
+    OTHER_GPUS=$(python3 -c "import json; data=json.load(open('$RESULTS_JSON')); print(len([g for g in data['gpu_info'] if g['vendor'] != 'NVIDIA']))" 2>/dev/null)
     
     echo "Total GPUs: $TOTAL_GPUS"
     echo "NVIDIA GPUs: $NVIDIA_GPUS"
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Fleet Outliers - GPU Benchmark v3
+Finds the GPUs, links and nodes that fall out of line with their peers across a fleet
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from results_dir import results_path
+from results_store import collective_key
+
+RESULTS_FILE = "fleet_outliers_results.json"
+# Robust z-score: 0.6745 * (x - median) / MAD, |z| > 3.5 is the usual outlier cut
+MAD_Z_SCALE = 0.6745
+DEFAULT_THRESHOLD = 3.5
+# Peers needed before a group's median means anything
+MIN_GROUP_SIZE = 5
+# Identical peers give MAD = 0, treat anything within 1% of the median as normal
+MAD_FLOOR_FRACTION = 0.01
+DEFAULT_TOP = 20
+
+HIGHER, LOWER = 1, -1
+
+# Telemetry of the bandwidth run: metric -> (statistic, better direction)
+TELEMETRY_METRICS = {
+    'sm_clock_mhz': ('mean', HIGHER),
+    'mem_clock_mhz': ('mean', HIGHER),
+    'temperature_c': ('max', LOWER),
+    'pcie_gen': ('max', HIGHER),
+    'pcie_width': ('max', HIGHER),
+}
+
+
+class Observations:
+    """Column store of (kind, host, entity, metric, context, model, size, value, direction)"""
+
+    def __init__(self):
+        self.columns = {name: [] for name in ('kind', 'host', 'entity', 'metric', 'context', 'model',
+                                              'size', 'value', 'direction')}
+
+    def add(self, kind, host, entity, metric, model, value, direction, context='', size=-1):
+        if value is None:
+            return
+        for name, item in (('kind', kind), ('host', host), ('entity', entity), ('metric', metric),
+                           ('context', context), ('model', model), ('size', size),
+                           ('value', value), ('direction', direction)):
+            self.columns[name].append(item)
+
+    def __len__(self):
+        return len(self.columns['value'])
+
+    def arrays(self):
+        arrays = {name: np.array(values) for name, values in self.columns.items()}
+        arrays['value'] = arrays['value'].astype(float)
+        arrays['size'] = arrays['size'].astype(np.int64)
+        arrays['direction'] = arrays['direction'].astype(np.int8)
+        return arrays
+
+
+# Loading
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _hostname(results, default):
+    detection = results.get('gpu_detection_results.json') or {}
+    return (detection.get('system_info') or {}).get('hostname') or default
+
+
+def load_hosts(paths):
+    """{host: {filename: parsed JSON}} from fleet_results.json files, fleet_<ts>/ or results_<ts>/ directories"""
+    hosts = {}
+    for path in paths:
+        if os.path.isfile(path):
+            data = _load(path) or {}
+            if 'hosts' in data:
+                for host, record in data['hosts'].items():
+                    hosts[host] = {name: doc for name, doc in (record.get('results') or {}).items() if doc}
+            elif 'results' in data:
+                hosts[data.get('host', path)] = {name: doc for name, doc in data['results'].items() if doc}
+            continue
+        names = sorted(os.listdir(path))
+        if 'fleet_results.json' in names:
+            hosts.update(load_hosts([os.path.join(path, 'fleet_results.json')]))
+        elif any(name.endswith('_results.json') for name in names):
+            results = {name: _load(os.path.join(path, name)) for name in names if name.endswith('.json')}
+            results = {name: doc for name, doc in results.items() if doc}
+            hosts[_hostname(results, os.path.basename(os.path.normpath(path)))] = results
+        else:
+            hosts.update(load_hosts([os.path.join(path, name) for name in names if name.endswith('.json')]))
+    return hosts
+
+
+def gpu_models(results):
+    """{gpu index: 'name (cc)'} from detection, falling back to the VRAM probe's names"""
+    models = {}
+    for gpu in (results.get('gpu_detection_results.json') or {}).get('gpu_info', []):
+        if gpu.get('vendor', 'NVIDIA') == 'NVIDIA' and gpu.get('index') is not None:
+            models[str(gpu['index'])] = f"{gpu.get('name')} ({gpu.get('compute_capability')})"
+    for gpu in (results.get('vram_test_results.json') or {}).get('gpus', []):
+        models.setdefault(str(gpu['id']), gpu.get('name'))
+    return models
+
+
+def node_model(models):
+    """Node signature for node-level metrics: '8x NVIDIA H100 80GB HBM3 (9.0)'"""
+    counts = {}
+    for model in models.values():
+        counts[model] = counts.get(model, 0) + 1
+    return " + ".join(f"{count}x {model}" for model, count in sorted(counts.items())) or 'unknown'
+
+
+def collect_observations(hosts):
+    """Flatten every host's results into one Observations table"""
+    observations = Observations()
+    for host, results in hosts.items():
+        models = gpu_models(results)
+        node = node_model(models)
+
+        for gpu in (results.get('vram_test_results.json') or {}).get('gpus', []):
+            observations.add('gpu', host, f"GPU{gpu['id']}", 'memory_total_mb',
+                             models.get(str(gpu['id']), gpu.get('name')), gpu.get('total_mb'), HIGHER)
+
+        bandwidth = results.get('bandwidth_test_results.json') or {}
+        for name, test in (bandwidth.get('tests') or {}).items():
+            collective = collective_key(name)
+            for row in test.get('bandwidth_data') or []:
+                observations.add('node', host, '', 'busbw_gbps', node, row.get('busbw'), HIGHER,
+                                 collective, row['size_bytes'])
+            observations.add('node', host, '', 'saturated_busbw_gbps', node,
+                             (test.get('adaptive') or {}).get('saturated_busbw'), HIGHER, collective)
+            for index, gpu in ((test.get('telemetry') or {}).get('gpus') or {}).items():
+                model = models.get(str(index), node)
+                for metric, (statistic, direction) in TELEMETRY_METRICS.items():
+                    observations.add('gpu', host, f"GPU{index}", metric, model,
+                                     (gpu.get(metric) or {}).get(statistic), direction, collective)
+                observations.add('gpu', host, f"GPU{index}", 'throttled_fraction', model,
+                                 gpu.get('throttled_fraction'), LOWER, collective)
+
+        p2p = bandwidth.get('p2p_matrix') or {}
+        indices = p2p.get('gpus', [])
+        peaks = p2p.get('peak_gbps')
+        for key, metric, direction in (('bandwidth_gbps', 'p2p_bandwidth_gbps', HIGHER),
+                                       ('latency_us', 'p2p_latency_us', LOWER)):
+            for i, row in enumerate(p2p.get(key) or []):
+                for j, value in enumerate(row):
+                    if i == j:
+                        continue
+                    # NVLink and PCIe pairs are different populations, the modelled peak tells them apart
+                    peak = peaks[i][j] if peaks else None
+                    observations.add('link', host, f"GPU{indices[i]}->GPU{indices[j]}", metric,
+                                     models.get(str(indices[i]), node), value, direction,
+                                     f"peak {peak:g} GB/s" if peak else '')
+    return observations
+
+
+# Scoring
+
+def group_median(codes, values, groups):
+    """Median of values per group code, vectorized over all groups at once"""
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    safe = np.maximum(counts, 1)
+    low = sorted_values[np.minimum(starts + (safe - 1) // 2, len(values) - 1)]
+    high = sorted_values[np.minimum(starts + safe // 2, len(values) - 1)]
+    return np.where(counts > 0, (low + high) / 2, np.nan), counts
+
+
+def robust_scores(arrays):
+    """Robust z-score of every observation within its (metric, context, model, size) group
+
+    Returns (z, badness, group codes, group keys, medians, MADs, counts);
+    badness is the z-score signed so positive means worse than peers.
+    """
+    keys = np.char.add(np.char.add(np.char.add(arrays['metric'], '|'), np.char.add(arrays['context'], '|')),
+                       np.char.add(np.char.add(arrays['model'], '|'), arrays['size'].astype(str)))
+    group_keys, codes = np.unique(keys, return_inverse=True)
+    codes = codes.ravel()
+    values = arrays['value']
+    medians, counts = group_median(codes, values, len(group_keys))
+    mads, _ = group_median(codes, np.abs(values - medians[codes]), len(group_keys))
+    scale = np.maximum(mads, MAD_FLOOR_FRACTION * np.abs(medians))
+    z = np.where(scale[codes] > 0, MAD_Z_SCALE * (values - medians[codes]) / np.where(scale[codes] > 0,
+                                                                                      scale[codes], 1.0), 0.0)
+    badness = -arrays['direction'] * z
+    return z, badness, codes, group_keys, medians, mads, counts
+
+
+def rank_entities(labels, badness, flagged):
+    """Per entity: worst badness, index of that observation and number of flagged observations"""
+    entities, codes = np.unique(labels, return_inverse=True)
+    codes = codes.ravel()
+    worst = np.full(len(entities), -np.inf)
+    np.maximum.at(worst, codes, badness)
+    flagged_counts = np.bincount(codes, weights=flagged, minlength=len(entities)).astype(int)
+    # Observation holding each entity's worst score: first one whose badness equals the maximum
+    is_worst = badness == worst[codes]
+    worst_index = np.full(len(entities), -1)
+    hits = np.flatnonzero(is_worst)
+    worst_index[codes[hits[::-1]]] = hits[::-1]
+    return entities, worst, worst_index, flagged_counts
+
+
+def analyze(hosts, threshold=DEFAULT_THRESHOLD, min_group=MIN_GROUP_SIZE, top=DEFAULT_TOP):
+    observations = collect_observations(hosts)
+    if not len(observations):
+        return None
+    arrays = observations.arrays()
+    z, badness, codes, group_keys, medians, mads, counts = robust_scores(arrays)
+    comparable = counts[codes] >= min_group
+    badness = np.where(comparable, badness, -np.inf)
+    flagged = badness >= threshold
+
+    def describe(index):
+        return {
+            'host': str(arrays['host'][index]),
+            'entity': str(arrays['entity'][index]) or None,
+            'metric': str(arrays['metric'][index]),
+            'context': str(arrays['context'][index]) or None,
+            'model': str(arrays['model'][index]),
+            'size_bytes': int(arrays['size'][index]) if arrays['size'][index] >= 0 else None,
+            'value': float(arrays['value'][index]),
+            'peer_median': round(float(medians[codes[index]]), 4),
+            'robust_z': round(float(z[index]), 2),
+            'peers': int(counts[codes[index]])
+        }
+
+    rankings = {}
+    for kind, labels in (('gpu', np.char.add(np.char.add(arrays['host'], ' '), arrays['entity'])),
+                         ('link', np.char.add(np.char.add(arrays['host'], ' '), arrays['entity'])),
+                         ('node', arrays['host'])):
+        mask = arrays['kind'] == kind if kind != 'node' else np.ones(len(badness), dtype=bool)
+        if not mask.any():
+            rankings[kind] = []
+            continue
+        selected = np.flatnonzero(mask)
+        entities, worst, worst_index, flagged_counts = rank_entities(labels[selected], badness[selected],
+                                                                     flagged[selected])
+        order = [i for i in np.argsort(-worst, kind='stable') if flagged_counts[i] > 0][:top]
+        rankings[kind] = [dict(describe(selected[worst_index[i]]), name=str(entities[i]),
+                               score=round(float(worst[i]), 2), flagged=int(flagged_counts[i]))
+                          for i in order]
+
+    small_groups = sorted({str(key) for key, count in zip(group_keys, counts) if count < min_group})
+    return {
+        'hosts': len(hosts),
+        'gpus': int(len(np.unique(np.char.add(arrays['host'][arrays['kind'] == 'gpu'],
+                                              arrays['entity'][arrays['kind'] == 'gpu'])))),
+        'observations': len(observations),
+        'groups': len(group_keys),
+        'models': sorted(set(arrays['model'].tolist())),
+        'min_group': min_group,
+        'flagged_observations': int(flagged.sum()),
+        'rankings': rankings,
+        'groups_too_small': small_groups
+    }
+
+
+def display_analysis(analysis, threshold):
+    print(f"\nRESULTS: Fleet outliers ({analysis['hosts']} hosts, {analysis['gpus']} GPUs, "
+          f"{analysis['observations']} observations in {analysis['groups']} peer groups)")
+    print(f"Models: {', '.join(analysis['models'])}")
+    for kind, title in (('node', 'NODES'), ('gpu', 'GPUS'), ('link', 'LINKS')):
+        ranking = analysis['rankings'][kind]
+        print(f"\n{title} (badness ≥ {threshold}):")
+        if not ranking:
+            print("   none")
+            continue
+        for entry in ranking:
+            where = " ".join(part for part in (entry['metric'], entry['context'],
+                                               entry['size_bytes'] and f"{entry['size_bytes']}B") if part)
+            print(f"   {entry['score']:>7.1f}  {entry['name']:<40} {entry['flagged']:>4} flagged  "
+                  f"worst {where}: {entry['value']:g} vs median {entry['peer_median']:g}")
+    if analysis['groups_too_small']:
+        print(f"\nWARNING:  {len(analysis['groups_too_small'])} peer groups have fewer than "
+              f"{analysis['min_group']} members and were not scored")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank outlier nodes, GPUs and links across fleet results")
+    parser.add_argument('paths', nargs='+',
+                        help='fleet_results.json, fleet_<timestamp>/ or results_<timestamp>/ directories')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Robust z-score beyond which a value is an outlier (default: %(default)s)')
+    parser.add_argument('--min-group', type=int, default=MIN_GROUP_SIZE,
+                        help='Peers needed to score a group (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='Entries per ranking (default: %(default)s)')
+    parser.add_argument('--output', help=f'Results file (default: {RESULTS_FILE})')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    hosts = load_hosts(args.paths)
+    if not hosts:
+        print("ERROR: Error: No host results found")
+        sys.exit(1)
+    print(f"STATUS: Loaded {len(hosts)} hosts in {time.time() - start_time:.1f}s")
+
+    analysis = analyze(hosts, args.threshold, args.min_group, args.top)
+    if analysis is None:
+        print("ERROR: Error: Results contain no comparable metrics")
+        sys.exit(1)
+    analysis['timestamp'] = datetime.now().isoformat()
+    analysis['threshold'] = args.threshold
+    analysis['analysis_seconds'] = round(time.time() - start_time, 2)
+    display_analysis(analysis, args.threshold)
+
+    output = args.output or results_path(RESULTS_FILE)
+    with open(output, 'w') as f:
+        json.dump(analysis, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
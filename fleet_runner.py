@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Fleet Runner - GPU Benchmark v3
+Runs the test suite on many hosts at once and merges their results
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+from concurrent.futures import as_completed
+from datetime import datetime
+
+from run_all_tests import STAGES
+from transport import create_transport, TRANSPORTS
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 3600
+DEFAULT_RETRIES = 1
+COLLECT_TIMEOUT = 60
+
+
+def read_hosts(path):
+    """Host names from a file, one per line, '#' starts a comment"""
+    with open(path) as f:
+        return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+
+
+def remote_results_dir(run_id, host):
+    """Per-run, per-host results directory on the remote side"""
+    # Distinct per host too, so a local stand-in transport cannot mix hosts up
+    return f"/tmp/gpubench-fleet-{run_id}-{host.replace('/', '_')}"
+
+
+def suite_command(remote_dir, results_dir, stages):
+    """Command line that runs the selected stages into results_dir on a host"""
+    skip = [stage.name for stage in STAGES if stage.name not in stages]
+    command = (f"cd {shlex.quote(remote_dir)} && python3 run_all_tests.py "
+               f"--results-dir {shlex.quote(results_dir)}")
+    if skip:
+        command += f" --skip {' '.join(skip)}"
+    return command
+
+
+def collect_results(transport, host, results_dir):
+    """Fetch every JSON artifact of a host's run, {filename: parsed JSON}"""
+    stdout, stderr, returncode = transport.run(host, f"ls {shlex.quote(results_dir)}", timeout=COLLECT_TIMEOUT)
+    if returncode != 0:
+        return {}
+    collected = {}
+    for filename in sorted(stdout.split()):
+        if not filename.endswith('.json'):
+            continue
+        text = transport.read_file(host, f"{results_dir}/{filename}", timeout=COLLECT_TIMEOUT)
+        try:
+            collected[filename] = json.loads(text) if text is not None else None
+        except ValueError:
+            collected[filename] = None
+    return collected
+
+
+def run_host(transport, host, remote_dir, results_dir, stages, timeout, retries):
+    """Run the suite on one host, retrying failures and timeouts, then collect its results"""
+    start_time = time.time()
+    attempts = []
+    for attempt in range(retries + 1):
+        attempt_start = time.time()
+        stdout, stderr, returncode = transport.run(host, suite_command(remote_dir, results_dir, stages),
+                                                   timeout=timeout)
+        timed_out = returncode == -1 and stderr == "Timed out"
+        attempts.append({
+            'returncode': returncode,
+            'timed_out': timed_out,
+            'duration_seconds': round(time.time() - attempt_start, 2),
+            'error': None if returncode == 0 else (stderr or '').strip()[-500:] or None
+        })
+        if timed_out:
+            # The local ssh was killed, the remote suite may still be running
+            transport.run(host, f"pkill -f {shlex.quote('run_all_tests.py --results-dir ' + results_dir)}",
+                          timeout=COLLECT_TIMEOUT)
+        # The suite exits 1 when some stage failed but still leaves results behind
+        if returncode in (0, 1):
+            break
+
+    last = attempts[-1]
+    results = collect_results(transport, host, results_dir) if not last['timed_out'] else {}
+    if last['returncode'] == 0:
+        status = 'ok'
+    elif last['returncode'] == 1 and results:
+        status = 'partial'
+    elif last['timed_out']:
+        status = 'timeout'
+    else:
+        status = 'failed'
+    return {
+        'host': host,
+        'status': status,
+        'attempts': attempts,
+        'duration_seconds': round(time.time() - start_time, 2),
+        'remote_results_dir': results_dir,
+        'results': results
+    }
+
+
+def run_fleet(hosts, stages, transport, remote_dir=SCRIPT_DIR, output_dir=None,
+              timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """Run every host through the transport's pool and stream each result to disk as it lands"""
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_dir = output_dir or f"fleet_{run_id}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"STATUS: Running {', '.join(stages)} on {len(hosts)} hosts "
+          f"({transport.max_workers} at a time, {timeout}s timeout, {retries} retries)")
+    start_time = time.time()
+    futures = {transport.submit_call(run_host, transport, host, remote_dir, remote_results_dir(run_id, host),
+                                     stages, timeout, retries): host
+               for host in hosts}
+    fleet = {}
+    for done, future in enumerate(as_completed(futures), 1):
+        host = futures[future]
+        try:
+            record = future.result()
+        except Exception as e:
+            record = {'host': host, 'status': 'failed', 'attempts': [], 'error': str(e), 'results': {}}
+        fleet[host] = record
+        with open(os.path.join(output_dir, f"{host}.json"), 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"[{done}/{len(hosts)}] {host}: {record['status']} "
+              f"({len(record['attempts'])} attempt(s), {record.get('duration_seconds', 0):.1f}s)")
+
+    statuses = [record['status'] for record in fleet.values()]
+    merged = {
+        'timestamp': datetime.now().isoformat(),
+        'run_id': run_id,
+        'stages': stages,
+        'total_seconds': round(time.time() - start_time, 2),
+        'summary': {status: statuses.count(status) for status in ('ok', 'partial', 'timeout', 'failed')},
+        'hosts': {host: fleet[host] for host in hosts}
+    }
+    output = os.path.join(output_dir, 'fleet_results.json')
+    with open(output, 'w') as f:
+        json.dump(merged, f, indent=2)
+    print(f"\nRESULTS: {merged['summary']['ok']} ok, {merged['summary']['partial']} partial, "
+          f"{merged['summary']['timeout']} timed out, {merged['summary']['failed']} failed "
+          f"in {merged['total_seconds']:.1f}s")
+    print(f"RESULTS: Fleet results saved to: {output}")
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the test suite across a fleet of hosts")
+    parser.add_argument('hosts', nargs='*', help='Hostnames or IP addresses')
+    parser.add_argument('--hosts-file', help='File with one host per line')
+    parser.add_argument('--stages', nargs='+', choices=[stage.name for stage in STAGES],
+                        default=[stage.name for stage in STAGES], metavar='STAGE',
+                        help='Stages to run on every host (default: all)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Hosts in flight at once (default: %(default)s)')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help='Seconds before a host attempt is abandoned (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='Extra attempts for hosts that fail or time out (default: %(default)s)')
+    parser.add_argument('--remote-dir', default=SCRIPT_DIR,
+                        help='Benchmark checkout on the hosts (default: this checkout\'s path)')
+    parser.add_argument('--output-dir', help='Where to write results (default: fleet_<timestamp>)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='ssh',
+                        help='How commands reach the hosts (default: %(default)s)')
+    parser.add_argument('--ssh-command', help='ssh client command line, e.g. to add options or a stand-in')
+    args = parser.parse_args()
+
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        hosts += read_hosts(args.hosts_file)
+    if not hosts:
+        print("ERROR: No hosts given")
+        sys.exit(1)
+
+    concurrency = max(1, args.concurrency)
+    options = {'max_workers': concurrency}
+    if args.ssh_command and args.transport != 'local':
+        options['ssh_command'] = args.ssh_command
+    with create_transport(args.transport, **options) as transport:
+        merged = run_fleet(hosts, args.stages, transport, args.remote_dir, args.output_dir,
+                           args.timeout, max(0, args.retries))
+    sys.exit(0 if merged['summary']['ok'] == len(hosts) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+GPU Telemetry Sampler - GPU Benchmark v3
+Streams nvidia-smi samples in the background and summarizes benchmark phases
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from functools import partial
+from collections import deque
+from datetime import datetime
+
+import probe_cache
+
+DEFAULT_INTERVAL_MS = 500
+DEFAULT_CAPACITY = 100000
+PROBE_TIMEOUT = 30
+
+# (nvidia-smi query field, sample key, converter); a tuple of fields lists
+# names a newer driver renamed, the first one nvidia-smi accepts is queried
+TELEMETRY_FIELDS = [
+    ('index', 'index', int),
+    ('clocks.sm', 'sm_clock_mhz', float),
+    ('clocks.mem', 'mem_clock_mhz', float),
+    ('power.draw', 'power_w', float),
+    ('temperature.gpu', 'temperature_c', float),
+    ('utilization.gpu', 'utilization_percent', float),
+    ('memory.used', 'memory_used_mb', float),
+    (('clocks_event_reasons.active', 'clocks_throttle_reasons.active'), 'throttle_reasons', lambda v: int(v, 16)),
+    # Links drop generation when idle, so the width/gen under load is what counts
+    ('pcie.link.gen.current', 'pcie_gen', float),
+    ('pcie.link.width.current', 'pcie_width', float),
+]
+# --query-gpu has no PCIe throughput counters, dmon's "t" group does (MB/s)
+DMON_COLUMNS = {'rxpci': 'pcie_rx_mbps', 'txpci': 'pcie_tx_mbps'}
+NUMERIC_METRICS = ['sm_clock_mhz', 'mem_clock_mhz', 'power_w', 'temperature_c',
+                   'utilization_percent', 'memory_used_mb', 'pcie_rx_mbps', 'pcie_tx_mbps',
+                   'pcie_gen', 'pcie_width']
+
+THROTTLE_REASONS = {
+    0x1: 'GpuIdle',
+    0x2: 'ApplicationsClocksSetting',
+    0x4: 'SwPowerCap',
+    0x8: 'HwSlowdown',
+    0x10: 'SyncBoost',
+    0x20: 'SwThermalSlowdown',
+    0x40: 'HwThermalSlowdown',
+    0x80: 'HwPowerBrakeSlowdown',
+    0x100: 'DisplayClockSetting'
+}
+# Reasons that mean the GPU was actually held back while busy
+SLOWDOWN_MASK = 0x4 | 0x8 | 0x20 | 0x40 | 0x80
+
+
+def decode_throttle_reasons(mask):
+    """Bitmask -> list of reason names"""
+    return [name for bit, name in THROTTLE_REASONS.items() if mask & bit]
+
+
+def field_aliases(field):
+    return field if isinstance(field, tuple) else (field,)
+
+
+def default_fields():
+    """TELEMETRY_FIELDS with each field under its current name"""
+    return [(field_aliases(field)[0], key, convert) for field, key, convert in TELEMETRY_FIELDS]
+
+
+def supported_fields(executable='nvidia-smi'):
+    """TELEMETRY_FIELDS resolved to names this nvidia-smi accepts, unsupported fields dropped
+
+    nvidia-smi rejects the whole query if a single field is unknown, so
+    when the full set fails each field is tried on its own.
+    """
+    def accepted(names):
+        try:
+            result = subprocess.run([executable, f"--query-gpu={','.join(names)}", '--format=csv,noheader'],
+                                    capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    fields = default_fields()
+    if accepted([name for name, _, _ in fields]):
+        return fields
+    resolved = []
+    for field, key, convert in TELEMETRY_FIELDS:
+        name = next((name for name in field_aliases(field) if accepted([name])), None)
+        if name is not None:
+            resolved.append((name, key, convert))
+    return resolved
+
+
+def resolve_fields():
+    """supported_fields() for the installed nvidia-smi, probed once per boot and driver"""
+    converters = {key: convert for _, key, convert in TELEMETRY_FIELDS}
+    names = probe_cache.cached('telemetry_fields',
+                               lambda: [[name, key] for name, key, _ in supported_fields()] or None)
+    return [(name, key, converters[key]) for name, key in names or [] if key in converters]
+
+
+def query_command(interval_ms, executable='nvidia-smi', fields=None):
+    fields = ','.join(field for field, _, _ in fields or default_fields())
+    return [executable, f'--query-gpu={fields}', '--format=csv,noheader,nounits',
+            f'--loop-ms={interval_ms}']
+
+
+def dmon_command(interval_ms, executable='nvidia-smi'):
+    # dmon cannot sample faster than once a second
+    return [executable, 'dmon', '-s', 't', '-d', str(max(1, round(interval_ms / 1000)))]
+
+
+def parse_query_line(line, fields=None):
+    """Parse one --query-gpu line of the given fields into a sample dict, None if malformed"""
+    fields = fields or default_fields()
+    parts = [part.strip() for part in line.split(',')]
+    if len(parts) != len(fields):
+        return None
+    sample = {}
+    for (_, key, convert), part in zip(fields, parts):
+        try:
+            sample[key] = convert(part)
+        except ValueError:
+            sample[key] = None
+    return sample if sample['index'] is not None else None
+
+
+class DmonParser:
+    """Stateful parser for nvidia-smi dmon output, columns come from its header"""
+
+    def __init__(self):
+        self.columns = None
+
+    def __call__(self, line):
+        parts = line.split()
+        if not parts:
+            return None
+        if parts[0] == '#':
+            parts = parts[1:]
+        elif parts[0].startswith('#'):
+            parts[0] = parts[0][1:]
+        else:
+            if not self.columns or len(parts) != len(self.columns):
+                return None
+            values = dict(zip(self.columns, parts))
+            try:
+                sample = {'index': int(values['gpu'])}
+            except (KeyError, ValueError):
+                return None
+            for column, key in DMON_COLUMNS.items():
+                try:
+                    sample[key] = float(values[column])
+                except (KeyError, ValueError):
+                    sample[key] = None
+            return sample
+        # Header lines: the first names the columns, the second gives units
+        if parts and parts[0] == 'gpu':
+            self.columns = parts
+        return None
+
+
+class TelemetrySampler:
+    """Background nvidia-smi sampler with a bounded ring buffer
+
+    One long-lived `nvidia-smi --query-gpu ... --loop-ms` process is read
+    line by line on a daemon thread, plus an optional `nvidia-smi dmon -s t`
+    stream for PCIe RX/TX. Samples are stamped with time.monotonic() on
+    arrival, so any [start, end) window can be summarized afterwards.
+    The query fields are those the installed nvidia-smi accepts. The
+    commands can be replaced, e.g. with a scripted fake nvidia-smi, which
+    is then expected to print the default fields.
+    """
+
+    def __init__(self, interval_ms=DEFAULT_INTERVAL_MS, capacity=DEFAULT_CAPACITY,
+                 command=None, pcie_command=None, pcie=True):
+        self.interval_ms = interval_ms
+        self.buffer = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.command = command
+        self.pcie_command = (pcie_command or dmon_command(interval_ms)) if pcie else None
+        self.processes = []
+        self.threads = []
+        self.counts = []
+
+    def start(self):
+        """Start sampling, returns False if the main stream cannot be started"""
+        if self.command is None:
+            fields = resolve_fields()
+            if not any(key == 'index' for _, key, _ in fields):
+                return False
+            command = query_command(self.interval_ms, fields=fields)
+        else:
+            fields = default_fields()
+            command = self.command
+        streams = [(command, partial(parse_query_line, fields=fields))]
+        if self.pcie_command:
+            streams.append((self.pcie_command, DmonParser()))
+        for i, (command, parser) in enumerate(streams):
+            try:
+                # The main stream's stderr explains an empty run, dmon's is not needed
+                process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE if i == 0 else subprocess.DEVNULL,
+                                           text=True, bufsize=1)
+            except OSError:
+                if i == 0:
+                    return False
+                continue
+            self.counts.append(0)
+            thread = threading.Thread(target=self._reader, args=(process, parser, len(self.counts) - 1),
+                                      daemon=True)
+            thread.start()
+            self.processes.append(process)
+            self.threads.append(thread)
+        return True
+
+    def stop(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        if self.processes and not self.counts[0]:
+            main = self.processes[0]
+            error = main.stderr.read().strip() if main.stderr else ''
+            print(f"WARNING:  GPU telemetry recorded no samples (nvidia-smi exit code {main.returncode}"
+                  + (f": {error.splitlines()[-1]}" if error else "") + ")")
+        for process in self.processes:
+            if process.stderr:
+                process.stderr.close()
+        self.processes = []
+        self.threads = []
+        self.counts = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _reader(self, process, parser, stream):
+        for line in process.stdout:
+            sample = parser(line)
+            if sample is not None:
+                sample['t'] = time.monotonic()
+                with self.lock:
+                    self.buffer.append(sample)
+                    self.counts[stream] += 1
+
+    def samples(self, start=None, end=None):
+        """Samples received in the monotonic window [start, end)"""
+        with self.lock:
+            samples = list(self.buffer)
+        return [s for s in samples
+                if (start is None or s['t'] >= start) and (end is None or s['t'] < end)]
+
+    def summarize(self, start=None, end=None):
+        """Per-GPU min/mean/max of each metric plus throttle activity"""
+        per_gpu = {}
+        for sample in self.samples(start, end):
+            per_gpu.setdefault(sample['index'], []).append(sample)
+
+        summary = {}
+        for index, samples in sorted(per_gpu.items()):
+            gpu = {}
+            for metric in NUMERIC_METRICS:
+                values = [s[metric] for s in samples if s.get(metric) is not None]
+                if values:
+                    gpu[metric] = {
+                        'min': round(min(values), 2),
+                        'mean': round(sum(values) / len(values), 2),
+                        'max': round(max(values), 2)
+                    }
+            masks = [s['throttle_reasons'] for s in samples if s.get('throttle_reasons') is not None]
+            if masks:
+                combined = 0
+                for mask in masks:
+                    combined |= mask
+                gpu['throttle_reasons'] = decode_throttle_reasons(combined)
+                gpu['throttled_fraction'] = round(sum(1 for m in masks if m & SLOWDOWN_MASK) / len(masks), 3)
+            gpu['samples'] = sum(1 for s in samples if 'sm_clock_mhz' in s)
+            summary[str(index)] = gpu
+        return summary
+
+    def phase(self, name):
+        return TelemetryPhase(self, name)
+
+
+class TelemetryPhase:
+    """Context manager that summarizes the samples taken while it was active"""
+
+    def __init__(self, sampler, name):
+        self.sampler = sampler
+        self.name = name
+        self.summary = None
+
+    def __enter__(self):
+        self.started_at = datetime.now().isoformat()
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.monotonic()
+        self.summary = {
+            'phase': self.name,
+            'start': self.started_at,
+            'duration_seconds': round(end - self.start, 3),
+            'interval_ms': self.sampler.interval_ms,
+            'gpus': self.sampler.summarize(self.start, end)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample GPU telemetry for a fixed duration")
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to sample (default: %(default)s)')
+    parser.add_argument('--interval-ms', type=int, default=DEFAULT_INTERVAL_MS,
+                        help='Sampling interval in ms (default: %(default)s)')
+    parser.add_argument('--no-pcie', action='store_true', help='Skip the dmon PCIe RX/TX stream')
+    args = parser.parse_args()
+
+    sampler = TelemetrySampler(args.interval_ms, pcie=not args.no_pcie)
+    if not sampler.start():
+        print("ERROR: nvidia-smi not available")
+        sys.exit(1)
+    try:
+        with sampler.phase('sample') as phase:
+            time.sleep(args.duration)
+    finally:
+        sampler.stop()
+    print(json.dumps(phase.summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+GPU Topology Analysis - GPU Benchmark v3
+Parses the `nvidia-smi topo -m` matrix into a graph model and recommends
+NCCL ring orderings, GPU subsets and data-loader NUMA placement
+"""
+
+import re
+import sys
+import json
+import argparse
+import itertools
+from math import comb
+from datetime import datetime
+
+import nvidia_smi
+from results_dir import results_path
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+# Link types that place two GPUs behind a shared PCIe switch; PHB pairs meet at
+# the CPU host bridge, which does not serialize them the way a switch uplink does
+SHARED_BRIDGE_LINKS = {'PIX', 'PXB'}
+# Closeness of PCIe paths, higher is better; NV# links rank above all of them
+PCIE_LINK_RANK = {'SYS': 1, 'NODE': 2, 'PHB': 3, 'PXB': 4, 'PIX': 5}
+NVLINK_BASE_RANK = 10
+# Largest ring searched exhaustively, bigger ones use greedy + 2-opt
+EXACT_RING_LIMIT = 8
+# Largest number of k-subsets enumerated, beyond that subsets are grown greedily
+EXACT_SUBSET_LIMIT = 20000
+RESULTS_FILE = 'gpu_topology_results.json'
+
+
+class GPUTopology:
+    """Device-to-device link matrix plus CPU/NUMA affinity per GPU"""
+
+    def __init__(self, devices, links, cpu_affinity=None, numa_affinity=None):
+        self.devices = devices
+        self.gpus = [device for device in devices if device.startswith('GPU')]
+        self.links = links
+        self.cpu_affinity = cpu_affinity or {}
+        self.numa_affinity = numa_affinity or {}
+
+    def link(self, a, b):
+        """Link type between two devices, e.g. 'NV4', 'PIX' or 'SYS'"""
+        return self.links.get((a, b))
+
+    def rank(self, a, b):
+        """Closeness of two devices, NV# by link count above any PCIe path"""
+        return link_rank(self.link(a, b))
+
+    def graph(self):
+        """Adjacency view: GPU -> {peer GPU: link type}"""
+        return {a: {b: self.link(a, b) for b in self.gpus if b != a} for a in self.gpus}
+
+    def nvlink_pairs(self):
+        return [(a, b) for i, a in enumerate(self.gpus) for b in self.gpus[i + 1:]
+                if (self.link(a, b) or '').startswith('NV')]
+
+    def ring_score(self, order):
+        """(bottleneck rank, total rank) of a ring, compared as a tuple"""
+        ranks = [self.rank(a, b) for a, b in zip(order, order[1:] + order[:1])]
+        return min(ranks), sum(ranks)
+
+    def best_ring(self, gpus=None):
+        """GPU ordering whose slowest hop is best, ties broken by total closeness
+
+        NCCL ring bandwidth is set by the slowest hop, so this is the order
+        to hand NCCL (e.g. via CUDA_VISIBLE_DEVICES) when it cannot see the
+        topology itself.
+        """
+        gpus = list(gpus or self.gpus)
+        if len(gpus) < 3:
+            return gpus
+        if len(gpus) <= EXACT_RING_LIMIT:
+            # Fix the first GPU, rotations of a ring are the same ring
+            first, rest = gpus[0], gpus[1:]
+            return max(([first] + list(perm) for perm in itertools.permutations(rest)),
+                       key=self.ring_score)
+        return self._improve_ring(self._greedy_ring(gpus))
+
+    def _greedy_ring(self, gpus):
+        best = None
+        for start in gpus:
+            order, remaining = [start], set(gpus) - {start}
+            while remaining:
+                order.append(max(sorted(remaining, key=gpus.index), key=lambda gpu: self.rank(order[-1], gpu)))
+                remaining.discard(order[-1])
+            if best is None or self.ring_score(order) > self.ring_score(best):
+                best = order
+        return best
+
+    def _improve_ring(self, order):
+        """2-opt: reverse segments while that improves the ring score"""
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(order) - 1):
+                for j in range(i + 1, len(order)):
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    if self.ring_score(candidate) > self.ring_score(order):
+                        order, improved = candidate, True
+        return order
+
+    def subset_score(self, gpus):
+        """(worst pairwise rank, total pairwise rank, -NUMA nodes spanned)"""
+        ranks = [self.rank(a, b) for i, a in enumerate(gpus) for b in gpus[i + 1:]] or [0]
+        return min(ranks), sum(ranks), -len({self.numa_affinity.get(gpu) for gpu in gpus})
+
+    def best_subsets(self, k, count=3):
+        """The count best k-GPU sets for jobs that do not use the whole box"""
+        if not 0 < k <= len(self.gpus):
+            return []
+        if comb(len(self.gpus), k) <= EXACT_SUBSET_LIMIT:
+            candidates = [list(c) for c in itertools.combinations(self.gpus, k)]
+        else:
+            # Grow a set from each seed, adding the GPU that keeps the set tightest
+            candidates = []
+            for seed in self.gpus:
+                subset = [seed]
+                while len(subset) < k:
+                    subset.append(max((gpu for gpu in self.gpus if gpu not in subset),
+                                      key=lambda gpu: self.subset_score(subset + [gpu])))
+                candidates.append(sorted(subset, key=self.gpus.index))
+        ranked = []
+        for subset in sorted(candidates, key=self.subset_score, reverse=True):
+            if subset not in ranked:
+                ranked.append(subset)
+            if len(ranked) == count:
+                break
+        return ranked
+
+    def loader_numa(self, gpus=None):
+        """NUMA node (and its CPU list) to pin data-loader workers to for a GPU set
+
+        Picks the node local to most of the GPUs; 'split' is set when the
+        GPUs span several nodes and per-GPU pinning would be better.
+        """
+        gpus = list(gpus or self.gpus)
+        nodes = [self.numa_affinity[gpu] for gpu in gpus if gpu in self.numa_affinity]
+        if not nodes:
+            return None
+        node = max(sorted(set(nodes)), key=nodes.count)
+        cpus = next((self.cpu_affinity[gpu] for gpu in gpus
+                     if self.numa_affinity.get(gpu) == node and gpu in self.cpu_affinity), None)
+        return {'numa_node': node, 'cpu_affinity': cpus, 'split': len(set(nodes)) > 1}
+
+    def switch_groups(self):
+        """GPU name -> group id, GPUs sharing a PCIe switch share an id"""
+        parent = {gpu: gpu for gpu in self.gpus}
+
+        def find(gpu):
+            while parent[gpu] != gpu:
+                parent[gpu] = parent[parent[gpu]]
+                gpu = parent[gpu]
+            return gpu
+
+        for a in self.gpus:
+            for b in self.gpus:
+                if a < b and self.link(a, b) in SHARED_BRIDGE_LINKS:
+                    parent[find(a)] = find(b)
+        roots = {}
+        return {gpu: roots.setdefault(find(gpu), len(roots)) for gpu in self.gpus}
+
+
+def link_rank(link):
+    """Rank a topo -m link type, 0 if unknown"""
+    if link and link.startswith('NV'):
+        try:
+            return NVLINK_BASE_RANK + int(link[2:])
+        except ValueError:
+            return NVLINK_BASE_RANK
+    return PCIE_LINK_RANK.get(link, 0)
+
+
+def parse_topology(text):
+    """Parse `nvidia-smi topo -m` output
+
+    Header and rows are tab separated. Affinity columns are matched to the
+    non-empty trailing fields, since drivers emit an extra empty field
+    before 'GPU NUMA ID'.
+    """
+    lines = [ANSI_ESCAPE.sub('', line) for line in text.splitlines()]
+    header = None
+    devices = []
+    extra_columns = []
+    links = {}
+    cpu_affinity = {}
+    numa_affinity = {}
+
+    for line in lines:
+        fields = [field.strip() for field in line.split('\t')]
+        if header is None:
+            if 'GPU0' in fields:
+                header = [field for field in fields if field]
+                devices = [name for name in header if re.fullmatch(r'(GPU|NIC)\d+', name)]
+                extra_columns = [name for name in header if name not in devices]
+            continue
+        if fields[0] not in devices:
+            if line.startswith('Legend'):
+                break
+            continue
+
+        row = fields[0]
+        values = fields[1:1 + len(devices)]
+        for column, value in zip(devices, values):
+            if value != 'X':
+                links[(row, column)] = value
+        trailing = [value for value in fields[1 + len(devices):] if value]
+        extras = dict(zip(extra_columns, trailing))
+        if 'CPU Affinity' in extras:
+            cpu_affinity[row] = extras['CPU Affinity']
+        numa = extras.get('NUMA Affinity')
+        if numa not in (None, 'N/A'):
+            try:
+                numa_affinity[row] = int(numa)
+            except ValueError:
+                pass
+
+    return GPUTopology(devices, links, cpu_affinity, numa_affinity)
+
+
+def load_topology():
+    """Parse the topology from the shared nvidia-smi collector, None if unavailable"""
+    text = nvidia_smi.get_topology_text()
+    if not text:
+        return None
+    topology = parse_topology(text)
+    return topology if topology.gpus else None
+
+
+def describe_ring(topology, order):
+    bottleneck = min((topology.link(a, b) for a, b in zip(order, order[1:] + order[:1])),
+                     key=link_rank) if len(order) > 1 else None
+    return {'order': order, 'bottleneck_link': bottleneck,
+            'cuda_visible_devices': ','.join(gpu[3:] for gpu in order)}
+
+
+def analyze_topology(topology, raw_text=None):
+    """Graph model plus placement recommendations as a results dict"""
+    link_counts = {}
+    for (a, b), link in topology.links.items():
+        if a in topology.gpus and b in topology.gpus and a < b:
+            link_counts[link] = link_counts.get(link, 0) + 1
+
+    subsets = {}
+    for k in range(2, len(topology.gpus)):
+        subsets[str(k)] = [dict(describe_ring(topology, topology.best_ring(subset)),
+                                gpus=subset,
+                                worst_pair_link=min((topology.link(a, b) for i, a in enumerate(subset)
+                                                     for b in subset[i + 1:]), key=link_rank),
+                                data_loader=topology.loader_numa(subset))
+                           for subset in topology.best_subsets(k)]
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'gpu_count': len(topology.gpus),
+        'gpus': topology.gpus,
+        'nics': [device for device in topology.devices if device.startswith('NIC')],
+        'links': topology.graph(),
+        'connection_counts': link_counts,
+        'nvlink_connections': len(topology.nvlink_pairs()),
+        'cpu_affinity': topology.cpu_affinity,
+        'numa_affinity': topology.numa_affinity,
+        'switch_groups': topology.switch_groups(),
+        'recommendations': {
+            'nccl_ring': describe_ring(topology, topology.best_ring()),
+            'subsets': subsets,
+            'data_loader': topology.loader_numa(),
+            'data_loader_per_gpu': {gpu: topology.numa_affinity.get(gpu) for gpu in topology.gpus}
+        },
+        'raw_topology': raw_text
+    }
+
+
+def display_analysis(analysis):
+    recommendations = analysis['recommendations']
+    print(f"GPUs: {analysis['gpu_count']}")
+    print(f"Connections: {', '.join(f'{link} x{count}' for link, count in sorted(analysis['connection_counts'].items()))}")
+    print(f"NVLink pairs: {analysis['nvlink_connections']}")
+    ring = recommendations['nccl_ring']
+    print(f"\nBest NCCL ring: {' -> '.join(ring['order'])} (slowest hop: {ring['bottleneck_link']})")
+    print(f"   CUDA_VISIBLE_DEVICES={ring['cuda_visible_devices']}")
+    print("\nBest GPU subsets:")
+    for k, subsets in recommendations['subsets'].items():
+        if subsets:
+            best = subsets[0]
+            numa = best['data_loader']['numa_node'] if best['data_loader'] else 'N/A'
+            print(f"   {k} GPUs: {','.join(best['gpus'])} (worst pair: {best['worst_pair_link']}, NUMA node: {numa})")
+    loader = recommendations['data_loader']
+    if loader:
+        print(f"\nData loader NUMA node: {loader['numa_node']} (CPUs {loader['cpu_affinity']})"
+              f"{' - GPUs span several nodes, pin per GPU' if loader['split'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze nvidia-smi topo -m output")
+    parser.add_argument('file', nargs='?', help='Captured topo -m output (default: run nvidia-smi)')
+    parser.add_argument('--output', help=f'Results file (default: {RESULTS_FILE} in the results directory)')
+    parser.add_argument('--json', action='store_true', help='Print the analysis as JSON instead of a summary')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            text = f.read()
+    else:
+        text = nvidia_smi.get_topology_text()
+    topology = parse_topology(text) if text else None
+    if topology is None or not topology.gpus:
+        print("ERROR: No GPU topology available")
+        sys.exit(1)
+
+    analysis = analyze_topology(topology, text)
+    if args.json:
+        print(json.dumps(analysis, indent=2))
+    else:
+        display_analysis(analysis)
+    output = args.output or results_path(RESULTS_FILE)
+    with open(output, 'w') as f:
+        json.dump(analysis, f, indent=2)
+    if not args.json:
+        print(f"\nResults saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+gpubench - GPU Benchmark v3
+Single entry point for every tool; a subcommand imports only its own module
+"""
+
+import sys
+import importlib
+
+# subcommand: (module, entry point, description)
+COMMANDS = {
+    'detect': ('detect_gpus', 'main', 'GPU hardware detection'),
+    'cuda': ('test_cuda_version', 'main', 'CUDA, driver and NVCC versions'),
+    'vram': ('test_vram_capacity', 'main', 'VRAM capacity and usage'),
+    'bandwidth': ('test_bandwidth', 'main', 'NCCL PCIe/NVLink bandwidth'),
+    'topology': ('gpu_topology', 'main', 'GPU link graph and placement'),
+    'links': ('link_model', 'main', 'Theoretical per-link peaks'),
+    'telemetry': ('gpu_telemetry', 'main', 'nvidia-smi telemetry sampler'),
+    'network': ('test_network_bandwidth', 'main', 'Cluster iperf3/netbench matrix'),
+    'netbench': ('netbench', 'main', 'Built-in TCP throughput/RTT engine'),
+    'disk': ('test_disk_read_speed', 'main', 'Cache-cold read throughput and mount survey'),
+    'small-files': ('test_small_files', 'main', 'Small-file metadata rates'),
+    'dataloader': ('test_dataloader', 'main', 'Data loader throughput'),
+    'checkpoint': ('test_checkpoint', 'main', 'Parallel checkpoint write/read-back'),
+    'memory': ('test_memory_bandwidth', 'main', 'Host DRAM STREAM bandwidth'),
+    'inventory': ('system_inventory', 'main', 'Host, NUMA and PCI inventory'),
+    'nvidia-smi': ('nvidia_smi', 'main', 'nvidia-smi snapshot and fixture capture'),
+    'facts': ('probe_cache', 'main', 'Cached static facts (driver, CUDA, NVCC, OS)'),
+    'run': ('run_all_tests', 'main', 'Whole test suite into results_<timestamp>/'),
+    'fleet': ('fleet_runner', 'main', 'Run stages on many hosts'),
+    'store': ('results_store', 'main', 'SQLite run history'),
+    'regress': ('regression_check', 'main', 'Compare a run with a baseline'),
+    'outliers': ('fleet_outliers', 'main', 'Rank outlier nodes, GPUs and links'),
+}
+
+
+def usage():
+    lines = ["usage: gpubench [--refresh] COMMAND [ARGS ...]", "",
+             "  --refresh     probe static facts again instead of using the boot-scoped cache", "",
+             "commands:"]
+    lines += [f"  {name:<13} {description}" for name, (_, _, description) in COMMANDS.items()]
+    lines += ["", "Run `gpubench COMMAND --help` for a command's options."]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    refresh = False
+    while args and args[0].startswith('-'):
+        option = args.pop(0)
+        if option in ('-h', '--help'):
+            print(usage())
+            return 0
+        if option != '--refresh':
+            print(f"ERROR: Error: unknown option {option}\n\n{usage()}", file=sys.stderr)
+            return 2
+        refresh = True
+
+    if not args:
+        print(usage(), file=sys.stderr)
+        return 2
+    command = args.pop(0)
+    if command not in COMMANDS:
+        print(f"ERROR: Error: unknown command {command}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    if refresh:
+        import probe_cache
+        probe_cache.clear()
+
+    module_name, entry, _ = COMMANDS[command]
+    # argparse in the tool reads sys.argv and shows `gpubench COMMAND` as its program name
+    sys.argv = [f"gpubench {command}"] + args
+    getattr(importlib.import_module(module_name), entry)()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Link Peak Model - GPU Benchmark v3
+Theoretical per-direction GPU link bandwidth and efficiency of measured results
+"""
+
+import sys
+import json
+import argparse
+
+# Usable GB/s per lane per direction after line encoding (8b/10b to Gen2, 128b/130b Gen3-5, FLIT Gen6)
+PCIE_GBPS_PER_LANE = {1: 0.25, 2: 0.5, 3: 0.985, 4: 1.969, 5: 3.938, 6: 7.563}
+# compute capability -> (NVLink generation, GB/s per link per direction)
+NVLINK_BY_COMPUTE_CAPABILITY = {
+    '6.0': (1, 20.0),      # P100
+    '7.0': (2, 25.0),      # V100
+    '8.0': (3, 25.0),      # A100
+    '8.6': (3, 14.0625),   # GA102 bridge (RTX A6000, A40)
+    '9.0': (4, 25.0),      # H100/H200
+    '10.0': (5, 50.0)      # B200
+}
+# Efficiency below this is worth a look
+LOW_EFFICIENCY_PERCENT = 60.0
+
+
+def pcie_peak_gbps(gen, width):
+    """Per-direction PCIe bandwidth in GB/s, None if gen or width is unknown"""
+    if gen not in PCIE_GBPS_PER_LANE or not width:
+        return None
+    return round(PCIE_GBPS_PER_LANE[gen] * width, 2)
+
+
+def nvlink_peak_gbps(link_count, compute_capability):
+    """Per-direction NVLink bandwidth of a bonded set of links"""
+    generation = NVLINK_BY_COMPUTE_CAPABILITY.get(compute_capability)
+    if generation is None or not link_count:
+        return None
+    return round(generation[1] * link_count, 2)
+
+
+def efficiency_percent(measured, peak):
+    if measured is None or not peak:
+        return None
+    return round(measured / peak * 100, 1)
+
+
+def loaded_pcie_link(results, index):
+    """Highest PCIe gen/width seen in telemetry while tests ran, (None, None) if not sampled
+
+    GPUs drop their link generation when idle to save power, so the idle
+    snapshot alone cannot tell a downtrained link from a resting one.
+    """
+    gen = width = None
+    phases = [test.get('telemetry') for test in results.get('tests', {}).values()]
+    phases.append((results.get('p2p_matrix') or {}).get('telemetry'))
+    for phase in phases:
+        gpu = ((phase or {}).get('gpus') or {}).get(str(index), {})
+        if 'pcie_gen' in gpu:
+            gen = max(gen or 0, int(gpu['pcie_gen']['max']))
+        if 'pcie_width' in gpu:
+            width = max(width or 0, int(gpu['pcie_width']['max']))
+    return gen, width
+
+
+def gpu_links(gpus, results=None):
+    """Per-GPU PCIe peaks (current and max) and downtraining flags"""
+    links = {}
+    for gpu in gpus:
+        gen, width = loaded_pcie_link(results or {}, gpu.index)
+        under_load = gen is not None
+        gen = gen if under_load else gpu.pcie_gen_current
+        width = width or gpu.pcie_width_current
+        flags = []
+        if gen and gpu.pcie_gen_max and gen < gpu.pcie_gen_max:
+            flags.append(f"gen {gen} of {gpu.pcie_gen_max}" + ("" if under_load else " (idle, may be power saving)"))
+        if width and gpu.pcie_width_max and width < gpu.pcie_width_max:
+            flags.append(f"x{width} of x{gpu.pcie_width_max}")
+        links[str(gpu.index)] = {
+            'pcie_gen': gen,
+            'pcie_gen_max': gpu.pcie_gen_max,
+            'pcie_width': width,
+            'pcie_width_max': gpu.pcie_width_max,
+            'measured_under_load': under_load,
+            'pcie_current_gbps': pcie_peak_gbps(gen, width),
+            'pcie_max_gbps': pcie_peak_gbps(gpu.pcie_gen_max, gpu.pcie_width_max),
+            'compute_capability': gpu.compute_capability,
+            'below_max': flags
+        }
+    return links
+
+
+def pair_peak(gpu_a, gpu_b, links, topology=None):
+    """Expected per-direction peak between two GPUs and the path it assumes
+
+    NV# paths use the NVLink generation from the compute capability. Any
+    PCIe path is capped by the slower endpoint's max link; PHB/NODE/SYS
+    paths cross the CPU and rarely reach it.
+    """
+    path = topology.link(f"GPU{gpu_a.index}", f"GPU{gpu_b.index}") if topology else None
+    if path and path.startswith('NV'):
+        try:
+            peak = nvlink_peak_gbps(int(path[2:]), gpu_a.compute_capability)
+        except ValueError:
+            peak = None
+        if peak:
+            return {'path': path, 'basis': 'nvlink', 'peak_gbps': peak}
+    peaks = [links[str(gpu.index)]['pcie_max_gbps'] for gpu in (gpu_a, gpu_b)]
+    peak = min(peaks) if None not in peaks else None
+    return {'path': path, 'basis': 'pcie', 'peak_gbps': peak}
+
+
+def collective_peak(gpus, links, topology=None):
+    """Bus bandwidth ceiling for a collective over all GPUs: the slowest hop of the best ring"""
+    if len(gpus) < 2:
+        return None
+    by_name = {f"GPU{gpu.index}": gpu for gpu in gpus}
+    order = [name for name in topology.best_ring(list(by_name)) if name in by_name] if topology else list(by_name)
+    hops = [pair_peak(by_name[a], by_name[b], links, topology) for a, b in zip(order, order[1:] + order[:1])]
+    if any(hop['peak_gbps'] is None for hop in hops):
+        return None
+    bottleneck = min(hops, key=lambda hop: hop['peak_gbps'])
+    return dict(bottleneck, ring=order)
+
+
+def annotate_results(results, gpus, topology=None):
+    """Add peak/efficiency annotations to bandwidth results in place, returns the model"""
+    links = gpu_links(gpus, results)
+    peak = collective_peak(gpus, links, topology)
+    model = {'gpus': links, 'collective_peak': peak}
+
+    for test in results.get('tests', {}).values():
+        adaptive = test.get('adaptive')
+        if adaptive:
+            busbw = adaptive.get('saturated_busbw')
+        else:
+            busbw = max((row['busbw'] for row in test.get('bandwidth_data') or []), default=None)
+        test['peak_busbw_gbps'] = peak['peak_gbps'] if peak else None
+        test['efficiency_percent'] = efficiency_percent(busbw, test['peak_busbw_gbps'])
+
+    p2p = results.get('p2p_matrix')
+    if p2p:
+        by_index = {gpu.index: gpu for gpu in gpus}
+        indices = p2p['gpus']
+        peaks = [[None if a == b else pair_peak(by_index[a], by_index[b], links, topology)['peak_gbps']
+                  for b in indices] for a in indices]
+        p2p['peak_gbps'] = peaks
+        p2p['efficiency_percent'] = [[efficiency_percent(measured, peaks[i][j])
+                                      for j, measured in enumerate(row)]
+                                     for i, row in enumerate(p2p['bandwidth_gbps'])]
+
+    results['link_model'] = model
+    return model
+
+
+def summary_lines(results):
+    """Short human-readable summary of an annotated results dict"""
+    lines = []
+    model = results.get('link_model') or {}
+    peak = model.get('collective_peak')
+    for name, test in results.get('tests', {}).items():
+        if test.get('efficiency_percent') is not None:
+            lines.append(f"{name}: {test['efficiency_percent']:.0f}% of {test['peak_busbw_gbps']:.1f} GB/s "
+                         f"peak ({peak['path'] or peak['basis']} bottleneck)")
+    p2p = results.get('p2p_matrix')
+    if p2p and p2p.get('efficiency_percent'):
+        values = [value for row in p2p['efficiency_percent'] for value in row if value is not None]
+        if values:
+            lines.append(f"P2P pairs: {min(values):.0f}-{max(values):.0f}% of peak")
+    for index, gpu in sorted(model.get('gpus', {}).items(), key=lambda item: int(item[0])):
+        if gpu['below_max']:
+            lines.append(f"GPU {index} PCIe link below max: {', '.join(gpu['below_max'])}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize link efficiency of bandwidth results")
+    parser.add_argument('results', nargs='?', default='bandwidth_test_results.json',
+                        help='Annotated bandwidth results (default: %(default)s)')
+    args = parser.parse_args()
+
+    try:
+        with open(args.results) as f:
+            results = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: Cannot read {args.results}: {e}")
+        sys.exit(1)
+    for line in summary_lines(results) or ["No link efficiency data"]:
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Built-in Network Engine - GPU Benchmark v3
+Self-contained asyncio TCP throughput and ping-pong latency server/client
+
+Standard library only, so test_network_bandwidth.py can ship this file to
+hosts without iperf3 and run it with any python3.
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+
+PORT = 5301
+CONNECT_TIMEOUT = 10.0
+BLOCK_SIZE = 4 * 1024 * 1024
+RECV_SIZE = 1024 * 1024
+INTERVAL = 1.0
+PINGPONG_SIZE = 64
+PINGPONG_COUNT = 2000
+DIRECTIONS = ['forward', 'reverse', 'bidir']
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def rtt_histogram(rtts_us):
+    """Power-of-two microsecond buckets, e.g. {'<=16': 3, '<=32': 120}"""
+    histogram = {}
+    for rtt in rtts_us:
+        bound = 1
+        while bound < rtt:
+            bound *= 2
+        histogram[bound] = histogram.get(bound, 0) + 1
+    return {f"<={bound}": count for bound, count in sorted(histogram.items())}
+
+
+def _tune(sock):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setblocking(False)
+
+
+def _payload_file():
+    """Temporary file holding one block, the source for zero-copy sendfile"""
+    payload = tempfile.TemporaryFile()
+    payload.write(b'\0' * BLOCK_SIZE)
+    payload.flush()
+    return payload
+
+
+async def send_for(loop, sock, seconds):
+    """Send for a fixed time with sendfile, then half-close, returns bytes sent"""
+    sent = 0
+    deadline = time.monotonic() + seconds
+    with _payload_file() as payload:
+        while time.monotonic() < deadline:
+            sent += await loop.sock_sendfile(sock, payload, 0, BLOCK_SIZE)
+    sock.shutdown(socket.SHUT_WR)
+    return sent
+
+
+async def receive_all(loop, sock):
+    """Drain a stream into a reused buffer until EOF
+
+    Returns bytes, seconds from first byte to EOF and per-interval byte counts.
+    """
+    buffer = memoryview(bytearray(RECV_SIZE))
+    received = 0
+    intervals = []
+    first = None
+    while True:
+        count = await loop.sock_recv_into(sock, buffer)
+        now = time.monotonic()
+        if not count:
+            break
+        if first is None:
+            first = now
+        slot = int((now - first) / INTERVAL)
+        while len(intervals) <= slot:
+            intervals.append(0)
+        intervals[slot] += count
+        received += count
+        # sock_recv_into does not suspend while data is queued, let other streams run
+        await asyncio.sleep(0)
+    return {'bytes': received, 'seconds': (now - first) if first else 0.0, 'intervals': intervals}
+
+
+async def _read_line(loop, sock):
+    # Byte at a time so nothing after the newline is consumed
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = await loop.sock_recv(sock, 1)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data) if data.strip() else None
+
+
+async def _write_line(loop, sock, message):
+    await loop.sock_sendall(sock, (json.dumps(message) + '\n').encode())
+
+
+# Server
+
+async def handle_connection(loop, sock):
+    try:
+        request = await _read_line(loop, sock)
+        if request is None:
+            return
+        if request['mode'] == 'send':
+            # Client sends, we measure as the receiver and report back
+            report = await receive_all(loop, sock)
+            await _write_line(loop, sock, report)
+        elif request['mode'] == 'receive':
+            await send_for(loop, sock, request['seconds'])
+            await loop.sock_recv(sock, 1)  # Wait for the client to finish reading
+        elif request['mode'] == 'pingpong':
+            size = request['size']
+            buffer = memoryview(bytearray(size))
+            while True:
+                received = 0
+                while received < size:
+                    count = await loop.sock_recv_into(sock, buffer[received:])
+                    if not count:
+                        return
+                    received += count
+                await loop.sock_sendall(sock, buffer)
+    except (OSError, ValueError, KeyError):
+        pass
+    finally:
+        sock.close()
+
+
+async def serve(port, host='0.0.0.0', lifetime=None):
+    """Accept connections until lifetime seconds have passed (forever if None)"""
+    loop = asyncio.get_running_loop()
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(128)
+    listener.setblocking(False)
+    deadline = time.monotonic() + lifetime if lifetime else None
+    tasks = set()
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            timeout = deadline - time.monotonic() if deadline else None
+            try:
+                sock, _ = await asyncio.wait_for(loop.sock_accept(listener), timeout)
+            except asyncio.TimeoutError:
+                break
+            _tune(sock)
+            task = asyncio.ensure_future(handle_connection(loop, sock))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        listener.close()
+
+
+# Client
+
+async def connect(loop, host, port, timeout=CONNECT_TIMEOUT):
+    """Connect, retrying while the server is still starting up"""
+    deadline = time.monotonic() + timeout
+    while True:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        _tune(sock)
+        try:
+            await loop.sock_connect(sock, (socket.gethostbyname(host), port))
+            return sock
+        except OSError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def _stream(loop, host, port, mode, seconds):
+    sock = await connect(loop, host, port)
+    try:
+        await _write_line(loop, sock, {'mode': mode, 'seconds': seconds})
+        if mode == 'send':
+            sent = await send_for(loop, sock, seconds)
+            report = await _read_line(loop, sock)
+            return sent, report
+        report = await receive_all(loop, sock)
+        await loop.sock_sendall(sock, b'\0')
+        return report['bytes'], report
+    finally:
+        sock.close()
+
+
+def _combine(results):
+    """Sum parallel streams into one direction summary, like iperf3's end.sum_*"""
+    results = [(sent, report) for sent, report in results if report]
+    if not results:
+        return None
+    received = sum(report['bytes'] for _, report in results)
+    seconds = max(report['seconds'] for _, report in results) or 1e-9
+    intervals = [0] * max(len(report['intervals']) for _, report in results)
+    for _, report in results:
+        for i, count in enumerate(report['intervals']):
+            intervals[i] += count
+    sent = sum(sent for sent, _ in results)
+    return {
+        'sent_gbps': sent * 8 / seconds / 1e9,
+        'received_gbps': received * 8 / seconds / 1e9,
+        'bytes_sent': sent,
+        'bytes_received': received,
+        'retransmits': None,
+        # The last interval is usually partial
+        'intervals_gbps': [round(count * 8 / INTERVAL / 1e9, 3) for count in intervals]
+    }
+
+
+async def pingpong(loop, host, port, size=PINGPONG_SIZE, count=PINGPONG_COUNT):
+    """Round trips of size-byte messages, returns RTT percentiles in microseconds"""
+    sock = await connect(loop, host, port)
+    try:
+        await _write_line(loop, sock, {'mode': 'pingpong', 'size': size})
+        message = memoryview(bytearray(size))
+        buffer = memoryview(bytearray(size))
+        rtts = []
+        for _ in range(count):
+            start = time.perf_counter()
+            await loop.sock_sendall(sock, message)
+            received = 0
+            while received < size:
+                got = await loop.sock_recv_into(sock, buffer[received:])
+                if not got:
+                    raise ConnectionError("Server closed the connection")
+                received += got
+            rtts.append((time.perf_counter() - start) * 1e6)
+    finally:
+        sock.close()
+    rtts.sort()
+    return {
+        'message_bytes': size,
+        'count': len(rtts),
+        'min_us': round(rtts[0], 2),
+        'p50_us': round(percentile(rtts, 0.50), 2),
+        'p99_us': round(percentile(rtts, 0.99), 2),
+        'max_us': round(rtts[-1], 2),
+        'histogram_us': rtt_histogram(rtts)
+    }
+
+
+async def run_client(host, port=PORT, streams=1, seconds=10, direction='forward',
+                     pingpong_count=PINGPONG_COUNT, pingpong_size=PINGPONG_SIZE):
+    """Throughput test then ping-pong, in the same shape as the iperf3 JSON parser"""
+    loop = asyncio.get_running_loop()
+    forward = reverse = None
+    jobs = []
+    if direction in ('forward', 'bidir'):
+        jobs.append(('forward', 'send'))
+    if direction in ('reverse', 'bidir'):
+        jobs.append(('reverse', 'receive'))
+    results = await asyncio.gather(*[_stream(loop, host, port, mode, seconds)
+                                     for _, mode in jobs for _ in range(streams)])
+    for i, (name, _) in enumerate(jobs):
+        summary = _combine(results[i * streams:(i + 1) * streams])
+        if name == 'forward':
+            forward = summary
+        else:
+            reverse = summary
+    latency = await pingpong(loop, host, port, pingpong_size, pingpong_count) if pingpong_count else None
+    return {'forward': forward, 'reverse': reverse, 'cpu_percent': None, 'latency': latency}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Built-in TCP throughput and latency engine")
+    subparsers = parser.add_subparsers(dest='role', required=True)
+    server = subparsers.add_parser('server', help='Serve throughput and ping-pong tests')
+    server.add_argument('--port', type=int, default=PORT)
+    server.add_argument('--bind', default='0.0.0.0')
+    server.add_argument('--lifetime', type=float, help='Exit after this many seconds')
+    client = subparsers.add_parser('client', help='Measure against a server, prints JSON')
+    client.add_argument('host')
+    client.add_argument('--port', type=int, default=PORT)
+    client.add_argument('--streams', '-P', type=int, default=1)
+    client.add_argument('--duration', '-t', type=float, default=10)
+    client.add_argument('--direction', choices=DIRECTIONS, default='forward')
+    client.add_argument('--pingpong', type=int, default=PINGPONG_COUNT,
+                        help='Ping-pong round trips, 0 to skip (default: %(default)s)')
+    client.add_argument('--message-size', type=int, default=PINGPONG_SIZE,
+                        help='Ping-pong message bytes (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.role == 'server':
+        try:
+            asyncio.run(serve(args.port, args.bind, args.lifetime))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        result = asyncio.run(run_client(args.host, args.port, max(1, args.streams), args.duration,
+                                        args.direction, args.pingpong, args.message_size))
+    except OSError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
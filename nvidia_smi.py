@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+nvidia-smi Collector - GPU Benchmark v3
+Single-query, process-cached GPU snapshot shared by all probes
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+# Environment variable naming a fixture file to replay instead of running nvidia-smi
+FIXTURE_ENV = "GPUBENCH_NVIDIA_SMI_FIXTURE"
+TIMEOUT = 30
+
+# (nvidia-smi query field, record attribute, type)
+QUERY_FIELDS = [
+    ('index', 'index', int),
+    ('uuid', 'uuid', str),
+    ('pci.bus_id', 'bus_id', str),
+    ('name', 'name', str),
+    ('driver_version', 'driver_version', str),
+    ('compute_cap', 'compute_capability', str),
+    ('memory.total', 'memory_total_mb', int),
+    ('memory.used', 'memory_used_mb', int),
+    ('memory.free', 'memory_free_mb', int),
+    ('power.max_limit', 'power_max_limit_w', float),
+    ('temperature.gpu', 'temperature_c', int),
+    ('pcie.link.gen.current', 'pcie_gen_current', int),
+    ('pcie.link.gen.max', 'pcie_gen_max', int),
+    ('pcie.link.width.current', 'pcie_width_current', int),
+    ('pcie.link.width.max', 'pcie_width_max', int),
+]
+# Fields every driver understands, used if the full query is rejected
+CORE_FIELDS = ['index', 'uuid', 'pci.bus_id', 'name', 'driver_version',
+               'memory.total', 'memory.used', 'memory.free']
+MISSING_VALUES = {'', 'N/A', '[N/A]', '[Not Supported]', '[Unknown Error]'}
+
+
+class GPURecord(NamedTuple):
+    """One GPU as reported by nvidia-smi, None where a field is unavailable"""
+    index: int
+    uuid: str
+    bus_id: str
+    name: str
+    driver_version: Optional[str] = None
+    compute_capability: Optional[str] = None
+    memory_total_mb: Optional[int] = None
+    memory_used_mb: Optional[int] = None
+    memory_free_mb: Optional[int] = None
+    power_max_limit_w: Optional[float] = None
+    temperature_c: Optional[int] = None
+    pcie_gen_current: Optional[int] = None
+    pcie_gen_max: Optional[int] = None
+    pcie_width_current: Optional[int] = None
+    pcie_width_max: Optional[int] = None
+
+
+class GPUSnapshot(NamedTuple):
+    """All GPUs from a single nvidia-smi query"""
+    timestamp: str
+    gpus: List[GPURecord]
+
+    def by_uuid(self):
+        return {gpu.uuid: gpu for gpu in self.gpus}
+
+    def by_bus_id(self):
+        return {normalize_bus_id(gpu.bus_id): gpu for gpu in self.gpus}
+
+
+def normalize_bus_id(bus_id):
+    """Normalize a PCI bus id to the sysfs form, e.g. 0000:01:00.0"""
+    domain, _, rest = bus_id.strip().lower().rpartition(':')
+    domain, _, bus = domain.rpartition(':')
+    return f"{int(domain or '0', 16):04x}:{bus}:{rest}"
+
+
+class CommandBackend:
+    """Runs the real nvidia-smi binary, without a shell"""
+
+    def __init__(self, executable='nvidia-smi', timeout=TIMEOUT):
+        self.executable = executable
+        self.timeout = timeout
+
+    def run(self, args):
+        try:
+            result = subprocess.run([self.executable] + args, capture_output=True,
+                                    text=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    def query_gpu(self, fields):
+        return self.run([f"--query-gpu={','.join(fields)}", '--format=csv,noheader,nounits'])
+
+    def summary(self):
+        return self.run([])
+
+    def topology(self):
+        return self.run(['topo', '-m'])
+
+
+class ReplayBackend:
+    """Replays a captured fixture so the collector works without a GPU
+
+    Fixture format (see capture_fixture):
+      {"fields": [query fields], "rows": [[values...]],
+       "summary": "nvidia-smi text", "topology": "nvidia-smi topo -m text"}
+    Fields requested but absent from the fixture replay as [N/A].
+    """
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.fixture = json.load(f)
+
+    def query_gpu(self, fields):
+        columns = self.fixture.get('fields', [])
+        lines = []
+        for row in self.fixture.get('rows', []):
+            values = dict(zip(columns, row))
+            lines.append(", ".join(str(values.get(field, '[N/A]')) for field in fields))
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        return self.fixture.get('summary')
+
+    def topology(self):
+        return self.fixture.get('topology')
+
+
+_backend = None
+_snapshot = None
+_summary = None
+_topology = None
+
+
+def get_backend():
+    """Return the active backend, replaying a fixture if FIXTURE_ENV is set"""
+    global _backend
+    if _backend is None:
+        fixture = os.environ.get(FIXTURE_ENV)
+        _backend = ReplayBackend(fixture) if fixture else CommandBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """Install a backend and drop any cached snapshot"""
+    global _backend, _snapshot, _summary, _topology
+    _backend = backend
+    _snapshot = None
+    _summary = None
+    _topology = None
+
+
+def _convert(value, kind):
+    value = value.strip()
+    if value in MISSING_VALUES:
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        return None
+
+
+def parse_query_output(output, fields):
+    """Parse csv,noheader,nounits output for the given query fields"""
+    attributes = {field: (attr, kind) for field, attr, kind in QUERY_FIELDS}
+    gpus = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        parts = [part.strip() for part in line.split(',')]
+        if len(parts) != len(fields):
+            continue
+        values = {}
+        for field, part in zip(fields, parts):
+            attr, kind = attributes[field]
+            values[attr] = _convert(part, kind)
+        if values.get('index') is None:
+            continue
+        gpus.append(GPURecord(**values))
+    return gpus
+
+
+def get_snapshot(refresh=False):
+    """Return the process-wide GPU snapshot, querying nvidia-smi at most once
+
+    Returns an empty snapshot when nvidia-smi is unavailable.
+    """
+    global _snapshot
+    if _snapshot is not None and not refresh:
+        return _snapshot
+
+    backend = get_backend()
+    fields = [field for field, _, _ in QUERY_FIELDS]
+    output = backend.query_gpu(fields)
+    if output is None:
+        # Older drivers reject fields they do not know, fall back to the core set
+        fields = CORE_FIELDS
+        output = backend.query_gpu(fields)
+
+    gpus = parse_query_output(output, fields) if output else []
+    _snapshot = GPUSnapshot(timestamp=datetime.now().isoformat(),
+                            gpus=sorted(gpus, key=lambda gpu: gpu.index))
+    return _snapshot
+
+
+def get_summary(refresh=False):
+    """Return the plain nvidia-smi banner text (cached), or None"""
+    global _summary
+    if _summary is None or refresh:
+        _summary = get_backend().summary()
+    return _summary
+
+
+def get_topology_text(refresh=False):
+    """Return the `nvidia-smi topo -m` matrix text (cached), or None"""
+    global _topology
+    if _topology is None or refresh:
+        _topology = get_backend().topology()
+    return _topology
+
+
+def get_cuda_version():
+    """CUDA version supported by the driver, parsed from the nvidia-smi banner"""
+    summary = get_summary()
+    match = re.search(r'CUDA Version: (\d+\.\d+)', summary or '')
+    return match.group(1) if match else None
+
+
+def get_driver_version():
+    """Driver version from the snapshot, falling back to the banner"""
+    snapshot = get_snapshot()
+    for gpu in snapshot.gpus:
+        if gpu.driver_version:
+            return gpu.driver_version
+    match = re.search(r'Driver Version: ([\d.]+)', get_summary() or '')
+    return match.group(1) if match else None
+
+
+def capture_fixture(path):
+    """Record the live nvidia-smi output as a replay fixture"""
+    backend = CommandBackend()
+    fields = [field for field, _, _ in QUERY_FIELDS]
+    output = backend.query_gpu(fields)
+    if output is None:
+        fields = CORE_FIELDS
+        output = backend.query_gpu(fields)
+    if output is None:
+        return False
+    fixture = {
+        'fields': fields,
+        'rows': [[part.strip() for part in line.split(',')]
+                 for line in output.splitlines() if line.strip()],
+        'summary': backend.summary(),
+        'topology': backend.topology()
+    }
+    with open(path, 'w') as f:
+        json.dump(fixture, f, indent=2)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="nvidia-smi snapshot collector")
+    parser.add_argument('--capture', metavar='FIXTURE',
+                        help='Record live nvidia-smi output to a replay fixture')
+    args = parser.parse_args()
+
+    if args.capture:
+        if not capture_fixture(args.capture):
+            print("ERROR: nvidia-smi not available")
+            sys.exit(1)
+        print(f"Fixture saved to: {args.capture}")
+        return
+
+    snapshot = get_snapshot()
+    print(json.dumps({'timestamp': snapshot.timestamp,
+                      'gpus': [gpu._asdict() for gpu in snapshot.gpus]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
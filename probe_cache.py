@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Probe Cache - GPU Benchmark v3
+Boot-scoped on-disk cache of static facts (driver, CUDA, NVCC, OS, PCI names)
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+import nvidia_smi
+import system_inventory
+
+CACHE_DIR_ENV = "GPUBENCH_CACHE_DIR"
+CACHE_FILE = "probe_cache.json"
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+DRIVER_VERSION_PATH = "/proc/driver/nvidia/version"
+# Bumped whenever the layout of cached facts changes
+CACHE_VERSION = 1
+NVCC_TIMEOUT = 30
+
+_cache = None
+
+
+def cache_path():
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        directory = os.path.join(base, 'gpubench')
+    return os.path.join(directory, CACHE_FILE)
+
+
+def kernel_driver_version():
+    """Loaded NVIDIA kernel module version, read from procfs without running nvidia-smi"""
+    try:
+        with open(DRIVER_VERSION_PATH) as f:
+            text = f.read()
+    except OSError:
+        return None
+    match = re.search(r'Kernel Module\s+(?:for \S+\s+)?([\d.]+)', text)
+    return match.group(1) if match else None
+
+
+def cache_key():
+    """Facts stay valid until a reboot, a driver reload or a different nvidia-smi fixture"""
+    try:
+        with open(BOOT_ID_PATH) as f:
+            boot_id = f.read().strip()
+    except OSError:
+        boot_id = None
+    return {
+        'version': CACHE_VERSION,
+        'boot_id': boot_id,
+        'driver_version': kernel_driver_version(),
+        'fixture': os.environ.get(nvidia_smi.FIXTURE_ENV)
+    }
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        key = cache_key()
+        try:
+            with open(cache_path()) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        # Without a boot id there is nothing to scope the facts to, probe every time
+        if key['boot_id'] is None or stored.get('key') != key:
+            stored = {'key': key, 'facts': {}}
+        _cache = stored
+    return _cache
+
+
+def _save():
+    """Write the cache atomically; an unwritable cache directory only costs the speedup"""
+    if _cache['key']['boot_id'] is None:
+        return
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.probe_cache.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(_cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def cached(name, probe, refresh=False):
+    """Return fact `name`, running probe() only on a cache miss
+
+    None results are not stored, so a probe that failed (nvidia-smi timing
+    out, a tool not yet installed) is retried on the next call.
+    """
+    facts = _load()['facts']
+    if name in facts and not refresh:
+        return facts[name]
+    value = probe()
+    if value is not None:
+        facts[name] = value
+        _save()
+    return value
+
+
+def clear():
+    """Forget every cached fact, the next lookups probe again"""
+    global _cache
+    _cache = None
+    try:
+        os.remove(cache_path())
+    except OSError:
+        pass
+
+
+def probe_nvcc_version():
+    nvcc = shutil.which('nvcc')
+    if not nvcc:
+        return None
+    try:
+        result = subprocess.run([nvcc, '--version'], capture_output=True, text=True, timeout=NVCC_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r'release (\d+\.\d+)', result.stdout)
+    return match.group(1) if match else "Unknown"
+
+
+def get_cuda_version(refresh=False):
+    """CUDA version supported by the driver, scraped from the nvidia-smi banner once per boot"""
+    return cached('cuda_version', nvidia_smi.get_cuda_version, refresh)
+
+
+def get_driver_version(refresh=False):
+    return cached('driver_version', lambda: kernel_driver_version() or nvidia_smi.get_driver_version(), refresh)
+
+
+def get_nvcc_version(refresh=False):
+    return cached('nvcc_version', probe_nvcc_version, refresh)
+
+
+def get_os_release(refresh=False):
+    return cached('os_release', lambda: system_inventory.read_os_release() or None, refresh)
+
+
+def lookup_pci_names(ids, root='/', refresh=False):
+    """system_inventory.lookup_pci_names(), cached per set of (vendor, device) ids on the host root"""
+    if root != '/' or not ids:
+        return system_inventory.lookup_pci_names(ids, root)
+    ids = sorted(set(ids))
+    name = 'pci_names:' + ','.join(f"{vendor:04x}:{device:04x}" for vendor, device in ids)
+
+    def probe():
+        names = system_inventory.lookup_pci_names(ids)
+        return [[vendor, device, value] for (vendor, device), value in names.items()]
+
+    return {(vendor, device): value for vendor, device, value in cached(name, probe, refresh) or []}
+
+
+def static_facts(refresh=False):
+    """Every cached fact, probing whatever is missing"""
+    return {
+        'driver_version': get_driver_version(refresh),
+        'cuda_version': get_cuda_version(refresh),
+        'nvcc_version': get_nvcc_version(refresh),
+        'os': (get_os_release(refresh) or {}).get('PRETTY_NAME')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Boot-scoped cache of static probe results")
+    parser.add_argument('--refresh', action='store_true', help='Probe again and rewrite the cache')
+    parser.add_argument('--clear', action='store_true', help='Delete the cache file and exit')
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        print(f"Cache cleared: {cache_path()}")
+        return
+    facts = static_facts(args.refresh)
+    print(json.dumps({'cache': cache_path(), 'key': _load()['key'], 'facts': facts}, indent=2))
+    if facts['cuda_version'] is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
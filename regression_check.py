@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Regression Check - GPU Benchmark v3
+Compares a run with a baseline and flags metrics that regressed beyond run-to-run noise
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+import results_store
+from results_dir import results_path
+
+RESULTS_FILE = "regression_check_results.json"
+DEFAULT_HISTORY = 5
+# Multiples of the baseline's run-to-run spread (MAD scaled to sigma) a change must exceed
+NOISE_SIGMAS = 3.0
+MAD_TO_SIGMA = 1.4826
+# Spread is only estimated from this many baseline runs, fewer rely on the tolerance alone
+MIN_RUNS_FOR_NOISE = 3
+# Curve points below this fraction of the baseline peak are latency-bound and left out of the verdict
+BANDWIDTH_BOUND_FRACTION = 0.5
+
+HIGHER, LOWER = 1, -1
+
+# metric: (better direction, relative tolerance)
+METRICS = {
+    'busbw_gbps': (HIGHER, 0.05),
+    'algbw_gbps': (HIGHER, 0.05),
+    'avg_busbw_gbps': (HIGHER, 0.05),
+    'max_busbw_gbps': (HIGHER, 0.05),
+    'max_algbw_gbps': (HIGHER, 0.05),
+    'saturated_busbw_gbps': (HIGHER, 0.05),
+    'latency_floor_us': (LOWER, 0.15),
+    'p2p_bandwidth_gbps': (HIGHER, 0.05),
+    'p2p_latency_us': (LOWER, 0.15),
+    'read_mbps': (HIGHER, 0.10),
+    'write_mbps': (HIGHER, 0.10),
+    'block_read_mbps': (HIGHER, 0.10),
+    'parallel_read_mbps': (HIGHER, 0.10),
+    'parallel_read_iops': (HIGHER, 0.10),
+    'parallel_read_p99_us': (LOWER, 0.25),
+    'mount_read_mbps': (HIGHER, 0.10),
+    'network_gbps': (HIGHER, 0.10),
+    'network_reverse_gbps': (HIGHER, 0.10),
+    'network_rtt_p50_us': (LOWER, 0.25),
+    'network_rtt_p99_us': (LOWER, 0.25),
+    'dataloader_samples_per_sec': (HIGHER, 0.10),
+    'checkpoint_write_mbps': (HIGHER, 0.10),
+    'checkpoint_read_mbps': (HIGHER, 0.10),
+    'checkpoint_write_stall_seconds': (LOWER, 0.15),
+    'stream_copy_gbps': (HIGHER, 0.10),
+    'stream_triad_gbps': (HIGHER, 0.10),
+    'create_files_per_sec': (HIGHER, 0.15),
+    'stat_files_per_sec': (HIGHER, 0.15),
+    'read_files_per_sec': (HIGHER, 0.15),
+    'unlink_files_per_sec': (HIGHER, 0.15),
+}
+
+
+def group_rows(rows):
+    """{(metric, collective, subject, peer): {size_bytes: value}} for the gated metrics"""
+    groups = {}
+    for metric, collective, size_bytes, subject, peer, value in rows:
+        if metric in METRICS and value is not None:
+            groups.setdefault((metric, collective, subject, peer), {})[size_bytes] = value
+    return groups
+
+
+def compare_group(metric, current, baselines, tolerance=None, sigmas=NOISE_SIGMAS):
+    """Verdict for one metric series against one or more baseline runs of it
+
+    Points are aligned by size. Each point's threshold is the larger of the
+    relative tolerance and sigmas times the baseline spread across runs.
+    The verdict is the median of the direction-signed, threshold-scaled
+    changes, so a single noisy size cannot flip it.
+    """
+    direction, default_tolerance = METRICS[metric]
+    tolerance = default_tolerance if tolerance is None else tolerance
+    sizes = sorted(set(current) & set().union(*baselines), key=lambda size: -1 if size is None else size)
+    if not sizes:
+        return None
+
+    c = np.array([current[size] for size in sizes], dtype=float)
+    b = np.array([[run.get(size, np.nan) for size in sizes] for run in baselines], dtype=float)
+    m = np.nanmedian(b, axis=0)
+    runs = np.sum(~np.isnan(b), axis=0)
+    sigma = MAD_TO_SIGMA * np.nanmedian(np.abs(b - m), axis=0)
+    sigma = np.where(runs >= MIN_RUNS_FOR_NOISE, sigma, 0.0)
+    threshold = np.maximum(tolerance * np.abs(m), sigmas * sigma)
+
+    usable = threshold > 0
+    if direction == HIGHER and len(sizes) > 1:
+        usable &= m >= BANDWIDTH_BOUND_FRACTION * np.max(m)
+    if not usable.any():
+        return None
+
+    score = direction * (c - m) / np.where(usable, threshold, 1.0)
+    change = (c - m) / np.where(m != 0, m, np.nan) * 100
+    verdict_score = float(np.median(score[usable]))
+    if verdict_score <= -1:
+        verdict = 'regress'
+    elif verdict_score >= 1:
+        verdict = 'improve'
+    else:
+        verdict = 'pass'
+    worst = int(np.argmin(np.where(usable, score, np.inf)))
+    return {
+        'verdict': verdict,
+        'score': round(verdict_score, 3),
+        'change_percent': round(float(np.nanmedian(change[usable])), 2),
+        'points': int(usable.sum()),
+        'points_regressed': int(np.sum(score[usable] <= -1)),
+        'baseline_runs': len(baselines),
+        'worst': {
+            'size_bytes': sizes[worst],
+            'current': float(c[worst]),
+            'baseline': round(float(m[worst]), 4),
+            'threshold': round(float(threshold[worst]), 4),
+            'change_percent': round(float(change[worst]), 2)
+        }
+    }
+
+
+def compare(current_tests, baseline_tests, tolerance=None, sigmas=NOISE_SIGMAS):
+    """Compare {test: rows} against {test: [rows of each baseline run]}"""
+    comparisons = []
+    for test, rows in sorted(current_tests.items()):
+        baseline_groups = [group_rows(run) for run in baseline_tests.get(test, [])]
+        for key, current in sorted(group_rows(rows).items(), key=lambda item: [str(part) for part in item[0]]):
+            baselines = [groups[key] for groups in baseline_groups if key in groups]
+            if not baselines:
+                continue
+            result = compare_group(key[0], current, baselines, tolerance, sigmas)
+            if result is None:
+                continue
+            metric, collective, subject, peer = key
+            result.update({'test': test, 'metric': metric, 'collective': collective,
+                           'subject': subject, 'peer': peer})
+            comparisons.append(result)
+    return comparisons
+
+
+def baseline_from_paths(paths):
+    """{test: [rows of each run]} from results JSONs or results_<ts>/ directories"""
+    baseline = {}
+    for path in paths:
+        for test, rows in results_store.load_measurements(path).items():
+            baseline.setdefault(test, []).append(rows)
+    return baseline
+
+
+def baseline_from_store(db, host, timestamps, last):
+    """{test: [rows of each run]} from a host's last runs before the checked one in the results store
+
+    timestamps maps each test to the checked run's timestamp, so the run is
+    not part of its own baseline once it has been imported.
+    """
+    conn = results_store.connect(db)
+    try:
+        return {test: results_store.recent_runs(conn, host, test, last, before=timestamp)
+                for test, timestamp in timestamps.items()}
+    finally:
+        conn.close()
+
+
+def current_host(path):
+    directory = path if os.path.isdir(path) else os.path.dirname(path) or '.'
+    try:
+        with open(os.path.join(directory, 'gpu_detection_results.json')) as f:
+            return json.load(f)['system_info']['hostname']
+    except (OSError, ValueError, KeyError):
+        return results_store.parse_legacy_host(directory) or socket.gethostname()
+
+
+def label(result):
+    parts = [result['test'], result['metric'], result['collective'], result['subject'],
+             result['peer'] and f"-> {result['peer']}"]
+    return " ".join(str(part) for part in parts if part)
+
+
+def display_comparisons(comparisons):
+    print("\nRESULTS: Regression Check")
+    print("=" * 90)
+    print(f"{'Verdict':<9} {'Change':>8} {'Score':>7}  {'Points':>6}  Metric")
+    print("-" * 90)
+    order = {'regress': 0, 'improve': 1, 'pass': 2}
+    for result in sorted(comparisons, key=lambda result: (order[result['verdict']], result['score'])):
+        print(f"{result['verdict'].upper():<9} {result['change_percent']:>+7.1f}% {result['score']:>+7.2f}  "
+              f"{result['points']:>6}  {label(result)}")
+        if result['verdict'] == 'regress' and result['points'] > 1:
+            worst = result['worst']
+            print(f"{'':<36}worst at {worst['size_bytes']} bytes: {worst['current']:g} vs "
+                  f"{worst['baseline']:g} ({worst['change_percent']:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a run against a baseline and flag regressions")
+    parser.add_argument('current', help='Results directory or results JSON of the run to check')
+    parser.add_argument('--baseline', nargs='+', metavar='PATH',
+                        help='Baseline run(s); several runs let the check estimate run-to-run noise')
+    parser.add_argument('--db', help='Use the last runs in this results store as the baseline')
+    parser.add_argument('--host', help='Host whose stored runs form the baseline (default: the checked run\'s)')
+    parser.add_argument('--last', type=int, default=DEFAULT_HISTORY,
+                        help='Stored runs in the baseline (default: %(default)s)')
+    parser.add_argument('--tolerance', type=float,
+                        help='Relative change always treated as noise, e.g. 0.05 (default: per metric)')
+    parser.add_argument('--sigmas', type=float, default=NOISE_SIGMAS,
+                        help='Baseline spreads a change must exceed (default: %(default)s)')
+    parser.add_argument('--output', default=None, help=f'Results file (default: {RESULTS_FILE})')
+    args = parser.parse_args()
+
+    if not args.baseline and not args.db:
+        parser.error("give --baseline PATH or --db DB")
+    if not os.path.exists(args.current):
+        print(f"ERROR: Error: {args.current} not found")
+        sys.exit(2)
+
+    current = results_store.load_measurements(args.current)
+    if not current:
+        print(f"ERROR: Error: Unrecognised results file {args.current}")
+        sys.exit(2)
+    if args.baseline:
+        unrecognised = [path for path in args.baseline if not results_store.load_measurements(path)]
+        if unrecognised:
+            print(f"ERROR: Error: Unrecognised results file {', '.join(unrecognised)}")
+            sys.exit(2)
+        baseline = baseline_from_paths(args.baseline)
+        source = {'paths': args.baseline}
+    else:
+        host = args.host or current_host(args.current)
+        baseline = baseline_from_store(args.db, host, results_store.run_timestamps(args.current), args.last)
+        source = {'db': args.db, 'host': host, 'last': args.last}
+
+    print(f"TESTING: Comparing {args.current} against {source}")
+    comparisons = compare(current, baseline, args.tolerance, args.sigmas)
+    if not comparisons:
+        print("ERROR: Error: No metrics in common with the baseline")
+        sys.exit(2)
+    display_comparisons(comparisons)
+
+    verdicts = [result['verdict'] for result in comparisons]
+    summary = {verdict: verdicts.count(verdict) for verdict in ('regress', 'improve', 'pass')}
+    output = args.output or results_path(RESULTS_FILE)
+    with open(output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'current': args.current,
+            'baseline': source,
+            'sigmas': args.sigmas,
+            'tolerance': args.tolerance,
+            'summary': summary,
+            'comparisons': comparisons
+        }, f, indent=2)
+
+    print(f"\nRESULTS: {summary['regress']} regressed, {summary['improve']} improved, {summary['pass']} within noise")
+    print(f"Results saved to: {output}")
+    if summary['regress']:
+        print("WARNING:  Performance regression detected")
+        sys.exit(1)
+    print("SUCCESS: No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Results Directory - GPU Benchmark v3
+Resolves where probes write their JSON artifacts
+"""
+
+import os
+
+# Set by run_all_tests.py so every probe of a run writes into results_<ts>/
+RESULTS_DIR_ENV = "GPUBENCH_RESULTS_DIR"
+
+
+def results_path(filename):
+    """Path for a results artifact: the run directory if set, else the CWD"""
+    directory = os.environ.get(RESULTS_DIR_ENV)
+    if not directory:
+        return filename
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
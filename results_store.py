@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Results Store - GPU Benchmark v3
+Append-only SQLite history of benchmark results with an importer and query CLI
+"""
+
+import os
+import re
+import sys
+import json
+import socket
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+DEFAULT_DB = "gpubench_results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    test TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    source TEXT,
+    imported_at TEXT NOT NULL,
+    UNIQUE (host, test, timestamp)
+);
+CREATE TABLE IF NOT EXISTS gpus (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    gpu_index INTEGER,
+    uuid TEXT,
+    name TEXT,
+    compute_capability TEXT,
+    bus_id TEXT,
+    driver_version TEXT,
+    memory_total_mb INTEGER
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    metric TEXT NOT NULL,
+    collective TEXT,
+    size_bytes INTEGER,
+    subject TEXT,
+    peer TEXT,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS attributes (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_host ON runs (host, test, timestamp);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (test, timestamp);
+CREATE INDEX IF NOT EXISTS measurements_by_metric ON measurements (metric, collective, size_bytes, run_id);
+CREATE INDEX IF NOT EXISTS measurements_by_run ON measurements (run_id);
+CREATE INDEX IF NOT EXISTS measurements_by_subject ON measurements (subject, metric);
+CREATE INDEX IF NOT EXISTS gpus_by_uuid ON gpus (uuid);
+CREATE INDEX IF NOT EXISTS gpus_by_run ON gpus (run_id);
+"""
+
+RUN_DIR_PATTERN = re.compile(r'results_(\d{8}_\d{6})')
+
+
+def connect(path=DEFAULT_DB):
+    """Open (and create if needed) the store"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def collective_key(name):
+    """'All-Reduce' -> 'all_reduce'"""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def _m(metric, value, collective=None, size_bytes=None, subject=None, peer=None):
+    return (metric, collective, size_bytes, subject, peer, value)
+
+
+# Extractors: parsed JSON -> (test, timestamp, measurements, gpus, attributes)
+
+def extract_bandwidth(data):
+    rows = []
+    for name, test in (data.get('tests') or {}).items():
+        collective = collective_key(name)
+        for point in test.get('bandwidth_data') or []:
+            for key, metric in (('busbw', 'busbw_gbps'), ('algbw', 'algbw_gbps'), ('time_us', 'time_us')):
+                if point.get(key) is not None:
+                    rows.append(_m(metric, point[key], collective, point.get('size_bytes')))
+        adaptive = test.get('adaptive') or {}
+        for key, metric in (('saturated_busbw', 'saturated_busbw_gbps'), ('latency_floor_us', 'latency_floor_us'),
+                            ('half_bandwidth_size_bytes', 'half_bandwidth_size_bytes')):
+            if adaptive.get(key) is not None:
+                rows.append(_m(metric, adaptive[key], collective))
+        if test.get('avg_bus_bandwidth') is not None:
+            rows.append(_m('avg_busbw_gbps', test['avg_bus_bandwidth'], collective))
+        if test.get('efficiency_percent') is not None:
+            rows.append(_m('efficiency_percent', test['efficiency_percent'], collective))
+    p2p = data.get('p2p_matrix')
+    if p2p:
+        gpus = p2p.get('gpus', [])
+        for key, metric in (('bandwidth_gbps', 'p2p_bandwidth_gbps'), ('latency_us', 'p2p_latency_us')):
+            for i, row in enumerate(p2p.get(key) or []):
+                for j, value in enumerate(row):
+                    if value is not None and i != j:
+                        rows.append(_m(metric, value, 'sendrecv', subject=f"GPU{gpus[i]}", peer=f"GPU{gpus[j]}"))
+    return 'bandwidth', data.get('timestamp'), rows, [], {'sweep': data.get('sweep')}
+
+
+def extract_vram(data):
+    rows = [_m('memory_total_mb', gpu['total_mb'], subject=f"GPU{gpu['id']}")
+            for gpu in data.get('gpus', []) if gpu.get('total_mb') is not None]
+    if data.get('total_vram_mb') is not None:
+        rows.append(_m('total_vram_mb', data['total_vram_mb']))
+    gpus = [{'index': int(gpu['id']), 'uuid': gpu.get('uuid'), 'name': gpu.get('name'),
+             'memory_total_mb': gpu.get('total_mb')} for gpu in data.get('gpus', []) if gpu.get('uuid')]
+    return 'vram', data.get('timestamp'), rows, gpus, {}
+
+
+def extract_detection(data):
+    system = data.get('system_info') or {}
+    gpus = [gpu for gpu in data.get('gpu_info', []) if gpu.get('vendor') == 'NVIDIA']
+    attributes = {key: system.get(key) for key in ('hostname', 'kernel', 'os', 'cpu') if system.get(key)}
+    return 'gpu_detection', system.get('detection_time'), [_m('gpu_count', data.get('total_gpus'))], gpus, attributes
+
+
+def extract_cuda(data):
+    attributes = {key: data.get(key) for key in ('cuda_version', 'driver_version', 'nvcc_version')}
+    return 'cuda_version', data.get('timestamp'), [], [], attributes
+
+
+def extract_disk(data):
+    rows = []
+    if data.get('read_speed_mbps') is not None:
+        rows.append(_m('read_mbps', data['read_speed_mbps'], size_bytes=data.get('test_size_bytes')))
+    write = data.get('write') or {}
+    if write.get('write_speed_mbps') is not None:
+        rows.append(_m('write_mbps', write['write_speed_mbps'], size_bytes=write.get('bytes_written')))
+    for sample in data.get('block_size_sweep') or []:
+        rows.append(_m('block_read_mbps', sample['speed_mbps'], size_bytes=sample['block_size_bytes']))
+    for config in data.get('parallel_sweep') or []:
+        subject = f"{config['pattern']}/{config['engine']}/w{config['workers']}/qd{config['queue_depth']}"
+        rows.append(_m('parallel_read_mbps', config['throughput_mbps'], size_bytes=config['block_size_bytes'],
+                       subject=subject))
+        rows.append(_m('parallel_read_iops', config['iops'], size_bytes=config['block_size_bytes'], subject=subject))
+        p99 = (config.get('latency_us') or {}).get('p99')
+        if p99 is not None:
+            rows.append(_m('parallel_read_p99_us', p99, size_bytes=config['block_size_bytes'], subject=subject))
+    for mount in (data.get('mount_survey') or {}).get('mounts', []):
+        rows.append(_m('mount_read_mbps', mount.get('alone_mbps'), subject=mount['path']))
+        rows.append(_m('mount_contended_mbps', mount.get('contended_mbps'), subject=mount['path']))
+    return 'disk_read_speed', data.get('timestamp'), rows, [], {'io_mode': data.get('read_io_mode'),
+                                                               'dataset': (data.get('dataset') or {}).get('path')}
+
+
+def extract_network(data):
+    rows = []
+    for pair in data.get('pairs') or []:
+        if pair.get('gbps') is not None:
+            rows.append(_m('network_gbps', pair['gbps'], subject=pair['client'], peer=pair['server']))
+        reverse = pair.get('reverse') or {}
+        if pair.get('forward') and reverse.get('received_gbps') is not None:
+            rows.append(_m('network_reverse_gbps', reverse['received_gbps'], subject=pair['client'], peer=pair['server']))
+        latency = pair.get('latency') or {}
+        for key in ('p50_us', 'p99_us'):
+            if latency.get(key) is not None:
+                rows.append(_m(f"network_rtt_{key}", latency[key], subject=pair['client'], peer=pair['server']))
+    return 'network_bandwidth', data.get('timestamp'), rows, [], {'engine': data.get('engine')}
+
+
+def extract_small_files(data):
+    rows = []
+    for level in data.get('levels') or []:
+        for phase, result in level['phases'].items():
+            rows.append(_m(f"{phase}_files_per_sec", result['files_per_sec'], subject=f"threads={level['concurrency']}"))
+    return 'small_files', data.get('timestamp'), rows, [], {'filesystem': data.get('filesystem')}
+
+
+def extract_dataloader(data):
+    rows = []
+    for config in data.get('configs') or []:
+        if config.get('error'):
+            continue
+        subject = f"{config['mode']}/w{config['workers']}/p{config['prefetch']}"
+        rows.append(_m('dataloader_samples_per_sec', config['samples_per_sec'], subject=subject))
+        rows.append(_m('dataloader_wait_p99_us', (config.get('batch_wait_us') or {}).get('p99'), subject=subject))
+    best = data.get('best') or {}
+    rows.append(_m('dataloader_samples_per_sec', best.get('samples_per_sec'), subject='best'))
+    return 'dataloader', data.get('timestamp'), rows, [], {'decoder': data.get('decoder'),
+                                                           'verdict': (data.get('feed_rate') or {}).get('verdict')}
+
+
+def extract_checkpoint(data):
+    rows = []
+    for mode, result in (data.get('modes') or {}).items():
+        for phase in ('write', 'read'):
+            summary = result.get(phase) or {}
+            if 'error' in summary:
+                continue
+            rows.append(_m(f"checkpoint_{phase}_mbps", summary.get('aggregate_mbps'),
+                           size_bytes=data.get('shard_bytes'), subject=mode))
+            rows.append(_m(f"checkpoint_{phase}_stall_seconds", (summary.get('rank_seconds') or {}).get('max'),
+                           size_bytes=data.get('shard_bytes'), subject=mode))
+    return 'checkpoint', data.get('timestamp'), rows, [], {'ranks': data.get('ranks')}
+
+
+def extract_memory(data):
+    rows = []
+    for node, peak in (data.get('peaks') or {}).items():
+        for kernel in ('copy', 'triad'):
+            rows.append(_m(f"stream_{kernel}_gbps", peak.get(f"{kernel}_gbps"), subject=f"node{node}"))
+    system = data.get('system') or {}
+    for kernel in ('copy', 'triad'):
+        rows.append(_m(f"stream_{kernel}_gbps", system.get(f"{kernel}_gbps"), subject='all'))
+    matrix = data.get('matrix') or {}
+    nodes = matrix.get('nodes', [])
+    for i, row in enumerate(matrix.get('triad_gbps') or []):
+        for j, value in enumerate(row):
+            rows.append(_m('stream_triad_gbps', value, subject=f"node{nodes[i]}", peer=f"mem{nodes[j]}"))
+    return 'memory_bandwidth', data.get('timestamp'), rows, [], {}
+
+
+def extract_stage_timings(data):
+    rows = [_m('stage_seconds', stage['duration_seconds'], subject=stage['name']) for stage in data.get('stages', [])]
+    rows.append(_m('suite_seconds', data.get('total_seconds')))
+    return 'stage_timings', data.get('started'), rows, [], {}
+
+
+EXTRACTORS = {
+    'bandwidth_test_results.json': extract_bandwidth,
+    'vram_test_results.json': extract_vram,
+    'gpu_detection_results.json': extract_detection,
+    'cuda_version_results.json': extract_cuda,
+    'disk_read_speed_results.json': extract_disk,
+    'network_bandwidth_results.json': extract_network,
+    'small_file_results.json': extract_small_files,
+    'memory_bandwidth_results.json': extract_memory,
+    'dataloader_results.json': extract_dataloader,
+    'checkpoint_results.json': extract_checkpoint,
+    'stage_timings.json': extract_stage_timings,
+}
+
+# A top-level key only one kind of results JSON has, for files saved under another name
+SIGNATURES = {
+    'hosts': 'fleet_results.json',
+    'gpu_info': 'gpu_detection_results.json',
+    'total_vram_mb': 'vram_test_results.json',
+    'nvcc_version': 'cuda_version_results.json',
+    'tests': 'bandwidth_test_results.json',
+    'read_speed_mbps': 'disk_read_speed_results.json',
+    'pairs': 'network_bandwidth_results.json',
+    'levels': 'small_file_results.json',
+    'peaks': 'memory_bandwidth_results.json',
+    'configs': 'dataloader_results.json',
+    'modes': 'checkpoint_results.json',
+    'stages': 'stage_timings.json',
+}
+
+
+def results_kind(path, data):
+    """Canonical filename of a results JSON, from its name or else its top-level keys"""
+    filename = os.path.basename(path)
+    if filename in EXTRACTORS or filename == 'fleet_results.json':
+        return filename
+    return next((kind for key, kind in SIGNATURES.items() if key in data), None)
+
+
+# Console logs of runs that predate the JSON artifacts
+
+def parse_legacy_logs(directory):
+    """Headline numbers from the .txt logs of an old results_<ts>/ directory"""
+    documents = []
+
+    def read(name):
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, errors='replace') as f:
+            return f.read()
+
+    text = read('bandwidth_test.txt')
+    if text:
+        rows = []
+        # Older logs mark a parsed collective with an emoji, newer ones with SUCCESS:
+        for name, body in re.findall(r'^(?:SUCCESS:|✅) *(\S+)\n((?:   .*\n?)*)', text, re.M):
+            collective = collective_key(name)
+            for label, metric in (('Max Algorithm BW', 'max_algbw_gbps'), ('Max Bus BW', 'max_busbw_gbps'),
+                                  ('Average Bus BW', 'avg_busbw_gbps')):
+                match = re.search(rf'{label}: ([\d.]+) GB/s', body)
+                if match:
+                    rows.append(_m(metric, float(match.group(1)), collective))
+        documents.append(('bandwidth', rows, [], {}))
+    text = read('disk_read_speed.txt')
+    match = re.search(r'Read speed: ([\d.]+) MB/s', text or '')
+    if match:
+        documents.append(('disk_read_speed', [_m('read_mbps', float(match.group(1)))], [], {}))
+    text = read('vram_capacity.txt')
+    # The node total follows the per-GPU lines, after "Total GPUs: N"
+    match = re.search(r'Total GPUs: \d+\s*\nTotal VRAM: [\d.]+ GB \((\d+) MB\)', text or '')
+    if match:
+        documents.append(('vram', [_m('total_vram_mb', int(match.group(1)))], [], {}))
+    text = read('cuda_version.txt')
+    match = re.search(r'CUDA Version: ([\d.]+)', text or '')
+    if match:
+        documents.append(('cuda_version', [], [], {'cuda_version': match.group(1)}))
+    return documents
+
+
+def parse_legacy_host(directory):
+    """Hostname from the "System: <host>" line of an old gpu_detection.txt log"""
+    try:
+        with open(os.path.join(directory, 'gpu_detection.txt'), errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    match = re.search(r'^[^\w\n]*System: (\S+)', text, re.M)
+    return match.group(1) if match else None
+
+
+# Import
+
+def insert_run(conn, host, test, timestamp, source, measurements, gpus=(), attributes=None):
+    """Append one run, returns False if it was already stored"""
+    cursor = conn.execute("INSERT OR IGNORE INTO runs (host, test, timestamp, source, imported_at) "
+                          "VALUES (?, ?, ?, ?, ?)",
+                          (host, test, timestamp, source, datetime.now().isoformat()))
+    if cursor.rowcount == 0:
+        return False
+    run_id = cursor.lastrowid
+    conn.executemany("INSERT INTO measurements (run_id, metric, collective, size_bytes, subject, peer, value) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [(run_id,) + row for row in measurements if row[-1] is not None])
+    conn.executemany("INSERT INTO gpus (run_id, gpu_index, uuid, name, compute_capability, bus_id, "
+                     "driver_version, memory_total_mb) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(run_id, gpu.get('index'), gpu.get('uuid'), gpu.get('name'), gpu.get('compute_capability'),
+                       gpu.get('bus_id'), gpu.get('driver_version'), gpu.get('memory_total_mb')) for gpu in gpus])
+    conn.executemany("INSERT INTO attributes (run_id, key, value) VALUES (?, ?, ?)",
+                     [(run_id, key, str(value)) for key, value in (attributes or {}).items() if value is not None])
+    return True
+
+
+def detected_gpus(detection):
+    """NVIDIA GPUs of a parsed gpu_detection_results.json, [] if there is none"""
+    return extract_detection(detection)[3] if detection else []
+
+
+def import_document(conn, filename, data, host, fallback_timestamp, source, host_gpus=()):
+    """Import one parsed results JSON, returns the number of new runs (0 or 1)
+
+    Runs whose results do not list their GPUs are stored with host_gpus, the
+    detected GPUs of the same run, so GPUn subjects can be joined to UUIDs.
+    """
+    if filename == 'fleet_results.json':
+        imported = 0
+        for fleet_host, record in data.get('hosts', {}).items():
+            results = record.get('results') or {}
+            fleet_gpus = detected_gpus(results.get('gpu_detection_results.json'))
+            imported += sum(import_document(conn, name, document, fleet_host, fallback_timestamp, source, fleet_gpus)
+                            for name, document in results.items() if document)
+        return imported
+    extractor = EXTRACTORS.get(filename)
+    if extractor is None:
+        return 0
+    test, timestamp, measurements, gpus, attributes = extractor(data)
+    return int(insert_run(conn, host, test, timestamp or fallback_timestamp, source,
+                          measurements, gpus or host_gpus, attributes))
+
+
+def _fallback_timestamp(path):
+    match = RUN_DIR_PATTERN.search(path)
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').isoformat()
+    return datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def import_path(conn, path, host=None):
+    """Import a results JSON, a results_<ts>/ directory or a fleet directory
+
+    The host comes from gpu_detection_results.json (or an old
+    gpu_detection.txt log) next to the files when present, then from the
+    host argument, then this machine's name.
+    """
+    files = [path] if os.path.isfile(path) else [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    directory = path if os.path.isdir(path) else os.path.dirname(path) or '.'
+    detection = _load(os.path.join(directory, 'gpu_detection_results.json')) or {}
+    host = ((detection.get('system_info') or {}).get('hostname') or parse_legacy_host(directory)
+            or host or socket.gethostname())
+    host_gpus = detected_gpus(detection)
+    fallback = _fallback_timestamp(path)
+
+    imported = 0
+    json_files = [file for file in files if file.endswith('.json')]
+    for file in json_files:
+        data = _load(file)
+        if isinstance(data, dict):
+            # A file named on the command line may have been renamed, a directory keeps the canonical names
+            filename = results_kind(file, data) if os.path.isfile(path) else os.path.basename(file)
+            imported += import_document(conn, filename, data, host, fallback, file, host_gpus)
+    if os.path.isdir(path) and not json_files:
+        for test, measurements, gpus, attributes in parse_legacy_logs(path):
+            imported += int(insert_run(conn, host, test, fallback, path, measurements, gpus, attributes))
+    conn.commit()
+    return imported
+
+
+def _documents(path):
+    """(test, timestamp, measurements, gpus, attributes) of a results JSON or results_<ts>/ directory"""
+    files = [path] if os.path.isfile(path) else [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    fallback = _fallback_timestamp(path)
+    json_files = [file for file in files if file.endswith('.json')]
+    for file in json_files:
+        data = _load(file)
+        if not isinstance(data, dict):
+            continue
+        extractor = EXTRACTORS.get(results_kind(file, data) if os.path.isfile(path) else os.path.basename(file))
+        if extractor:
+            test, timestamp, measurements, gpus, attributes = extractor(data)
+            yield test, timestamp or fallback, measurements, gpus, attributes
+    if os.path.isdir(path) and not json_files:
+        for test, measurements, gpus, attributes in parse_legacy_logs(path):
+            yield test, fallback, measurements, gpus, attributes
+
+
+def load_measurements(path):
+    """Measurements of a results JSON or results_<ts>/ directory without storing them, {test: rows}"""
+    tests = {}
+    for test, timestamp, measurements, gpus, attributes in _documents(path):
+        tests.setdefault(test, []).extend(measurements)
+    return tests
+
+
+def run_timestamps(path):
+    """{test: timestamp} a results JSON or results_<ts>/ directory is (or would be) stored under"""
+    return {test: timestamp for test, timestamp, measurements, gpus, attributes in _documents(path)}
+
+
+# Query
+
+def query_measurements(conn, metric, test=None, collective=None, size_bytes=None, host=None,
+                       subject=None, since=None, uuid=None):
+    """Measurements as (timestamp, host, test, collective, size_bytes, subject, peer, value), oldest first
+
+    uuid keeps the rows whose subject or peer is that GPU, matched through
+    the GPU indexes stored with each run, so a card is followed across
+    hosts and renumbering.
+    """
+    clauses = ["m.metric = ?"]
+    params = [metric]
+    for column, value in (('r.test', test), ('m.collective', collective), ('m.size_bytes', size_bytes),
+                          ('r.host', host), ('m.subject', subject)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("r.timestamp >= ?")
+        params.append(since)
+    if uuid is not None:
+        clauses.append("EXISTS (SELECT 1 FROM gpus g WHERE g.run_id = m.run_id AND g.uuid = ? "
+                       "AND 'GPU' || g.gpu_index IN (m.subject, m.peer))")
+        params.append(uuid)
+    return conn.execute(
+        "SELECT r.timestamp, r.host, r.test, m.collective, m.size_bytes, m.subject, m.peer, m.value "
+        "FROM measurements m JOIN runs r ON r.id = m.run_id "
+        f"WHERE {' AND '.join(clauses)} ORDER BY r.timestamp", params).fetchall()
+
+
+def recent_runs(conn, host, test, last, before=None):
+    """Measurement rows of a host's last N runs of a test, newest first, [[(metric, ..., value)], ...]"""
+    params = [host, test]
+    clause = ""
+    if before is not None:
+        clause = " AND timestamp < ?"
+        params.append(before)
+    run_ids = [row[0] for row in conn.execute(
+        f"SELECT id FROM runs WHERE host = ? AND test = ?{clause} ORDER BY timestamp DESC LIMIT ?",
+        params + [last])]
+    return [conn.execute("SELECT metric, collective, size_bytes, subject, peer, value FROM measurements "
+                         "WHERE run_id = ?", (run_id,)).fetchall() for run_id in run_ids]
+
+
+def parse_size(value):
+    """'256M' -> bytes"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark results history store")
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite database (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    importer = subparsers.add_parser('import', help='Import results JSONs and results_<ts>/ or fleet directories')
+    importer.add_argument('paths', nargs='+')
+    importer.add_argument('--host', help='Host for results that do not name one (default: this machine)')
+
+    query = subparsers.add_parser('query', help='Look up one metric over time')
+    query.add_argument('metric', help='e.g. busbw_gbps, read_mbps, network_gbps, p2p_bandwidth_gbps')
+    query.add_argument('--test', help='e.g. bandwidth, disk_read_speed, network_bandwidth')
+    query.add_argument('--collective', help='e.g. all_reduce')
+    query.add_argument('--size', type=parse_size, help='Message or block size, e.g. 256M')
+    query.add_argument('--host')
+    query.add_argument('--subject', help='GPU, client host or configuration the value belongs to')
+    query.add_argument('--uuid', help='Only values of this GPU (subject or peer), by nvidia-smi UUID')
+    query.add_argument('--days', type=float, help='Only runs from the last N days')
+    query.add_argument('--json', action='store_true', help='Print rows as JSON')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == 'import':
+        total = 0
+        for path in args.paths:
+            if not os.path.exists(path):
+                print(f"WARNING:  {path} not found")
+                continue
+            imported = import_path(conn, path, args.host)
+            total += imported
+            print(f"Imported {imported} run(s) from {path}")
+        print(f"SUCCESS: {total} new run(s) in {args.db}")
+        return
+
+    since = (datetime.now() - timedelta(days=args.days)).isoformat() if args.days else None
+    rows = query_measurements(conn, args.metric, args.test, args.collective, args.size, args.host,
+                              args.subject, since, args.uuid)
+    columns = ['timestamp', 'host', 'test', 'collective', 'size_bytes', 'subject', 'peer', 'value']
+    if args.json:
+        print(json.dumps([dict(zip(columns, row)) for row in rows], indent=2))
+        return
+    if not rows:
+        print("No matching measurements")
+        sys.exit(1)
+    host_width = max(len(row[1]) for row in rows)
+    for row in rows:
+        timestamp, host, test, collective, size_bytes, subject, peer, value = row
+        where = " ".join(str(part) for part in (collective, size_bytes and f"{size_bytes}B", subject,
+                                                peer and f"-> {peer}") if part)
+        print(f"{timestamp[:19]}  {host:<{host_width}}  {test:<18} {where:<40} {value:g}")
+
+
+if __name__ == "__main__":
+    main()
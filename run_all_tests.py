@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+GPU Benchmark v3 - Comprehensive Test Suite
+Runs the probes as a dependency graph, concurrently where their resources allow
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import NamedTuple, Tuple
+
+import link_model
+from results_dir import RESULTS_DIR_ENV
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Resource classes: at most one stage of an exclusive class runs at a time,
+# lightweight stages run alongside anything
+LIGHTWEIGHT = 'lightweight'
+GPU_EXCLUSIVE = 'gpu-exclusive'
+DISK_EXCLUSIVE = 'disk-exclusive'
+MEMORY_EXCLUSIVE = 'memory-exclusive'
+
+
+class Stage(NamedTuple):
+    """One probe of the suite"""
+    name: str
+    title: str
+    command: Tuple[str, ...]
+    resource: str
+    log: str
+    after: Tuple[str, ...] = ()
+
+
+STAGES = [
+    Stage('gpu_detection', 'GPU Hardware Detection', ('bash', 'detect_gpus.sh'),
+          LIGHTWEIGHT, 'gpu_detection.txt'),
+    Stage('vram_capacity', 'VRAM Capacity Analysis', ('python3', 'test_vram_capacity.py'),
+          LIGHTWEIGHT, 'vram_capacity.txt'),
+    Stage('cuda_version', 'CUDA Version Verification', ('python3', 'test_cuda_version.py'),
+          LIGHTWEIGHT, 'cuda_version.txt'),
+    Stage('gpu_topology', 'GPU Topology Analysis', ('bash', 'show_gpu_topology.sh'),
+          LIGHTWEIGHT, 'gpu_topology.txt'),
+    # NCCL needs the GPUs to itself, so it waits for the nvidia-smi probes
+    Stage('bandwidth', 'PCIe/NVLink Bandwidth Testing', ('python3', 'test_bandwidth.py'),
+          GPU_EXCLUSIVE, 'bandwidth_test.txt',
+          after=('gpu_detection', 'vram_capacity', 'cuda_version', 'gpu_topology')),
+    Stage('disk_read_speed', 'Storage Performance Testing', ('python3', 'test_disk_read_speed.py'),
+          DISK_EXCLUSIVE, 'disk_read_speed.txt'),
+    Stage('dataloader', 'Data Loader Throughput Testing', ('python3', 'test_dataloader.py'),
+          DISK_EXCLUSIVE, 'dataloader.txt', after=('gpu_detection',)),
+    Stage('checkpoint', 'Checkpoint Write/Read Testing', ('python3', 'test_checkpoint.py'),
+          DISK_EXCLUSIVE, 'checkpoint.txt', after=('gpu_detection',)),
+    # Saturating DRAM would skew NCCL's shared-memory paths and buffered disk reads
+    Stage('memory_bandwidth', 'Host Memory Bandwidth Testing', ('python3', 'test_memory_bandwidth.py'),
+          MEMORY_EXCLUSIVE, 'memory_bandwidth.txt', after=('gpu_detection', 'bandwidth', 'disk_read_speed', 'dataloader', 'checkpoint')),
+]
+
+
+def run_stage(stage, results_dir):
+    """Run one stage with its output in the results directory, returns its timing record"""
+    env = dict(os.environ, **{RESULTS_DIR_ENV: os.path.abspath(results_dir)})
+    log_path = os.path.join(results_dir, stage.log)
+    started = datetime.now().isoformat()
+    start_time = time.monotonic()
+    with open(log_path, 'w') as log:
+        try:
+            returncode = subprocess.run(list(stage.command), cwd=SCRIPT_DIR, env=env,
+                                        stdout=log, stderr=subprocess.STDOUT).returncode
+        except OSError as e:
+            log.write(f"ERROR: {e}\n")
+            returncode = -1
+    return {
+        'name': stage.name,
+        'resource': stage.resource,
+        'start': started,
+        'offset_seconds': None,
+        'duration_seconds': round(time.monotonic() - start_time, 2),
+        'returncode': returncode,
+        'log': stage.log
+    }
+
+
+def run_graph(stages, results_dir, serial=False, on_finish=None):
+    """Start every stage whose predecessors are done and whose resource is free
+
+    Predecessors that are not part of this run count as done. With serial,
+    stages run one at a time in declaration order.
+    """
+    names = {stage.name for stage in stages}
+    pending = list(stages)
+    done = set()
+    busy = set()
+    running = {}
+    records = []
+    suite_start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=len(stages) or 1) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if serial and running:
+                    break
+                ready = all(name in done for name in stage.after if name in names)
+                if not ready or stage.resource in busy:
+                    continue
+                if stage.resource != LIGHTWEIGHT:
+                    busy.add(stage.resource)
+                pending.remove(stage)
+                offset = round(time.monotonic() - suite_start, 2)
+                print(f"START: {stage.title} [{stage.resource}]")
+                running[executor.submit(run_stage, stage, results_dir)] = (stage, offset)
+
+            if not running:
+                raise ValueError(f"Stages wait on each other: {', '.join(stage.name for stage in pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, offset = running.pop(future)
+                record = future.result()
+                record['offset_seconds'] = offset
+                records.append(record)
+                done.add(stage.name)
+                busy.discard(stage.resource)
+                if on_finish:
+                    on_finish(stage, record)
+    return records
+
+
+def print_stage(stage, record, results_dir, position, total):
+    """Replay a finished stage's output, stages finish out of order when concurrent"""
+    print("")
+    print(f"[{position}/{total}] {stage.title} ({record['duration_seconds']:.1f}s"
+          f"{', exit code ' + str(record['returncode']) if record['returncode'] else ''})")
+    print("-" * (len(stage.title) + 8))
+    with open(os.path.join(results_dir, stage.log)) as f:
+        sys.stdout.write(f.read())
+    sys.stdout.flush()
+
+
+def load_json(results_dir, filename):
+    try:
+        with open(os.path.join(results_dir, filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def print_summary(results_dir, stages, records, total_seconds):
+    print("")
+    print("=" * 42)
+    print("SYSTEM PERFORMANCE ANALYSIS - SUMMARY")
+    print("=" * 42)
+    print(f"Test execution completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Results directory: {results_dir}")
+    print("")
+    print("PERFORMANCE METRICS SUMMARY:")
+    print("----------------------------")
+
+    detection = load_json(results_dir, 'gpu_detection_results.json')
+    if detection:
+        print(f"Total GPUs Detected: {detection.get('total_gpus', 'N/A')}")
+    vram = load_json(results_dir, 'vram_test_results.json')
+    if vram and vram.get('total_vram_gb') is not None:
+        print(f"Total GPU Memory: {vram['total_vram_gb']:.0f}GB")
+    cuda = load_json(results_dir, 'cuda_version_results.json')
+    if cuda:
+        print(f"CUDA Runtime Version: {cuda.get('cuda_version', 'N/A')}")
+    bandwidth = load_json(results_dir, 'bandwidth_test_results.json')
+    if bandwidth:
+        print("Inter-GPU Bandwidth (efficiency vs theoretical link peak):")
+        for line in link_model.summary_lines(bandwidth) or ["See detailed results in bandwidth_test.txt"]:
+            print(f"  {line}")
+    disk = load_json(results_dir, 'disk_read_speed_results.json')
+    if disk and disk.get('read_speed_mbps') is not None:
+        print(f"Storage Read Performance: {disk['read_speed_mbps']:.0f} MB/s")
+    loader = load_json(results_dir, 'dataloader_results.json')
+    if loader and loader.get('best'):
+        feed = loader['feed_rate']
+        print(f"Data Loader Throughput: {loader['best']['samples_per_sec']:,.0f} samples/s"
+              + (f" ({feed['verdict']}, {feed['required_samples_per_sec']:,} needed)" if feed['verdict'] else ""))
+    checkpoint = load_json(results_dir, 'checkpoint_results.json')
+    if checkpoint and checkpoint.get('modes'):
+        print(f"Checkpoint Write ({checkpoint['ranks']} ranks): " +
+              ", ".join(f"{mode} {result['write']['aggregate_mbps']:.0f} MB/s "
+                        f"(stall {result['write']['rank_seconds']['max']:.1f}s)"
+                        for mode, result in checkpoint['modes'].items() if 'error' not in result['write']))
+    memory = load_json(results_dir, 'memory_bandwidth_results.json')
+    if memory and memory.get('peaks'):
+        print("Host Memory Bandwidth (triad, local): " +
+              ", ".join(f"node {node} {peak['triad_gbps']:.0f} GB/s" for node, peak in memory['peaks'].items()))
+
+    print("")
+    print("STAGE TIMINGS:")
+    print("--------------")
+    by_name = {record['name']: record for record in records}
+    for stage in stages:
+        record = by_name[stage.name]
+        status = "ok" if record['returncode'] == 0 else f"exit {record['returncode']}"
+        print(f"{stage.name:<18} {stage.resource:<15} +{record['offset_seconds']:>7.1f}s "
+              f"{record['duration_seconds']:>8.1f}s  {status}")
+    serial_seconds = sum(record['duration_seconds'] for record in records)
+    print(f"Wall time: {total_seconds:.1f}s (stages sum to {serial_seconds:.1f}s)")
+
+    print("")
+    print("DETAILED RESULTS LOCATION:")
+    print("--------------------------")
+    for stage in stages:
+        print(f"* {stage.title}: {os.path.join(results_dir, stage.log)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPU Benchmark v3 - Comprehensive Test Suite")
+    parser.add_argument('--results-dir', help='Run directory (default: results_<timestamp>)')
+    parser.add_argument('--skip', nargs='+', default=[], choices=[stage.name for stage in STAGES],
+                        metavar='STAGE', help='Stages to leave out')
+    parser.add_argument('--serial', action='store_true', help='Run stages one at a time')
+    args = parser.parse_args()
+
+    print("GPU Benchmark v3 - Comprehensive Test Suite")
+    print("===========================================")
+    print(f"Test execution started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("")
+
+    results_dir = args.results_dir or f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    os.makedirs(results_dir, exist_ok=True)
+    stages = [stage for stage in STAGES if stage.name not in args.skip]
+
+    finished = []
+
+    def on_finish(stage, record):
+        finished.append(stage)
+        print_stage(stage, record, results_dir, len(finished), len(stages))
+
+    started = datetime.now().isoformat()
+    start_time = time.monotonic()
+    records = run_graph(stages, results_dir, args.serial, on_finish)
+    total_seconds = round(time.monotonic() - start_time, 2)
+
+    timings = {
+        'started': started,
+        'total_seconds': total_seconds,
+        'serial': args.serial,
+        'stages': sorted(records, key=lambda record: record['offset_seconds'])
+    }
+    with open(os.path.join(results_dir, 'stage_timings.json'), 'w') as f:
+        json.dump(timings, f, indent=2)
+
+    print_summary(results_dir, stages, records, total_seconds)
+    print("")
+    failed = [record['name'] for record in records if record['returncode'] != 0]
+    if failed:
+        print(f"WARNING:  Stages with errors: {', '.join(failed)}")
+    else:
+        print("Analysis completed successfully.")
+    print("==========================================")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
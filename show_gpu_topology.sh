@@ -18,5 +18,12 @@ echo "--------------------"
 # Run nvidia-smi topology
 nvidia-smi topo -m
 
+echo ""
+echo "Topology Recommendations:"
+echo "-------------------------"
+
+# Parse the matrix into a graph model, writes gpu_topology_results.json
+python3 gpu_topology.py
+
 echo ""
 echo "Topology analysis completed"
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+System Inventory - GPU Benchmark v3
+Subprocess-free host and PCI inventory read from /proc and /sys
+"""
+
+import os
+import json
+import glob
+import argparse
+
+# PCI base class 0x03 covers VGA (0x0300), XGA (0x0301), 3D (0x0302) and other display controllers
+PCI_CLASS_DISPLAY = 0x03
+PCI_VENDORS = {
+    0x10de: 'NVIDIA',
+    0x1002: 'AMD',
+    0x1022: 'AMD',
+    0x8086: 'Intel',
+    0x1a03: 'ASPEED',
+    0x102b: 'Matrox'
+}
+# Link speed in GT/s -> PCIe generation
+PCIE_GENERATIONS = {2.5: 1, 5.0: 2, 8.0: 3, 16.0: 4, 32.0: 5, 64.0: 6}
+PCI_IDS_PATHS = ['usr/share/misc/pci.ids', 'usr/share/hwdata/pci.ids', 'usr/share/pci.ids']
+
+
+def _read(root, path):
+    """Read a text file below root, None if missing or unreadable"""
+    try:
+        with open(os.path.join(root, path)) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_int(root, path, base=10):
+    value = _read(root, path)
+    try:
+        return int(value.strip(), base) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_cpulist(cpulist):
+    """Expand a kernel cpulist such as '0-15,32-47' into a list of CPU ids"""
+    cpus = []
+    for part in cpulist.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-')
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def read_os_release(root='/'):
+    """Parse /etc/os-release into a dict"""
+    text = _read(root, 'etc/os-release') or _read(root, 'usr/lib/os-release') or ''
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            values[key.strip()] = value.strip().strip('"\'')
+    return values
+
+
+def read_cpu_info(root='/'):
+    """CPU model, logical CPU count and socket count from /proc/cpuinfo"""
+    text = _read(root, 'proc/cpuinfo') or ''
+    model = None
+    logical = 0
+    sockets = set()
+    for line in text.splitlines():
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        key = key.strip()
+        if key == 'processor':
+            logical += 1
+        elif key == 'model name' and model is None:
+            model = ' '.join(value.split())
+        elif key == 'physical id':
+            sockets.add(value.strip())
+    return {
+        'model': model,
+        'logical_cpus': logical or None,
+        'sockets': len(sockets) or None
+    }
+
+
+def read_meminfo(root='/'):
+    """Parse /proc/meminfo into a dict of kB values"""
+    values = {}
+    for line in (_read(root, 'proc/meminfo') or '').splitlines():
+        key, sep, value = line.partition(':')
+        if sep:
+            try:
+                values[key.strip()] = int(value.split()[0])
+            except (ValueError, IndexError):
+                continue
+    return values
+
+
+def read_numa_nodes(root='/'):
+    """NUMA node id -> list of CPUs"""
+    nodes = {}
+    for path in glob.glob(os.path.join(root, 'sys/devices/system/node/node[0-9]*')):
+        node = int(os.path.basename(path)[4:])
+        cpulist = _read(path, 'cpulist')
+        nodes[node] = parse_cpulist(cpulist) if cpulist else []
+    return dict(sorted(nodes.items()))
+
+
+def get_system_info(root='/'):
+    """Host facts previously gathered with hostname/uname/cat/free pipelines"""
+    uname = os.uname()
+    hostname = _read(root, 'proc/sys/kernel/hostname')
+    kernel = _read(root, 'proc/sys/kernel/osrelease')
+    meminfo = read_meminfo(root)
+    cpu = read_cpu_info(root)
+    mem_total_kb = meminfo.get('MemTotal')
+
+    return {
+        'hostname': hostname.strip() if hostname else uname.nodename,
+        'kernel': kernel.strip() if kernel else uname.release,
+        'os': read_os_release(root).get('PRETTY_NAME'),
+        'cpu': cpu['model'],
+        'cpu_logical_count': cpu['logical_cpus'],
+        'cpu_sockets': cpu['sockets'],
+        # Same integer GiB figure `free -g` reports
+        'memory_gb': mem_total_kb // (1024 * 1024) if mem_total_kb else None,
+        'memory_total_kb': mem_total_kb,
+        'numa_nodes': len(read_numa_nodes(root)) or None
+    }
+
+
+def parse_link_speed(value):
+    """'16.0 GT/s PCIe' -> (16.0, 4)"""
+    if not value:
+        return None, None
+    try:
+        gts = float(value.split()[0])
+    except (ValueError, IndexError):
+        return None, None
+    return gts, PCIE_GENERATIONS.get(gts)
+
+
+def lookup_pci_names(ids, root='/'):
+    """Resolve (vendor, device) id pairs to names using pci.ids, if installed"""
+    wanted = {}
+    for vendor, device in ids:
+        wanted.setdefault(vendor, set()).add(device)
+    names = {}
+    for path in PCI_IDS_PATHS:
+        try:
+            f = open(os.path.join(root, path), encoding='utf-8', errors='replace')
+        except OSError:
+            continue
+        with f:
+            vendor = None
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                if not line.startswith('\t'):
+                    if line.startswith('C '):
+                        break  # device class section follows the vendor list
+                    try:
+                        vendor = int(line[:4], 16)
+                    except ValueError:
+                        vendor = None
+                        continue
+                    if vendor in wanted:
+                        names[(vendor, None)] = line[4:].strip()
+                elif vendor in wanted and not line.startswith('\t\t'):
+                    try:
+                        device = int(line[1:5], 16)
+                    except ValueError:
+                        continue
+                    if device in wanted[vendor]:
+                        names[(vendor, device)] = line[5:].strip()
+        break
+    return names
+
+
+def list_display_controllers(root='/', name_lookup=lookup_pci_names):
+    """Enumerate display/3D controllers from /sys/bus/pci/devices
+
+    Each entry carries vendor/device ids, NUMA node and the current and
+    maximum PCIe link speed and width. name_lookup resolves the ids to
+    names, probe_cache.lookup_pci_names skips the pci.ids scan on repeat runs.
+    """
+    devices = []
+    for path in sorted(glob.glob(os.path.join(root, 'sys/bus/pci/devices/*'))):
+        pci_class = _read_int(path, 'class', 16)
+        if pci_class is None or pci_class >> 16 != PCI_CLASS_DISPLAY:
+            continue
+
+        vendor_id = _read_int(path, 'vendor', 16)
+        device_id = _read_int(path, 'device', 16)
+        numa_node = _read_int(path, 'numa_node')
+        current_gts, current_gen = parse_link_speed(_read(path, 'current_link_speed'))
+        max_gts, max_gen = parse_link_speed(_read(path, 'max_link_speed'))
+
+        devices.append({
+            'pci_id': os.path.basename(path),
+            'vendor': PCI_VENDORS.get(vendor_id, 'Unknown'),
+            'vendor_id': f"0x{vendor_id:04x}" if vendor_id is not None else None,
+            'device_id': f"0x{device_id:04x}" if device_id is not None else None,
+            'class': f"0x{pci_class:06x}",
+            'numa_node': numa_node if numa_node is not None and numa_node >= 0 else None,
+            'pcie_link': {
+                'current_speed_gts': current_gts,
+                'current_gen': current_gen,
+                'current_width': _read_int(path, 'current_link_width'),
+                'max_speed_gts': max_gts,
+                'max_gen': max_gen,
+                'max_width': _read_int(path, 'max_link_width')
+            }
+        })
+
+    names = name_lookup([(int(d['vendor_id'], 16), int(d['device_id'], 16))
+                         for d in devices if d['vendor_id'] and d['device_id']], root)
+    for device in devices:
+        if device['vendor_id'] and device['device_id']:
+            vendor_id = int(device['vendor_id'], 16)
+            device_id = int(device['device_id'], 16)
+            vendor_name = names.get((vendor_id, None), device['vendor'])
+            device_name = names.get((vendor_id, device_id), f"Device {device_id:04x}")
+            device['name'] = f"{vendor_name} {device_name}"
+        else:
+            device['name'] = 'Unknown display controller'
+    return devices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subprocess-free system and PCI inventory")
+    parser.add_argument('--root', default='/', help='Filesystem root to read from, e.g. a fake sysfs tree')
+    args = parser.parse_args()
+    print(json.dumps({
+        'system_info': get_system_info(args.root),
+        'numa_nodes': read_numa_nodes(args.root),
+        'display_controllers': list_display_controllers(args.root)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
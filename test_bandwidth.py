@@ -8,41 +8,69 @@ import subprocess
 import json
 import re
 import os
+import math
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def run_command(cmd, cwd=None):
+import nvidia_smi
+import gpu_topology
+import link_model
+from gpu_telemetry import TelemetrySampler
+from results_dir import results_path
+
+NCCL_PATH = "nccl-tests/build"
+# Data rows start "size count type redop root", the out-of-place time comes next
+NCCL_TIME_COLUMN = 5
+
+# Adaptive sweep: sizes start at ADAPTIVE_START_BYTES and each window spans
+# WINDOW_FACTOR (four doublings) until busbw stops growing
+ADAPTIVE_START_BYTES = 1024
+ADAPTIVE_MAX_BYTES = 8 * 1024 ** 3
+WINDOW_FACTOR = 16
+MIN_REPEATS = 3
+MAX_REPEATS = 12
+CI_TOLERANCE = 0.05
+PLATEAU_TOLERANCE = 0.03
+PLATEAU_POINTS = 3
+T_CRITICAL_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+                 8: 2.306, 9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 15: 2.131, 20: 2.086, 30: 2.042}
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# Pairwise P2P matrix: one sendrecv run per GPU pair, latency from the
+# smallest size and bandwidth from the largest
+P2P_BINARY = "sendrecv_perf"
+P2P_MIN_BYTES = 8
+P2P_MAX_BYTES = 256 * 1024 ** 2
+P2P_FACTOR = 32
+
+def run_command(cmd, cwd=None, env=None):
     """Run command and return output"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=cwd)
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=cwd, env=env)
         return result.stdout, result.stderr, result.returncode
     except Exception as e:
         return None, str(e), -1
 
-def test_bandwidth():
+def test_bandwidth(adaptive=False, tolerance=CI_TOLERANCE, max_size=ADAPTIVE_MAX_BYTES,
+                   nccl_path=NCCL_PATH, collectives=True, pairwise=False, pairwise_mode='scheduled'):
     """Test bandwidth using NCCL tests"""
     print("STATUS: PCIe/NVLink Bandwidth Test")
     print("=" * 50)
     
     # Check if NCCL tests are available
-    nccl_path = "nccl-tests/build"
     if not os.path.exists(nccl_path):
         print("ERROR: NCCL tests not found. Please run ./setup.sh first")
         return
     
     # Get GPU count
-    gpu_count_cmd = "nvidia-smi --query-gpu=count --format=csv,noheader,nounits"
-    stdout, stderr, returncode = run_command(gpu_count_cmd)
-    
-    if returncode != 0:
+    gpus = nvidia_smi.get_snapshot().gpus
+    gpu_count = len(gpus)
+    if gpu_count == 0:
         print("ERROR: Failed to get GPU count")
         return
-    
-    try:
-        gpu_count = int(stdout.strip().split('\n')[0])
-        print(f"GPU: Detected {gpu_count} GPUs")
-    except:
-        print("ERROR: Failed to parse GPU count")
-        return
+    print(f"GPU: Detected {gpu_count} GPUs")
     
     # Run bandwidth tests
     tests = [
@@ -55,69 +83,279 @@ def test_bandwidth():
     results = {
         'timestamp': datetime.now().isoformat(),
         'gpu_count': gpu_count,
+        'sweep': 'adaptive' if adaptive else 'fixed',
         'tests': {}
     }
     
-    for test_name, test_binary in tests:
-        print(f"\nTESTING: Running {test_name} test...")
-        
+    # Sample clocks/power/throttling in the background so each collective
+    # can be checked for thermal or power throttling afterwards
+    sampler = TelemetrySampler()
+    if not sampler.start():
+        print("WARNING:  GPU telemetry unavailable, results will not include throttle data")
+        sampler = None
+    
+    try:
+        if collectives:
+            for test_name, test_binary in tests:
+                run_collective(test_name, test_binary, gpu_count, nccl_path, results, sampler,
+                               adaptive, tolerance, max_size)
+        if pairwise:
+            if sampler:
+                with sampler.phase('P2P matrix') as phase:
+                    results['p2p_matrix'] = run_pairwise(gpus, nccl_path, pairwise_mode)
+                results['p2p_matrix']['telemetry'] = phase.summary
+            else:
+                results['p2p_matrix'] = run_pairwise(gpus, nccl_path, pairwise_mode)
+    finally:
+        if sampler:
+            sampler.stop()
+    
+    # Compare against the theoretical peak of each link
+    link_model.annotate_results(results, gpus, gpu_topology.load_topology())
+    print("\nRESULTS: Link Efficiency")
+    for line in link_model.summary_lines(results):
+        print(f"   {line}")
+    for test_name, test in results['tests'].items():
+        if test.get('efficiency_percent') is not None and test['efficiency_percent'] < link_model.LOW_EFFICIENCY_PERCENT:
+            print(f"WARNING:  {test_name} reached only {test['efficiency_percent']:.0f}% of the link peak")
+    
+    # Save results
+    output = results_path('bandwidth_test_results.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    
+    print(f"\nRESULTS: Results saved to: {output}")
+    print("SUCCESS: Bandwidth test completed")
+
+def run_collective(test_name, test_binary, gpu_count, nccl_path, results, sampler=None,
+                   adaptive=False, tolerance=CI_TOLERANCE, max_size=ADAPTIVE_MAX_BYTES):
+    """Run one NCCL collective and record its results and telemetry"""
+    print(f"\nTESTING: Running {test_name} test...")
+    
+    if adaptive:
+        run = lambda: adaptive_sweep(test_binary, gpu_count, nccl_path, tolerance, max_size=max_size)
+    else:
         # Run test with multiple GPUs (smaller range for faster execution)
         cmd = f"./{test_binary} -b 1K -e 1M -f 2 -g {gpu_count}"
-        stdout, stderr, returncode = run_command(cmd, cwd=nccl_path)
-        
-        if returncode != 0:
-            print(f"ERROR: {test_name} test failed: {stderr}")
-            continue
-        
-        # Parse results
-        bandwidth_data, avg_bandwidth = parse_nccl_output(stdout)
+        run = lambda: run_command(cmd, cwd=nccl_path)
+    
+    if sampler:
+        with sampler.phase(test_name) as phase:
+            outcome = run()
+        telemetry = phase.summary
+    else:
+        outcome = run()
+        telemetry = None
+    
+    if adaptive:
+        curve, summary = outcome
+        if curve is None:
+            print(f"ERROR: {test_name} test failed: {summary}")
+            return
         results['tests'][test_name] = {
-            'bandwidth_data': bandwidth_data,
-            'avg_bus_bandwidth': avg_bandwidth
+            'bandwidth_data': curve,
+            'avg_bus_bandwidth': None,
+            'adaptive': summary,
+            'telemetry': telemetry
         }
-        
-        if bandwidth_data:
-            max_bw = max(bandwidth_data, key=lambda x: x['algbw'])
-            print(f"SUCCESS: {test_name}")
-            print(f"   Max Algorithm BW: {max_bw['algbw']:.2f} GB/s")
-            print(f"   Max Bus BW: {max_bw['busbw']:.2f} GB/s")
-            if avg_bandwidth:
-                print(f"   Average Bus BW: {avg_bandwidth:.2f} GB/s")
+        print(f"SUCCESS: {test_name} ({summary['runs']} runs, stopped on {summary['stop_reason']})")
+        print(f"   Saturated Bus BW: {summary['saturated_busbw']:.2f} GB/s")
+        if summary['half_bandwidth_size_bytes']:
+            print(f"   Half-Bandwidth Size: {summary['half_bandwidth_size_bytes']:,} bytes")
+        print(f"   Latency Floor: {summary['latency_floor_us']:.2f} us")
+        if summary['unconverged_sizes']:
+            print(f"WARNING:  {len(summary['unconverged_sizes'])} size(s) did not reach the "
+                  f"{tolerance:.0%} confidence tolerance")
+        warn_if_throttled(test_name, telemetry)
+        return
+    
+    stdout, stderr, returncode = outcome
+    if returncode != 0:
+        print(f"ERROR: {test_name} test failed: {stderr}")
+        return
+    
+    # Parse results
+    bandwidth_data, avg_bandwidth = parse_nccl_output(stdout)
+    results['tests'][test_name] = {
+        'bandwidth_data': bandwidth_data,
+        'avg_bus_bandwidth': avg_bandwidth,
+        'telemetry': telemetry
+    }
+    
+    if bandwidth_data:
+        max_bw = max(bandwidth_data, key=lambda x: x['algbw'])
+        print(f"SUCCESS: {test_name}")
+        print(f"   Max Algorithm BW: {max_bw['algbw']:.2f} GB/s")
+        print(f"   Max Bus BW: {max_bw['busbw']:.2f} GB/s")
+        if avg_bandwidth:
+            print(f"   Average Bus BW: {avg_bandwidth:.2f} GB/s")
+    else:
+        print(f"WARNING:  {test_name} - Could not parse bandwidth data")
+    
+    warn_if_throttled(test_name, telemetry)
+
+def warn_if_throttled(test_name, telemetry):
+    """Point out GPUs that spent part of a test in a slowdown state"""
+    throttled = [index for index, gpu in (telemetry or {}).get('gpus', {}).items()
+                 if gpu.get('throttled_fraction')]
+    if throttled:
+        print(f"WARNING:  GPU(s) {', '.join(throttled)} were throttled during {test_name}")
+
+def plan_pair_rounds(gpus, switch_groups=None):
+    """Schedule every GPU pair into rounds of concurrently runnable pairs
+
+    Pairs are taken in circle-method (round-robin tournament) order and
+    placed first-fit into the earliest round where they share no GPU and
+    no PCIe switch group with a pair already there, since such pairs would
+    contend for the same uplink.
+    """
+    players = list(gpus)
+    if len(players) % 2:
+        players.append(None)
+    n = len(players)
+    ordered_pairs = []
+    for _ in range(n - 1):
+        ordered_pairs.extend((players[i], players[n - 1 - i]) for i in range(n // 2)
+                             if players[i] is not None and players[n - 1 - i] is not None)
+        # Rotate every position but the first
+        players = [players[0], players[-1]] + players[1:-1]
+    
+    rounds = []
+    for pair in ordered_pairs:
+        resources = {('gpu', gpu) for gpu in pair}
+        if switch_groups:
+            resources |= {('switch', switch_groups[gpu]) for gpu in pair}
+        for round_ in rounds:
+            if not resources & round_['resources']:
+                round_['pairs'].append(pair)
+                round_['resources'] |= resources
+                break
         else:
-            print(f"WARNING:  {test_name} - Could not parse bandwidth data")
+            rounds.append({'pairs': [pair], 'resources': resources})
+    return [round_['pairs'] for round_ in rounds]
+
+def measure_pair(gpu_a, gpu_b, nccl_path):
+    """Run sendrecv between two GPUs pinned with CUDA_VISIBLE_DEVICES"""
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES=f"{gpu_a.uuid},{gpu_b.uuid}")
+    cmd = f"./{P2P_BINARY} -b {P2P_MIN_BYTES} -e {P2P_MAX_BYTES} -f {P2P_FACTOR} -g 2"
+    stdout, stderr, returncode = run_command(cmd, cwd=nccl_path, env=env)
+    rows = parse_nccl_output(stdout)[0] if returncode == 0 else []
+    if not rows:
+        return {'error': (stderr or 'no bandwidth data').strip()}
+    smallest = min(rows, key=lambda row: row['size_bytes'])
+    return {
+        'bandwidth_gbps': max(row['busbw'] for row in rows),
+        'latency_us': smallest['time_us']
+    }
+
+def run_pairwise(gpus, nccl_path, mode='scheduled'):
+    """Measure the N x N P2P bandwidth/latency matrix
+
+    'scheduled' runs pairs in switch-aware round-robin rounds; 'contention'
+    launches every pair at once to show the fully loaded fabric.
+    """
+    print(f"\nTESTING: Running pairwise P2P matrix ({mode})...")
+    indices = [gpu.index for gpu in gpus]
+    by_index = {gpu.index: gpu for gpu in gpus}
     
-    # Save results
-    with open('bandwidth_test_results.json', 'w') as f:
-        json.dump(results, f, indent=2)
+    topology = gpu_topology.load_topology()
+    switch_groups = None
+    if topology is not None:
+        groups = topology.switch_groups()
+        switch_groups = {index: groups.get(f"GPU{index}") for index in indices}
+        if None in switch_groups.values():
+            switch_groups = None
+    if switch_groups is None and mode == 'scheduled':
+        print("WARNING:  GPU topology unavailable, pairs are scheduled by GPU only")
     
-    print(f"\nRESULTS: Results saved to: bandwidth_test_results.json")
-    print("SUCCESS: Bandwidth test completed")
+    if mode == 'contention':
+        rounds = [[(a, b) for i, a in enumerate(indices) for b in indices[i + 1:]]]
+    else:
+        rounds = plan_pair_rounds(indices, switch_groups)
+    
+    position = {index: i for i, index in enumerate(indices)}
+    bandwidth = [[None] * len(indices) for _ in indices]
+    latency = [[None] * len(indices) for _ in indices]
+    errors = {}
+    round_seconds = []
+    start_time = time.time()
+    
+    for round_number, pairs in enumerate(rounds, 1):
+        round_start = time.time()
+        with ThreadPoolExecutor(max_workers=len(pairs)) as executor:
+            futures = {pair: executor.submit(measure_pair, by_index[pair[0]], by_index[pair[1]], nccl_path)
+                       for pair in pairs}
+            outcomes = {pair: future.result() for pair, future in futures.items()}
+        round_seconds.append(round(time.time() - round_start, 2))
+        
+        for (a, b), outcome in outcomes.items():
+            i, j = position[a], position[b]
+            if 'error' in outcome:
+                errors[f"{a}-{b}"] = outcome['error']
+                continue
+            # sendrecv drives both directions at once, so the matrix is symmetric
+            bandwidth[i][j] = bandwidth[j][i] = outcome['bandwidth_gbps']
+            latency[i][j] = latency[j][i] = outcome['latency_us']
+        print(f"   Round {round_number}/{len(rounds)}: "
+              f"{', '.join(f'{a}-{b}' for a, b in pairs)} ({round_seconds[-1]:.1f}s)")
+    
+    print("\nRESULTS: P2P Bandwidth Matrix (GB/s)")
+    print("      " + "".join(f"{index:>8}" for index in indices))
+    for i, index in enumerate(indices):
+        print(f"{index:>6}" + "".join(f"{'X':>8}" if i == j else
+                                       (f"{bw:>8.2f}" if bw is not None else f"{'ERR':>8}")
+                                       for j, bw in enumerate(bandwidth[i])))
+    
+    return {
+        'mode': mode,
+        'binary': P2P_BINARY,
+        'gpus': indices,
+        'bandwidth_gbps': bandwidth,
+        'latency_us': latency,
+        'rounds': [[list(pair) for pair in pairs] for pairs in rounds],
+        'round_seconds': round_seconds,
+        'total_seconds': round(time.time() - start_time, 2),
+        'switch_aware': switch_groups is not None,
+        'errors': errors
+    }
 
 def parse_nccl_output(output):
-    """Parse NCCL test output to extract bandwidth data"""
+    """Parse NCCL test output to extract bandwidth data
+
+    Every data row is returned, so runs with -N cycles yield one entry per
+    size and cycle. Times of 10 ms and more are printed without decimals
+    and #wrong is N/A when checking is off:
+
+    >>> rows, _ = parse_nccl_output(
+    ...     "   268435456      67108864     float     sum      -1    47012    5.71    9.99    N/A")
+    >>> rows[0]['time_us'], rows[0]['algbw'], rows[0]['busbw']
+    (47012.0, 5.71, 9.99)
+    """
     lines = output.split('\n')
     bandwidth_data = []
     avg_bandwidth = None
     
     for line in lines:
         # Parse data lines (not headers or comments)
-        if not line.startswith('#') and 'float' in line and 'sum' in line:
-            parts = line.split()
-            if len(parts) >= 8:
-                try:
-                    size_bytes = int(parts[0])
-                    time_us = float(parts[5])
-                    algbw = float(parts[6])
-                    busbw = float(parts[7])
-                    
-                    bandwidth_data.append({
-                        'size_bytes': size_bytes,
-                        'time_us': time_us,
-                        'algbw': algbw,
-                        'busbw': busbw
-                    })
-                except:
-                    continue
+        parts = line.split()
+        if not line.startswith('#') and len(parts) >= NCCL_TIME_COLUMN + 3 and parts[0].isdigit():
+            # Every test prints the size/count/type/redop/root prefix (none/-1
+            # where a collective has no reduction or root), out-of-place
+            # time/algbw/busbw follow it
+            try:
+                size_bytes = int(parts[0])
+                time_us = float(parts[NCCL_TIME_COLUMN])
+                algbw = float(parts[NCCL_TIME_COLUMN + 1])
+                busbw = float(parts[NCCL_TIME_COLUMN + 2])
+                
+                bandwidth_data.append({
+                    'size_bytes': size_bytes,
+                    'time_us': time_us,
+                    'algbw': algbw,
+                    'busbw': busbw
+                })
+            except ValueError:
+                continue
         
         # Parse average bandwidth line
         elif line.startswith('# Avg bus bandwidth'):
@@ -128,5 +366,171 @@ def parse_nccl_output(output):
     
     return bandwidth_data, avg_bandwidth
 
+def t_critical_95(dof):
+    """Two-sided 95% Student t critical value"""
+    if dof <= 0:
+        return float('inf')
+    if dof in T_CRITICAL_95:
+        return T_CRITICAL_95[dof]
+    return 2.0 if dof < 60 else 1.96
+
+def summarize_samples(samples):
+    """Mean, sample count and 95% CI half-width (relative) of busbw per size"""
+    curve = []
+    for size in sorted(samples):
+        rows = samples[size]
+        n = len(rows)
+        busbw = [row['busbw'] for row in rows]
+        mean_busbw = sum(busbw) / n
+        if n > 1:
+            variance = sum((b - mean_busbw) ** 2 for b in busbw) / (n - 1)
+            half_width = t_critical_95(n - 1) * math.sqrt(variance / n)
+        else:
+            half_width = float('inf')
+        relative = half_width / mean_busbw if mean_busbw > 0 else (0.0 if half_width == 0 else float('inf'))
+        curve.append({
+            'size_bytes': size,
+            'time_us': round(sum(row['time_us'] for row in rows) / n, 2),
+            'algbw': round(sum(row['algbw'] for row in rows) / n, 3),
+            'busbw': round(mean_busbw, 3),
+            'busbw_ci95': round(half_width, 3) if math.isfinite(half_width) else None,
+            'busbw_ci95_relative': round(relative, 4) if math.isfinite(relative) else None,
+            'repeats': n
+        })
+    return curve
+
+def is_converged(point, tolerance):
+    relative = point['busbw_ci95_relative']
+    return relative is not None and relative <= tolerance
+
+def has_plateaued(curve, tolerance=PLATEAU_TOLERANCE, points=PLATEAU_POINTS):
+    """True once busbw grew by less than tolerance over the last few sizes"""
+    if len(curve) < points:
+        return False
+    tail = [point['busbw'] for point in curve[-points:]]
+    return tail[-1] > 0 and (tail[-1] - tail[0]) / tail[-1] < tolerance
+
+def characterize_curve(curve, plateaued, points=PLATEAU_POINTS):
+    """Saturated busbw, half-bandwidth message size and latency floor"""
+    if not curve:
+        return {}
+    if plateaued:
+        saturated = sum(point['busbw'] for point in curve[-points:]) / points
+    else:
+        saturated = max(point['busbw'] for point in curve)
+    
+    half_size = None
+    previous = None
+    for point in curve:
+        if point['busbw'] >= saturated / 2:
+            if previous is None or previous['busbw'] >= point['busbw']:
+                half_size = point['size_bytes']
+            else:
+                # Interpolate in log(size) between the bracketing points
+                fraction = (saturated / 2 - previous['busbw']) / (point['busbw'] - previous['busbw'])
+                log_size = math.log2(previous['size_bytes']) + fraction * (
+                    math.log2(point['size_bytes']) - math.log2(previous['size_bytes']))
+                half_size = int(round(2 ** log_size))
+            break
+        previous = point
+    
+    return {
+        'saturated_busbw': round(saturated, 3),
+        'half_bandwidth_size_bytes': half_size,
+        'latency_floor_us': min(point['time_us'] for point in curve),
+        'plateaued': plateaued
+    }
+
+def adaptive_sweep(test_binary, gpu_count, nccl_path, tolerance=CI_TOLERANCE,
+                   start_size=ADAPTIVE_START_BYTES, max_size=ADAPTIVE_MAX_BYTES):
+    """Extend the message-size range until busbw plateaus
+
+    Each window of sizes is run with -N MIN_REPEATS cycles. Sizes whose
+    95% confidence interval is still wider than tolerance are re-run on
+    their own until they converge or hit MAX_REPEATS. The window then
+    moves up by WINDOW_FACTOR until the curve plateaus or max_size is
+    reached. Returns (curve, summary), or (None, error) if nothing ran.
+    """
+    samples = {}
+    runs = 0
+    stop_reason = 'max_size'
+    begin = start_size
+    
+    while begin <= max_size:
+        end = min(begin * WINDOW_FACTOR, max_size)
+        stdout, stderr, returncode = run_command(
+            f"./{test_binary} -b {begin} -e {end} -f 2 -g {gpu_count} -N {MIN_REPEATS}", cwd=nccl_path)
+        runs += 1
+        rows = parse_nccl_output(stdout)[0] if returncode == 0 else []
+        if not rows:
+            if not samples:
+                return None, stderr
+            # Usually out of memory at the top end, keep what we have
+            stop_reason = 'run_failed'
+            break
+        for row in rows:
+            samples.setdefault(row['size_bytes'], []).append(row)
+        
+        for point in summarize_samples(samples):
+            size = point['size_bytes']
+            if not begin <= size <= end:
+                continue
+            while not is_converged(point, tolerance) and point['repeats'] < MAX_REPEATS:
+                extra = min(MIN_REPEATS, MAX_REPEATS - point['repeats'])
+                stdout, stderr, returncode = run_command(
+                    f"./{test_binary} -b {size} -e {size} -g {gpu_count} -N {extra}", cwd=nccl_path)
+                runs += 1
+                rows = [row for row in parse_nccl_output(stdout)[0] if row['size_bytes'] == size] \
+                    if returncode == 0 else []
+                if not rows:
+                    break
+                samples[size].extend(rows)
+                point = summarize_samples({size: samples[size]})[0]
+        
+        curve = summarize_samples(samples)
+        if has_plateaued(curve):
+            stop_reason = 'plateau'
+            break
+        begin = end * 2
+    
+    curve = summarize_samples(samples)
+    summary = characterize_curve(curve, stop_reason == 'plateau')
+    summary.update({
+        'stop_reason': stop_reason,
+        'ci_tolerance': tolerance,
+        'unconverged_sizes': [point['size_bytes'] for point in curve if not is_converged(point, tolerance)],
+        'runs': runs
+    })
+    return curve, summary
+
+def parse_size(value):
+    """Parse a size with an optional K/M/G suffix (powers of 1024, like nccl-tests)"""
+    value = value.strip().upper()
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="PCIe/NVLink Bandwidth Test using NCCL tests")
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Extend message sizes until busbw plateaus, repeating sizes until their CI converges')
+    parser.add_argument('--tolerance', type=float, default=CI_TOLERANCE,
+                        help='Relative 95%% CI half-width each size must reach (default: %(default)s)')
+    parser.add_argument('--max-size', type=parse_size, default=ADAPTIVE_MAX_BYTES,
+                        help='Largest message size for the adaptive sweep, e.g. 8G (default: %(default)s bytes)')
+    parser.add_argument('--nccl-path', default=NCCL_PATH,
+                        help='Directory containing the *_perf binaries (default: %(default)s)')
+    parser.add_argument('--pairwise', action='store_true',
+                        help=f'Also measure the GPU pair P2P matrix with {P2P_BINARY}')
+    parser.add_argument('--pairwise-mode', choices=['scheduled', 'contention'], default='scheduled',
+                        help='scheduled: switch-aware concurrent rounds; contention: all pairs at once')
+    parser.add_argument('--no-collectives', action='store_true',
+                        help='Skip the all-GPU collective tests')
+    args = parser.parse_args()
+    test_bandwidth(adaptive=args.adaptive, tolerance=args.tolerance,
+                   max_size=args.max_size, nccl_path=args.nccl_path,
+                   collectives=not args.no_collectives, pairwise=args.pairwise,
+                   pairwise_mode=args.pairwise_mode)
+
 if __name__ == "__main__":
-    test_bandwidth()
+    main()
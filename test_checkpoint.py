@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Checkpoint Write/Read Test - GPU Benchmark v3
+N ranks write checkpoint shards at once and read them back, reporting aggregate bandwidth and the slowest rank
+"""
+
+import os
+import mmap
+import json
+import time
+import shutil
+import argparse
+import threading
+import multiprocessing
+from array import array
+from queue import Empty
+from datetime import datetime
+
+import nvidia_smi
+from results_dir import results_path
+from test_disk_read_speed import get_disk_info, read_file, percentile
+from test_small_files import drop_caches
+
+CHECKPOINT_DIR = "gpubench_checkpoint"
+DEFAULT_SHARD_MB = 1024
+# One rank per GPU when GPUs are visible, like a data-parallel job
+DEFAULT_RANKS = 8
+WRITE_MODES = ['buffered', 'direct', 'fallocate']
+WRITE_CHUNK = 16 * 1024 * 1024
+# Every 4 KiB block gets a unique stamp over random fill, so no block of the
+# shard repeats at any dedup granularity and none of it compresses
+STAMP_SIZE = 4096
+READ_BLOCK = 16 * 1024 * 1024
+# How often to check for a rank that died (OOM killer, signal) while waiting for records
+RECORD_POLL_SECONDS = 1
+# Error of the ranks released from the barrier because another rank failed
+ABORTED = "aborted after another rank failed"
+
+
+def fsync_directory(path):
+    """Make a rename durable, as torch.save-then-rename checkpointing relies on"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def open_for_write(path, mode):
+    """Open a shard for writing, returns (fd, io_mode); O_DIRECT falls back to buffered where rejected"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if mode == 'direct' and hasattr(os, 'O_DIRECT'):
+        try:
+            return os.open(path, flags | os.O_DIRECT, 0o644), 'direct'
+        except OSError:
+            # tmpfs and some network filesystems reject O_DIRECT
+            pass
+    return os.open(path, flags, 0o644), 'buffered'
+
+
+def source_buffer():
+    """One chunk of random fill in an anonymous mmap, so it is page aligned for O_DIRECT"""
+    block = mmap.mmap(-1, WRITE_CHUNK)
+    block.write(os.urandom(WRITE_CHUNK))
+    return block
+
+
+def write_shard(directory, rank, size_bytes, mode, block):
+    """Write one rank's shard from block to a temp name, fsync, rename into place and fsync the directory
+
+    Shard sizes are whole chunks so every O_DIRECT write stays aligned.
+    """
+    final_path = os.path.join(directory, f"rank-{rank:05d}.ckpt")
+    tmp_path = final_path + ".tmp"
+    view = memoryview(block)
+    words = view.cast('Q')
+    # One 8-byte slot at the start of every STAMP_SIZE block
+    stamps = words[::STAMP_SIZE // 8]
+    stamps_per_chunk = WRITE_CHUNK // STAMP_SIZE
+    timings = {}
+
+    start = time.perf_counter()
+    fd, io_mode = open_for_write(tmp_path, mode)
+    try:
+        if mode == 'fallocate':
+            os.posix_fallocate(fd, 0, size_bytes)
+        timings['open_seconds'] = time.perf_counter() - start
+        written = 0
+        stamp = rank << 32
+        while written < size_bytes:
+            stamps[:] = array('Q', range(stamp, stamp + stamps_per_chunk))
+            stamp += stamps_per_chunk
+            length = min(WRITE_CHUNK, size_bytes - written)
+            written += os.pwrite(fd, view[:length], written)
+        timings['write_seconds'] = time.perf_counter() - start - timings['open_seconds']
+        fsync_start = time.perf_counter()
+        os.fsync(fd)
+        timings['fsync_seconds'] = time.perf_counter() - fsync_start
+    finally:
+        os.close(fd)
+        stamps.release()
+        words.release()
+        view.release()
+    rename_start = time.perf_counter()
+    os.replace(tmp_path, final_path)
+    fsync_directory(directory)
+    timings['rename_seconds'] = time.perf_counter() - rename_start
+    return final_path, written, io_mode, timings
+
+
+def _write_rank(rank, directory, size_bytes, mode, barrier, results):
+    block = None
+    try:
+        # Filling the source buffer is setup, not checkpoint write time
+        block = source_buffer()
+        barrier.wait()
+        start = time.perf_counter()
+        path, written, io_mode, timings = write_shard(directory, rank, size_bytes, mode, block)
+        results.put({'rank': rank, 'start': start, 'end': time.perf_counter(), 'bytes': written,
+                     'io_mode': io_mode, **timings})
+    except threading.BrokenBarrierError:
+        results.put({'rank': rank, 'error': ABORTED})
+    except Exception as e:
+        barrier.abort()
+        results.put({'rank': rank, 'error': str(e)})
+    finally:
+        if block is not None:
+            block.close()
+
+
+def _read_rank(rank, path, barrier, results):
+    try:
+        barrier.wait()
+        start = time.perf_counter()
+        sample = read_file(path, READ_BLOCK)
+        results.put({'rank': rank, 'start': start, 'end': time.perf_counter(), 'bytes': sample['bytes_read'],
+                     'io_mode': sample['io_mode'], 'cache_cold': sample['cache_cold']})
+    except threading.BrokenBarrierError:
+        results.put({'rank': rank, 'error': ABORTED})
+    except Exception as e:
+        barrier.abort()
+        results.put({'rank': rank, 'error': str(e)})
+
+
+def run_ranks(target, args_for_rank, ranks):
+    """Start every rank at once behind a barrier, returns their records ordered by rank"""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(ranks)
+    results = context.Queue()
+    processes = [context.Process(target=target, args=args_for_rank(rank) + (barrier, results))
+                 for rank in range(ranks)]
+    for process in processes:
+        process.start()
+    records = {}
+    while len(records) < ranks:
+        try:
+            record = results.get(timeout=RECORD_POLL_SECONDS)
+            records[record['rank']] = record
+        except Empty:
+            # A rank that exits cleanly has always sent its record, even an error one
+            dead = [rank for rank, process in enumerate(processes)
+                    if process.exitcode not in (None, 0) and rank not in records]
+            if dead:
+                # Release the ranks still waiting for the dead one at the barrier
+                barrier.abort()
+            for rank in dead:
+                records[rank] = {'rank': rank, 'error': f"exited with code {processes[rank].exitcode} without a result"}
+    for process in processes:
+        process.join()
+    return [records[rank] for rank in range(ranks)]
+
+
+def summarize_phase(records):
+    """Aggregate bandwidth from first start to last finish, plus the per-rank time distribution"""
+    errors = [record for record in records if 'error' in record]
+    if errors:
+        first = next((record for record in errors if record['error'] != ABORTED), errors[0])
+        return {'error': f"rank {first['rank']}: {first['error']}", 'ranks': records}
+    start = min(record['start'] for record in records)
+    end = max(record['end'] for record in records)
+    total_bytes = sum(record['bytes'] for record in records)
+    for record in records:
+        record['seconds'] = round(record['end'] - record['start'], 3)
+        record['mbps'] = round(record['bytes'] / record['seconds'] / (1024 * 1024), 2) if record['seconds'] else 0.0
+        for key in ('open_seconds', 'write_seconds', 'fsync_seconds', 'rename_seconds'):
+            if key in record:
+                record[key] = round(record[key], 3)
+        del record['start'], record['end']
+    seconds = sorted(record['seconds'] for record in records)
+    slowest = max(records, key=lambda record: record['seconds'])
+    median = percentile(seconds, 0.50)
+    return {
+        'aggregate_mbps': round(total_bytes / (end - start) / (1024 * 1024), 2) if end > start else 0.0,
+        'wall_seconds': round(end - start, 3),
+        'rank_seconds': {
+            'p50': median,
+            'p99': percentile(seconds, 0.99),
+            'max': seconds[-1]
+        },
+        'slowest_rank': slowest['rank'],
+        # How much longer the job stalls than a typical rank needs
+        'straggler_factor': round(seconds[-1] / median, 2) if median else None,
+        'io_modes': sorted({record['io_mode'] for record in records}),
+        'ranks': records
+    }
+
+
+def test_checkpoint(target_dir=".", ranks=None, shard_mb=DEFAULT_SHARD_MB, modes=WRITE_MODES, keep=False):
+    """Write and read back one checkpoint per write mode"""
+    print("STORAGE: Checkpoint Write/Read Test")
+    print("===================================")
+    if ranks is None:
+        ranks = len(nvidia_smi.get_snapshot().gpus) or DEFAULT_RANKS
+    # Whole chunks keep every O_DIRECT write aligned
+    chunks = max(1, -(-shard_mb * 1024 * 1024 // WRITE_CHUNK))
+    shard_bytes = chunks * WRITE_CHUNK
+    checkpoint_bytes = ranks * shard_bytes
+
+    disk_info = get_disk_info(target_dir)
+    if not disk_info:
+        print("ERROR: Error: Could not get disk information")
+        return None
+    required_bytes = checkpoint_bytes + (100 * 1024 * 1024)  # 100MB buffer
+    if disk_info['free_bytes'] < required_bytes:
+        print("ERROR: Error: Insufficient disk space")
+        print(f"   Required: {required_bytes / (1024**3):.2f}GB")
+        print(f"   Available: {disk_info['free_gb']:.2f}GB")
+        return None
+    print(f"SUCCESS: Disk space check passed ({disk_info['free_gb']:.2f}GB available)")
+    print(f"   Checkpoint: {ranks} ranks x {shard_bytes / (1024**2):.0f}MB = {checkpoint_bytes / (1024**3):.2f}GB")
+
+    directory = os.path.join(target_dir, CHECKPOINT_DIR)
+    caches_dropped = True
+    results_by_mode = {}
+    try:
+        for mode in modes:
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+            os.makedirs(directory)
+            fsync_directory(directory)
+
+            print(f"\nTESTING: {mode} write (temp file, fsync, rename)")
+            write = summarize_phase(run_ranks(_write_rank, lambda rank: (rank, directory, shard_bytes, mode), ranks))
+            if 'error' in write:
+                print(f"ERROR: Error: {write['error']}")
+                results_by_mode[mode] = {'write': write}
+                continue
+            print(f"   Aggregate: {write['aggregate_mbps']:.1f} MB/s in {write['wall_seconds']:.2f}s "
+                  f"({', '.join(write['io_modes'])})")
+            print(f"   Rank time p50 {write['rank_seconds']['p50']:.2f}s, max {write['rank_seconds']['max']:.2f}s "
+                  f"(rank {write['slowest_rank']}, {write['straggler_factor']}x median)")
+            if mode == 'direct' and write['io_modes'] != ['direct']:
+                print("WARNING:  O_DIRECT not supported here, direct mode wrote through the page cache")
+
+            os.sync()
+            caches_dropped = drop_caches() and caches_dropped
+            paths = [os.path.join(directory, f"rank-{rank:05d}.ckpt") for rank in range(ranks)]
+            print("TESTING: Restart read-back")
+            read = summarize_phase(run_ranks(_read_rank, lambda rank: (rank, paths[rank]), ranks))
+            if 'error' in read:
+                print(f"ERROR: Error: {read['error']}")
+            else:
+                print(f"   Aggregate: {read['aggregate_mbps']:.1f} MB/s in {read['wall_seconds']:.2f}s, "
+                      f"slowest rank {read['slowest_rank']} {read['rank_seconds']['max']:.2f}s")
+            results_by_mode[mode] = {'write': write, 'read': read}
+    except OSError as e:
+        print(f"ERROR: Error: Checkpoint test failed: {e}")
+        return None
+    finally:
+        if not keep and os.path.exists(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print("\nRESULTS: Checkpoint stall (slowest rank write) by mode")
+    for mode, result in results_by_mode.items():
+        write = result['write']
+        if 'error' not in write:
+            read = result.get('read') or {}
+            print(f"   {mode:<10} write {write['aggregate_mbps']:>9.1f} MB/s, stall {write['rank_seconds']['max']:>7.2f}s"
+                  + (f" | read {read['aggregate_mbps']:>9.1f} MB/s" if 'aggregate_mbps' in read else ""))
+    if not caches_dropped:
+        print("\n   Cache drop skipped (no root privileges), read-back relies on O_DIRECT or fadvise")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'target_dir': os.path.abspath(target_dir),
+        'ranks': ranks,
+        'shard_bytes': shard_bytes,
+        'checkpoint_bytes': checkpoint_bytes,
+        'cache_cold': caches_dropped,
+        'modes': results_by_mode,
+        'disk_info': disk_info
+    }
+    output = results_path('checkpoint_results.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nSTORAGE: Results saved to: {output}")
+    print("SUCCESS: Checkpoint test completed")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel checkpoint write/read-back test")
+    parser.add_argument('--path', default='.', help='Directory to write the checkpoint in (default: %(default)s)')
+    parser.add_argument('--ranks', type=int, help=f'Writer processes (default: one per GPU, else {DEFAULT_RANKS})')
+    parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_MB,
+                        help='Shard size per rank in MB (default: %(default)s)')
+    parser.add_argument('--modes', nargs='+', choices=WRITE_MODES, default=WRITE_MODES,
+                        help='Write paths to test (default: all)')
+    parser.add_argument('--keep', action='store_true', help='Leave the last checkpoint on disk')
+    args = parser.parse_args()
+    test_checkpoint(args.path, args.ranks, args.shard_mb, args.modes, args.keep)
+
+
+if __name__ == "__main__":
+    main()
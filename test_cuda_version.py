@@ -4,44 +4,29 @@ CUDA Version Test - GPU Benchmark v3
 Tests and reports CUDA version information
 """
 
-import subprocess
 import json
-import re
+import argparse
 from datetime import datetime
 
-def run_command(cmd):
-    """Run command and return output"""
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        return result.stdout.strip() if result.returncode == 0 else None
-    except:
-        return None
+import nvidia_smi
+import probe_cache
+from results_dir import results_path
 
 def test_cuda_version():
     """Test CUDA version and related information"""
     print("🔥 CUDA Version Test")
     print("=" * 30)
     
-    # Get nvidia-smi output
-    nvidia_smi_output = run_command("nvidia-smi")
-    if not nvidia_smi_output:
-        print("❌ Error: nvidia-smi not available")
-        return
+    # Static per boot, so nvidia-smi and nvcc only run on a probe cache miss
+    cuda_version = probe_cache.get_cuda_version()
+    if cuda_version is None:
+        if not nvidia_smi.get_summary():
+            print("❌ Error: nvidia-smi not available")
+            return
+        cuda_version = "Unknown"
     
-    # Extract CUDA version
-    cuda_match = re.search(r'CUDA Version: (\d+\.\d+)', nvidia_smi_output)
-    cuda_version = cuda_match.group(1) if cuda_match else "Unknown"
-    
-    # Extract driver version
-    driver_match = re.search(r'Driver Version: ([\d.]+)', nvidia_smi_output)
-    driver_version = driver_match.group(1) if driver_match else "Unknown"
-    
-    # Check for NVCC
-    nvcc_output = run_command("nvcc --version")
-    nvcc_version = "Not installed"
-    if nvcc_output:
-        nvcc_match = re.search(r'release (\d+\.\d+)', nvcc_output)
-        nvcc_version = nvcc_match.group(1) if nvcc_match else "Unknown"
+    driver_version = probe_cache.get_driver_version() or "Unknown"
+    nvcc_version = probe_cache.get_nvcc_version() or "Not installed"
     
     # Display results
     print(f"✅ CUDA Version: {cuda_version}")
@@ -57,11 +42,17 @@ def test_cuda_version():
         'nvcc_available': nvcc_version != "Not installed"
     }
     
-    with open('cuda_version_results.json', 'w') as f:
+    output = results_path('cuda_version_results.json')
+    with open(output, 'w') as f:
         json.dump(results, f, indent=2)
     
-    print(f"\n💾 Results saved to: cuda_version_results.json")
+    print(f"\n💾 Results saved to: {output}")
     print("✅ CUDA version test completed")
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="CUDA, driver and NVCC version report")
+    parser.parse_args()
     test_cuda_version()
+
+if __name__ == "__main__":
+    main()
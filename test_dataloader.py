@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Data Loader Throughput Test - GPU Benchmark v3
+Streams a sharded dataset through read -> decode -> batch workers and compares samples/sec with the GPUs' feed rate
+"""
+
+import os
+import json
+import time
+import zlib
+import queue
+import itertools
+import random
+import struct
+import shutil
+import argparse
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from datetime import datetime
+
+import nvidia_smi
+from results_dir import results_path
+from test_disk_read_speed import get_disk_info, drop_file_cache, percentile
+from test_small_files import drop_caches
+
+DATASET_DIR = "gpubench_loader_dataset"
+MANIFEST_FILE = "manifest.json"
+DATASET_VERSION = 1
+DEFAULT_DATASET_MB = 2048
+DEFAULT_SHARD_MB = 128
+# Decoded sample: one 3x224x224 uint8 image, the usual ImageNet training crop
+DEFAULT_SAMPLE_BYTES = 3 * 224 * 224
+DEFAULT_BATCH_SIZE = 64
+# Distinct encoded samples written round-robin, keeps dataset generation disk-bound
+ENCODED_POOL = 256
+# Decoded bytes draw from this many values, which compresses them to roughly 75%
+SAMPLE_ALPHABET = 64
+RECORD_HEADER = struct.Struct('<I')
+READ_BUFFER_BYTES = 4 * 1024 * 1024
+WORKER_COUNTS = [1, 2, 4, 8, 16]
+PREFETCH_DEPTHS = [2]
+DEFAULT_DURATION = 5.0
+# Rough per-GPU training input rate of an image model (ResNet-50 class) with mixed precision
+DEFAULT_SAMPLES_PER_GPU = 2500
+DECODERS = ['zlib', 'none']
+MODES = ['process', 'thread']
+
+
+# Dataset
+
+def encoded_pool(sample_bytes, seed=0):
+    """Compressed samples written round-robin into the shards"""
+    rng = random.Random(seed)
+    alphabet = bytes(range(SAMPLE_ALPHABET))
+    pool = []
+    for _ in range(ENCODED_POOL):
+        raw = bytes(rng.choices(alphabet, k=sample_bytes))
+        pool.append(zlib.compress(raw, 1))
+    return pool
+
+
+def read_manifest(dataset_dir):
+    try:
+        with open(os.path.join(dataset_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def dataset_matches(manifest, dataset_dir, size_mb, shard_mb, sample_bytes):
+    """Reuse an existing dataset when it was built with the same parameters and is complete"""
+    if not manifest or manifest.get('version') != DATASET_VERSION:
+        return False
+    if (manifest.get('size_mb'), manifest.get('shard_mb'), manifest.get('sample_bytes')) != \
+            (size_mb, shard_mb, sample_bytes):
+        return False
+    for shard in manifest.get('shards', []):
+        path = os.path.join(dataset_dir, shard['file'])
+        if not os.path.exists(path) or os.path.getsize(path) != shard['bytes']:
+            return False
+    return bool(manifest.get('shards'))
+
+
+def build_dataset(dataset_dir, size_mb, shard_mb, sample_bytes):
+    """Write length-prefixed compressed records into shard files, then the manifest"""
+    if os.path.exists(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    os.makedirs(dataset_dir)
+    pool = encoded_pool(sample_bytes)
+    shard_bytes = shard_mb * 1024 * 1024
+    remaining = size_mb * 1024 * 1024
+    shards = []
+    record = 0
+    start_time = time.time()
+    while remaining > 0:
+        name = f"shard-{len(shards):05d}.bin"
+        written = 0
+        samples = 0
+        with open(os.path.join(dataset_dir, name), 'wb', buffering=READ_BUFFER_BYTES) as f:
+            while written < min(shard_bytes, remaining):
+                payload = pool[record % len(pool)]
+                f.write(RECORD_HEADER.pack(len(payload)))
+                f.write(payload)
+                written += RECORD_HEADER.size + len(payload)
+                samples += 1
+                record += 1
+            f.flush()
+            os.fsync(f.fileno())
+        shards.append({'file': name, 'bytes': written, 'samples': samples})
+        remaining -= written
+
+    manifest = {
+        'version': DATASET_VERSION,
+        'size_mb': size_mb,
+        'shard_mb': shard_mb,
+        'sample_bytes': sample_bytes,
+        'samples': sum(shard['samples'] for shard in shards),
+        'encoded_bytes_mean': round(sum(len(payload) for payload in pool) / len(pool)),
+        'shards': shards,
+        'build_seconds': round(time.time() - start_time, 2)
+    }
+    with open(os.path.join(dataset_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# Pipeline
+
+def read_records(path):
+    """Yield the encoded records of one shard, evicting it from the page cache first"""
+    with open(path, 'rb', buffering=READ_BUFFER_BYTES) as f:
+        drop_file_cache(f.fileno())
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            (length,) = RECORD_HEADER.unpack(header)
+            yield f.read(length)
+
+
+def loader_worker(worker_id, shard_paths, decoder, sample_bytes, batch_size, buffer,
+                  free_slots, ready, stop):
+    """Read, decode and collate samples straight into shared-memory batch slots
+
+    Forked workers inherit the shared mapping, so only the slot number and
+    counters travel through the queues and the batch is never pickled.
+    """
+    batch_bytes = batch_size * sample_bytes
+    try:
+        records = (record for path in itertools.cycle(shard_paths) for record in read_records(path))
+        while not stop.is_set():
+            try:
+                slot = free_slots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            busy_start = time.perf_counter()
+            base = slot * batch_bytes
+            encoded_bytes = 0
+            for index in range(batch_size):
+                record = next(records)
+                encoded_bytes += len(record)
+                sample = zlib.decompress(record) if decoder == 'zlib' else record
+                offset = base + index * sample_bytes
+                length = min(len(sample), sample_bytes)
+                buffer[offset:offset + length] = sample[:length]
+            ready.put((worker_id, slot, batch_size, encoded_bytes, time.perf_counter() - busy_start))
+    except Exception as e:
+        ready.put((worker_id, None, 0, 0, str(e)))
+
+
+def run_config(shard_paths, workers, prefetch, mode, decoder, sample_bytes, batch_size, duration):
+    """Consume batches as fast as the pipeline delivers them for duration seconds"""
+    slots = workers * prefetch
+    segment = shared_memory.SharedMemory(create=True, size=slots * batch_size * sample_bytes)
+    if mode == 'process':
+        context = multiprocessing.get_context('fork')
+        free_slots, ready, stop = context.Queue(), context.Queue(), context.Event()
+        spawn = context.Process
+    else:
+        free_slots, ready, stop = queue.Queue(), queue.Queue(), threading.Event()
+        spawn = threading.Thread
+    for slot in range(slots):
+        free_slots.put(slot)
+
+    # Shards are dealt round-robin, like a sharded IterableDataset
+    assignments = [shard_paths[i::workers] for i in range(workers)]
+    start_time = time.perf_counter()
+    pool = [spawn(target=loader_worker, args=(i, assignments[i], decoder, sample_bytes, batch_size,
+                                              segment.buf, free_slots, ready, stop), daemon=True)
+            for i in range(workers)]
+    for worker in pool:
+        worker.start()
+
+    waits = []
+    busy = [0.0] * workers
+    samples = encoded_bytes = 0
+    first_batch = None
+    error = None
+    deadline = start_time + duration
+    try:
+        while time.perf_counter() < deadline:
+            wait_start = time.perf_counter()
+            try:
+                worker_id, slot, count, batch_encoded, busy_seconds = ready.get(timeout=max(1.0, duration))
+            except queue.Empty:
+                error = "No batch within the timeout"
+                break
+            now = time.perf_counter()
+            if slot is None:
+                error = busy_seconds
+                break
+            if first_batch is None:
+                first_batch = now
+            else:
+                waits.append((now - wait_start) * 1e6)
+                samples += count
+                encoded_bytes += batch_encoded
+            busy[worker_id] += busy_seconds
+            free_slots.put(slot)
+    finally:
+        stop.set()
+        end_time = time.perf_counter()
+        for worker in pool:
+            worker.join(timeout=5)
+            if mode == 'process' and worker.is_alive():
+                worker.terminate()
+        segment.close()
+        segment.unlink()
+
+    measured = end_time - first_batch if first_batch else 0
+    elapsed = end_time - start_time
+    waits.sort()
+    return {
+        'workers': workers,
+        'prefetch': prefetch,
+        'mode': mode,
+        'samples': samples,
+        'seconds': round(measured, 3),
+        'samples_per_sec': round(samples / measured, 1) if measured > 0 else 0.0,
+        'read_mbps': round(encoded_bytes / measured / (1024 * 1024), 2) if measured > 0 else 0.0,
+        'first_batch_ms': round((first_batch - start_time) * 1000, 1) if first_batch else None,
+        'batch_wait_us': {
+            'p50': round(percentile(waits, 0.50), 1) if waits else None,
+            'p99': round(percentile(waits, 0.99), 1) if waits else None
+        },
+        'worker_utilization': round(sum(busy) / (workers * elapsed), 3) if elapsed > 0 else None,
+        'error': error
+    }
+
+
+def required_feed_rate(samples_per_gpu):
+    """Samples/sec the detected GPUs consume, (gpu count, rate)"""
+    gpus = len(nvidia_smi.get_snapshot().gpus)
+    return gpus, gpus * samples_per_gpu
+
+
+def test_dataloader(target_dir=".", size_mb=DEFAULT_DATASET_MB, shard_mb=DEFAULT_SHARD_MB,
+                    sample_bytes=DEFAULT_SAMPLE_BYTES, batch_size=DEFAULT_BATCH_SIZE,
+                    worker_counts=WORKER_COUNTS, prefetch_depths=PREFETCH_DEPTHS, mode='process',
+                    decoder='zlib', duration=DEFAULT_DURATION, samples_per_gpu=DEFAULT_SAMPLES_PER_GPU,
+                    rebuild=False):
+    """Sweep worker count and prefetch depth over a persistent sharded dataset"""
+    print("STORAGE: Data Loader Throughput Test")
+    print("====================================")
+    dataset_dir = os.path.join(target_dir, DATASET_DIR)
+
+    manifest = read_manifest(dataset_dir)
+    reused = not rebuild and dataset_matches(manifest, dataset_dir, size_mb, shard_mb, sample_bytes)
+    if reused:
+        print(f"SUCCESS: Reusing existing {size_mb}MB dataset ({dataset_dir})")
+    else:
+        disk_info = get_disk_info(target_dir)
+        required_bytes = size_mb * 1024 * 1024 + (100 * 1024 * 1024)  # 100MB buffer
+        if not disk_info or disk_info['free_bytes'] < required_bytes:
+            print("ERROR: Error: Insufficient disk space for the dataset")
+            return None
+        print(f"CREATING: Writing {size_mb}MB dataset in {shard_mb}MB shards ({dataset_dir})...")
+        manifest = build_dataset(dataset_dir, size_mb, shard_mb, sample_bytes)
+        print(f"SUCCESS: {manifest['samples']:,} samples in {len(manifest['shards'])} shards "
+              f"({manifest['build_seconds']:.1f}s)")
+    shard_paths = [os.path.join(dataset_dir, shard['file']) for shard in manifest['shards']]
+
+    gpu_count, required = required_feed_rate(samples_per_gpu)
+    caches_dropped = drop_caches()
+    print(f"   Sample: {sample_bytes:,} bytes decoded, ~{manifest['encoded_bytes_mean']:,} encoded ({decoder}), "
+          f"batch {batch_size}, {mode} workers, {duration:.0f}s per config")
+    if gpu_count:
+        print(f"   Required feed rate: {required:,} samples/s ({gpu_count} GPUs x {samples_per_gpu:,})")
+
+    # A worker without a shard of its own would only re-read another worker's shards
+    if max(worker_counts) > len(shard_paths):
+        print(f"WARNING:  Only {len(shard_paths)} shards, worker counts capped at {len(shard_paths)}")
+        worker_counts = list(dict.fromkeys(min(workers, len(shard_paths)) for workers in worker_counts))
+
+    print(f"\n   {'workers':>7} {'prefetch':>8} {'samples/s':>11} {'MB/s':>9} {'wait p50':>10} "
+          f"{'wait p99':>10} {'util':>6}")
+    configs = []
+    for workers in worker_counts:
+        for prefetch in prefetch_depths:
+            caches_dropped = drop_caches() and caches_dropped
+            result = run_config(shard_paths, workers, prefetch, mode, decoder, sample_bytes, batch_size, duration)
+            configs.append(result)
+            if result['error']:
+                print(f"   {workers:>7} {prefetch:>8} ERROR: {result['error']}")
+                continue
+            print(f"   {workers:>7} {prefetch:>8} {result['samples_per_sec']:>11,.0f} {result['read_mbps']:>9.1f} "
+                  f"{result['batch_wait_us']['p50'] or 0:>8.0f}us {result['batch_wait_us']['p99'] or 0:>8.0f}us "
+                  f"{result['worker_utilization'] or 0:>6.0%}")
+
+    valid = [config for config in configs if not config['error']]
+    best = max(valid, key=lambda config: config['samples_per_sec']) if valid else None
+    if not caches_dropped:
+        print("\n   Cache drop skipped (no root privileges), shards were evicted with fadvise only")
+
+    verdict = None
+    if best:
+        print(f"\nRESULTS: Best {best['samples_per_sec']:,.0f} samples/s with {best['workers']} workers, "
+              f"prefetch {best['prefetch']}")
+        if gpu_count:
+            headroom = best['samples_per_sec'] / required
+            verdict = 'sufficient' if headroom >= 1 else 'starved'
+            print(f"   {headroom:.0%} of the {required:,} samples/s the {gpu_count} GPUs need")
+            if headroom < 1:
+                print(f"WARNING:  Input pipeline cannot feed {gpu_count} GPUs at {samples_per_gpu:,} samples/s each")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'target_dir': os.path.abspath(target_dir),
+        'dataset': {key: manifest[key] for key in ('size_mb', 'shard_mb', 'sample_bytes', 'samples',
+                                                   'encoded_bytes_mean')},
+        'dataset_reused': reused,
+        'batch_size': batch_size,
+        'mode': mode,
+        'decoder': decoder,
+        'duration_seconds': duration,
+        'cache_cold': caches_dropped,
+        'configs': configs,
+        'best': best,
+        'feed_rate': {
+            'gpus': gpu_count,
+            'samples_per_gpu': samples_per_gpu,
+            'required_samples_per_sec': required,
+            'verdict': verdict
+        }
+    }
+    output = results_path('dataloader_results.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nSTORAGE: Results saved to: {output}")
+    print("SUCCESS: Data loader test completed")
+    return results
+
+
+def parse_int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data loader (read -> decode -> batch) throughput test")
+    parser.add_argument('--path', default='.', help='Directory to keep the dataset in (default: %(default)s)')
+    parser.add_argument('--size-mb', type=int, default=DEFAULT_DATASET_MB,
+                        help='Dataset size in MB (default: %(default)s)')
+    parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_MB, help='Shard size in MB (default: %(default)s)')
+    parser.add_argument('--sample-bytes', type=int, default=DEFAULT_SAMPLE_BYTES,
+                        help='Decoded sample size (default: %(default)s, a 224x224 RGB image)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Samples per batch (default: %(default)s)')
+    parser.add_argument('--workers', type=parse_int_list, default=WORKER_COUNTS,
+                        help='Comma separated worker counts (default: %(default)s)')
+    parser.add_argument('--prefetch', type=parse_int_list, default=PREFETCH_DEPTHS,
+                        help='Comma separated batches in flight per worker (default: %(default)s)')
+    parser.add_argument('--mode', choices=MODES, default='process', help='Worker type (default: %(default)s)')
+    parser.add_argument('--decoder', choices=DECODERS, default='zlib', help='Decode step (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help='Seconds per configuration (default: %(default)s)')
+    parser.add_argument('--samples-per-gpu', type=int, default=DEFAULT_SAMPLES_PER_GPU,
+                        help='Samples/sec one GPU consumes (default: %(default)s)')
+    parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset even if it matches')
+    args = parser.parse_args()
+    test_dataloader(args.path, args.size_mb, args.shard_mb, args.sample_bytes, args.batch_size, args.workers,
+                    args.prefetch, args.mode, args.decoder, args.duration, args.samples_per_gpu, args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,69 @@
 #!/usr/bin/env python3
 """
 Disk Read Speed Test - GPU Benchmark v3
-Measures disk read throughput using dd command
+Measures cache-cold disk read throughput with an in-process read engine
 """
 
 import os
+import re
+import mmap
+import random
+import shlex
 import subprocess
 import time
 import json
 import shutil
+import argparse
+import multiprocessing
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from results_dir import results_path
+
+# Block sizes swept by the read engine (4K to 16M)
+READ_BLOCK_SIZES = [4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024,
+                    1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024]
+# Block size used for the headline full-file read (same as the old dd bs=1M)
+HEADLINE_BLOCK_SIZE = 1024 * 1024
+# Upper bound on bytes read per block-size sample, keeps 4K O_DIRECT passes short
+SWEEP_SAMPLE_BYTES = 256 * 1024 * 1024
+
+# Persistent test dataset, reused across runs while its header still matches
+DATASET_FILE = "gpubench_dataset.dat"
+DATASET_MAGIC = b"GPUBENCH-DATASET"
+DATASET_VERSION = 2
+DATASET_HEADER_SIZE = 4096
+DATASET_CHUNK_SIZE = 1024 * 1024
+# Every filesystem block gets its own stamp so no block of the dataset repeats
+DATASET_STAMP_SIZE = 4096
+DATASET_WRITE_SIZE = 16 * 1024 * 1024
+DEFAULT_DATASET_MB = 1024
+
+# Parallel mode: access pattern -> (block size, random offsets)
+ACCESS_PATTERNS = {
+    'seq': (1024 * 1024, False),
+    'rand4k': (4 * 1024, True),
+    'rand128k': (128 * 1024, True)
+}
+PARALLEL_WORKERS = [1, 8, 32, 64]
+PARALLEL_QUEUE_DEPTHS = [1, 4]
+PARALLEL_ENGINES = ['pread', 'mmap']
+PARALLEL_DURATION = 2.0
+
+# Mount survey: filesystems worth staging data on, found in /proc/mounts
+SURVEY_FSTYPES = {
+    'ext2', 'ext3', 'ext4', 'xfs', 'btrfs', 'zfs', 'f2fs', 'bcachefs',
+    'nfs', 'nfs4', 'lustre', 'gpfs', 'beegfs', 'cifs', 'smb3', 'ceph', 'fuse.ceph', 'glusterfs',
+    'fuse.glusterfs', 'fuse.juicefs', 'wekafs', 'tmpfs'
+}
+# tmpfs is only interesting outside the runtime/system trees
+SYSTEM_MOUNT_PREFIXES = ('/proc', '/sys', '/run', '/dev', '/boot', '/snap', '/var/lib/docker', '/var/snap')
+SCRATCH_TMPFS = ('/dev/shm', '/tmp')
+SURVEY_DIR = ".gpubench_survey"
+SURVEY_DATASET_MB = 1024
+SURVEY_WORKERS = 8
+
 def run_command(cmd, shell=True):
     """Run command and return output"""
     try:
@@ -34,56 +87,605 @@ def get_disk_info(path="."):
     except:
         return None
 
-def test_disk_read_speed():
-    """Test disk read speed"""
+def physical_memory_bytes():
+    """Total physical memory in bytes, or None if unknown"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def dataset_size_bytes(size_mb=None, ram_multiple=None):
+    """Resolve the dataset size, rounded up to whole chunks"""
+    if ram_multiple is not None:
+        ram_bytes = physical_memory_bytes()
+        if ram_bytes is None:
+            raise ValueError("Could not determine physical memory size")
+        size_bytes = int(ram_bytes * ram_multiple)
+    else:
+        size_bytes = (size_mb or DEFAULT_DATASET_MB) * 1024 * 1024
+    chunks = max(1, -(-size_bytes // DATASET_CHUNK_SIZE))
+    return chunks * DATASET_CHUNK_SIZE
+
+def build_dataset_header(size_bytes):
+    """Header block: magic followed by a JSON description, zero padded"""
+    description = json.dumps({
+        'version': DATASET_VERSION,
+        'size_bytes': size_bytes,
+        'chunk_size': DATASET_CHUNK_SIZE
+    }, sort_keys=True).encode()
+    header = DATASET_MAGIC + b"\n" + description + b"\n"
+    return header.ljust(DATASET_HEADER_SIZE, b"\0")
+
+def read_dataset_header(path):
+    """Return the parsed dataset header, or None if the file is not a dataset"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(DATASET_HEADER_SIZE)
+    except OSError:
+        return None
+    if not header.startswith(DATASET_MAGIC + b"\n"):
+        return None
+    try:
+        description = header[len(DATASET_MAGIC) + 1:].split(b"\n", 1)[0]
+        return json.loads(description)
+    except ValueError:
+        return None
+
+def dataset_is_valid(path, size_bytes):
+    """Check a dataset on disk against the requested size and header signature"""
+    try:
+        if os.path.getsize(path) != size_bytes:
+            return False
+    except OSError:
+        return False
+    header = read_dataset_header(path)
+    return (header is not None
+            and header.get('version') == DATASET_VERSION
+            and header.get('size_bytes') == size_bytes
+            and header.get('chunk_size') == DATASET_CHUNK_SIZE)
+
+def write_dataset(path, size_bytes):
+    """Write the dataset in-process and time it as a sequential write
+
+    One block of random bytes is generated up front and rewritten for every
+    write call. Every 4 KiB block is stamped with a running index, so the
+    data stays incompressible and no block repeats at any deduplication
+    granularity. The fsync is timed separately so buffered and durable
+    throughput are both reported.
+    """
+    block = bytearray(os.urandom(DATASET_WRITE_SIZE))
+    view = memoryview(block)
+    stamps = view.cast('Q')[::DATASET_STAMP_SIZE // 8]
+    header = build_dataset_header(size_bytes)
+    tmp_path = path + ".partial"
+
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        written = 0
+        stamp = 0
+        start_time = time.perf_counter()
+        while written < size_bytes:
+            length = min(DATASET_WRITE_SIZE, size_bytes - written)
+            stamps[:] = array('Q', range(stamp, stamp + len(stamps)))
+            stamp += len(stamps)
+            if written == 0:
+                block[:DATASET_HEADER_SIZE] = header
+            written += os.write(fd, view[:length])
+        write_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        os.fsync(fd)
+        fsync_time = time.perf_counter() - start_time
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, path)
+
+    total_time = write_time + fsync_time
+    mb = written / (1024 * 1024)
+    return {
+        'bytes_written': written,
+        'write_seconds': round(write_time, 3),
+        'fsync_seconds': round(fsync_time, 3),
+        'total_seconds': round(total_time, 3),
+        'buffered_speed_mbps': round(mb / write_time, 2) if write_time > 0 else 0.0,
+        'write_speed_mbps': round(mb / total_time, 2) if total_time > 0 else 0.0
+    }
+
+def drop_file_cache(fd):
+    """Evict a file's pages from the page cache, returns True on success"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+
+def evict_range(fd, offset, length, mm=None):
+    """Drop one byte range from the page cache (and a mapping's page tables), True on success"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    try:
+        if mm is not None:
+            # Mapped pages stay cached while page tables still reference them
+            mm.madvise(mmap.MADV_DONTNEED, offset, length)
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        return True
+    except (OSError, ValueError, AttributeError):
+        return False
+
+def open_for_read(path, direct=True):
+    """Open a file for reading, preferring O_DIRECT
+
+    Returns (fd, io_mode) where io_mode is 'direct' when the page cache is
+    bypassed and 'buffered' otherwise.
+    """
+    if direct and hasattr(os, 'O_DIRECT'):
+        try:
+            return os.open(path, os.O_RDONLY | os.O_DIRECT), 'direct'
+        except OSError:
+            # tmpfs and some network filesystems reject O_DIRECT
+            pass
+    return os.open(path, os.O_RDONLY), 'buffered'
+
+def read_file(path, block_size, max_bytes=None, direct=True):
+    """Read a file sequentially in-process and time it
+
+    The destination buffer is an anonymous mmap, which is page aligned as
+    O_DIRECT requires. Without O_DIRECT the file is evicted with
+    posix_fadvise(DONTNEED) before the timed loop. cache_cold records
+    whether either mechanism was in effect for this sample.
+    """
+    fd, io_mode = open_for_read(path, direct)
+    buf = mmap.mmap(-1, block_size)
+    try:
+        file_size = os.fstat(fd).st_size
+        limit = file_size if max_bytes is None else min(file_size, max_bytes)
+        cache_cold = io_mode == 'direct' or drop_file_cache(fd)
+
+        bytes_read = 0
+        start_time = time.perf_counter()
+        while bytes_read < limit:
+            n = os.preadv(fd, [buf], bytes_read)
+            if n <= 0:
+                break
+            bytes_read += n
+        elapsed = time.perf_counter() - start_time
+    except OSError:
+        if io_mode != 'direct':
+            raise
+        # Some filesystems accept O_DIRECT at open() but fail the read
+        os.close(fd)
+        fd = None
+        buf.close()
+        return read_file(path, block_size, max_bytes, direct=False)
+    finally:
+        if fd is not None:
+            os.close(fd)
+        if not buf.closed:
+            buf.close()
+
+    return {
+        'block_size_bytes': block_size,
+        'bytes_read': bytes_read,
+        'time_seconds': round(elapsed, 4),
+        'speed_mbps': round(bytes_read / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0.0,
+        'io_mode': io_mode,
+        'cache_cold': cache_cold
+    }
+
+def sweep_block_sizes(path, block_sizes=READ_BLOCK_SIZES, max_bytes=SWEEP_SAMPLE_BYTES, direct=True):
+    """Run one cache-cold read sample per block size"""
+    samples = []
+    for block_size in block_sizes:
+        sample = read_file(path, block_size, max_bytes=max_bytes, direct=direct)
+        samples.append(sample)
+        cold = "cold" if sample['cache_cold'] else "WARM"
+        print(f"   {block_size // 1024:>6}K: {sample['speed_mbps']:>10.2f} MB/s ({sample['io_mode']}, {cold})")
+    return samples
+
+def _read_stream(path, block_size, random_access, stream_index, stream_count, duration, engine, direct):
+    """Issue back-to-back reads for a fixed duration, one outstanding I/O
+
+    Sequential streams each own a contiguous slice of the file, random
+    streams pick block-aligned offsets across the whole file. Without
+    O_DIRECT a sequential stream evicts its slice before wrapping around,
+    so every pass is read from the device; random streams revisit blocks
+    and are only cache-cold with O_DIRECT. Like read_file, an O_DIRECT read
+    that fails after a successful open is retried buffered.
+    Returns (bytes_read, elapsed_seconds, latencies_us, io_mode, cache_cold).
+    """
+    latencies = array('d')
+    bytes_read = 0
+    mm = buf = None
+    retry_buffered = False
+
+    if engine == 'mmap':
+        fd = os.open(path, os.O_RDONLY)
+        io_mode = 'mmap'
+    else:
+        fd, io_mode = open_for_read(path, direct)
+        buf = mmap.mmap(-1, block_size)
+
+    try:
+        file_size = os.fstat(fd).st_size
+        block_count = max(1, file_size // block_size)
+        if engine == 'mmap':
+            mm = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+
+        rng = random.Random(stream_index)
+        slice_blocks = max(1, block_count // stream_count)
+        first_block = (stream_index * slice_blocks) % block_count
+        next_block = 0
+        slice_end = min(first_block + slice_blocks, block_count)
+        cache_cold = io_mode == 'direct' or not random_access
+
+        evict = False
+        paused = 0.0
+        start_time = time.perf_counter()
+        deadline = start_time + duration
+        now = start_time
+        while now < deadline:
+            if evict:
+                # The next pass must come from the device again; eviction is not timed
+                cache_cold = evict_range(fd, first_block * block_size,
+                                         (slice_end - first_block) * block_size, mm) and cache_cold
+                resumed = time.perf_counter()
+                paused += resumed - now
+                deadline += resumed - now
+                now = resumed
+                evict = False
+            if random_access:
+                offset = rng.randrange(block_count) * block_size
+            else:
+                offset = ((first_block + next_block) % block_count) * block_size
+                next_block = (next_block + 1) % slice_blocks
+                evict = next_block == 0 and io_mode != 'direct'
+
+            if mm is not None:
+                n = len(mm[offset:offset + block_size])
+            else:
+                n = os.preadv(fd, [buf], offset)
+
+            end = time.perf_counter()
+            latencies.append((end - now) * 1e6)
+            bytes_read += n
+            now = end
+        elapsed = now - start_time - paused
+    except OSError:
+        if io_mode != 'direct':
+            raise
+        # Some filesystems accept O_DIRECT at open() but fail the read
+        retry_buffered = True
+    finally:
+        if mm is not None:
+            mm.close()
+        if buf is not None:
+            buf.close()
+        os.close(fd)
+
+    if retry_buffered:
+        return _read_stream(path, block_size, random_access, stream_index, stream_count, duration, engine, False)
+    return bytes_read, elapsed, latencies, io_mode, cache_cold
+
+def _run_worker(args):
+    """Run queue_depth concurrent streams for one worker
+
+    Each in-flight I/O is a blocking reader thread, so a worker with
+    queue depth Q keeps Q requests outstanding against the device.
+    """
+    path, block_size, random_access, worker_index, workers, queue_depth, duration, engine, direct = args
+    stream_count = workers * queue_depth
+    with ThreadPoolExecutor(max_workers=queue_depth) as executor:
+        futures = [executor.submit(_read_stream, path, block_size, random_access,
+                                   worker_index * queue_depth + q, stream_count,
+                                   duration, engine, direct)
+                   for q in range(queue_depth)]
+        results = [future.result() for future in futures]
+    return results
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+def run_parallel_config(path, pattern, workers, queue_depth, engine='pread',
+                        worker_type='thread', duration=PARALLEL_DURATION, direct=True):
+    """Benchmark one workers x queue depth x pattern x engine configuration"""
+    block_size, random_access = ACCESS_PATTERNS[pattern]
+
+    # Start every configuration from a cold cache
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        cache_cold = drop_file_cache(fd)
+    finally:
+        os.close(fd)
+
+    worker_args = [(path, block_size, random_access, w, workers, queue_depth, duration, engine, direct)
+                   for w in range(workers)]
+    if worker_type == 'process':
+        with multiprocessing.Pool(processes=workers) as pool:
+            worker_results = pool.map(_run_worker, worker_args)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            worker_results = list(executor.map(_run_worker, worker_args))
+
+    streams = [stream for worker in worker_results for stream in worker]
+    total_bytes = sum(stream[0] for stream in streams)
+    elapsed = max(stream[1] for stream in streams)
+    io_mode = streams[0][3]
+    latencies = sorted(lat for stream in streams for lat in stream[2])
+    ops = len(latencies)
+
+    return {
+        'pattern': pattern,
+        'block_size_bytes': block_size,
+        'engine': engine,
+        'io_mode': io_mode,
+        'worker_type': worker_type,
+        'workers': workers,
+        'queue_depth': queue_depth,
+        # Every stream must have stayed cold too, random buffered/mmap reads revisit cached blocks
+        'cache_cold': all(stream[4] for stream in streams) and (io_mode == 'direct' or cache_cold),
+        'duration_seconds': round(elapsed, 3),
+        'operations': ops,
+        'iops': round(ops / elapsed, 1) if elapsed > 0 else 0.0,
+        'throughput_mbps': round(total_bytes / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0.0,
+        'latency_us': {
+            'p50': round(percentile(latencies, 0.50), 1) if ops else None,
+            'p99': round(percentile(latencies, 0.99), 1) if ops else None,
+            'p999': round(percentile(latencies, 0.999), 1) if ops else None
+        }
+    }
+
+def sweep_parallel(path, workers_list=PARALLEL_WORKERS, queue_depths=PARALLEL_QUEUE_DEPTHS,
+                   patterns=list(ACCESS_PATTERNS), engines=PARALLEL_ENGINES,
+                   worker_type='thread', duration=PARALLEL_DURATION, direct=True):
+    """Sweep worker count, queue depth, access pattern and read engine"""
+    configs = []
+    print(f"   {'pattern':<9} {'engine':<6} {'workers':>7} {'qd':>3} {'IOPS':>10} {'MB/s':>10} "
+          f"{'p50 us':>9} {'p99 us':>9} {'p999 us':>9}  cache")
+    for pattern in patterns:
+        for engine in engines:
+            for workers in workers_list:
+                for queue_depth in queue_depths:
+                    config = run_parallel_config(path, pattern, workers, queue_depth, engine,
+                                                 worker_type, duration, direct)
+                    configs.append(config)
+                    lat = config['latency_us']
+                    print(f"   {pattern:<9} {engine:<6} {workers:>7} {queue_depth:>3} "
+                          f"{config['iops']:>10.0f} {config['throughput_mbps']:>10.2f} "
+                          f"{lat['p50'] or 0:>9.1f} {lat['p99'] or 0:>9.1f} {lat['p999'] or 0:>9.1f}  "
+                          f"{'cold' if config['cache_cold'] else 'WARM'}")
+    return configs
+
+def drop_page_cache():
+    """Best effort drop of the page cache, returns True when it worked"""
+    try:
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3')
+        return True
+    except OSError:
+        return False
+
+def read_mounts(path='/proc/mounts'):
+    """Mounted filesystems as dicts with device, mountpoint, fstype and options"""
+    mounts = []
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return mounts
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        # Spaces and tabs in mount points are octal escaped
+        mountpoint = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+        mounts.append({
+            'device': fields[0],
+            'mountpoint': mountpoint,
+            'fstype': fields[2],
+            'options': fields[3].split(',')
+        })
+    return mounts
+
+def mount_for_path(path, mounts):
+    """The mount a path lives on: the longest mount point that prefixes it"""
+    path = os.path.realpath(path)
+    matches = [mount for mount in mounts
+               if path == mount['mountpoint'] or path.startswith(mount['mountpoint'].rstrip('/') + '/')]
+    return max(matches, key=lambda mount: len(mount['mountpoint']), default=None)
+
+def discover_mounts(mounts=None):
+    """Writable data filesystems, one mount point per device (bind mounts dropped)"""
+    mounts = read_mounts() if mounts is None else mounts
+    candidates = []
+    seen_devices = set()
+    for mount in sorted(mounts, key=lambda mount: len(mount['mountpoint'])):
+        mountpoint = mount['mountpoint']
+        if mount['fstype'] not in SURVEY_FSTYPES or 'ro' in mount['options']:
+            continue
+        if mountpoint not in SCRATCH_TMPFS and mountpoint.startswith(SYSTEM_MOUNT_PREFIXES):
+            continue
+        # tmpfs instances all share the device name "tmpfs"
+        key = mountpoint if mount['fstype'] == 'tmpfs' else mount['device']
+        if key in seen_devices or not os.access(mountpoint, os.W_OK):
+            continue
+        seen_devices.add(key)
+        candidates.append(mountpoint)
+    return candidates
+
+def prepare_survey_dataset(directory, size_bytes):
+    """Reuse or write the survey dataset below directory, returns (path, write result or None)"""
+    survey_dir = os.path.join(directory, SURVEY_DIR)
+    os.makedirs(survey_dir, exist_ok=True)
+    path = os.path.join(survey_dir, DATASET_FILE)
+    if dataset_is_valid(path, size_bytes):
+        return path, None
+    disk_info = get_disk_info(survey_dir)
+    existing = os.path.getsize(path) if os.path.exists(path) else 0
+    if not disk_info or disk_info['free_bytes'] + existing < size_bytes + 100 * 1024 * 1024:
+        raise OSError("insufficient space for the survey dataset")
+    return path, write_dataset(path, size_bytes)
+
+def survey_mounts(directories, size_mb=SURVEY_DATASET_MB, workers=SURVEY_WORKERS,
+                  duration=PARALLEL_DURATION, keep=False):
+    """Read bandwidth of each directory's mount alone and of all of them at once
+
+    Alone, each mount gets a single-stream cache-cold read and a parallel
+    sequential read with workers streams. Then the parallel read runs on
+    every mount at the same time, which shows shared bottlenecks (NIC,
+    HBA, memory bandwidth) as contended bandwidth below the solo figure.
+    """
+    mounts = read_mounts()
+    size_bytes = dataset_size_bytes(size_mb)
+    entries = []
+    for directory in directories:
+        mount = mount_for_path(directory, mounts) or {}
+        entry = {
+            'path': os.path.abspath(directory),
+            'mountpoint': mount.get('mountpoint'),
+            'fstype': mount.get('fstype'),
+            'device': mount.get('device'),
+            'disk_info': get_disk_info(directory)
+        }
+        try:
+            entry['dataset'], entry['write'] = prepare_survey_dataset(directory, size_bytes)
+        except OSError as e:
+            entry['error'] = str(e)
+            print(f"   {directory}: skipped ({e})")
+        entries.append(entry)
+    ready = [entry for entry in entries if 'error' not in entry]
+
+    print(f"   {'mount':<28} {'fstype':<8} {'1 stream':>10} {str(workers) + ' streams':>11}")
+    for entry in ready:
+        drop_page_cache()
+        try:
+            single = read_file(entry['dataset'], HEADLINE_BLOCK_SIZE)
+            parallel = run_parallel_config(entry['dataset'], 'seq', workers, 1, duration=duration)
+        except OSError as e:
+            entry['error'] = str(e)
+            print(f"   {entry['path']:<28} ERROR: {e}")
+            continue
+        entry['single_stream_mbps'] = single['speed_mbps']
+        entry['alone_mbps'] = parallel['throughput_mbps']
+        entry['io_mode'] = single['io_mode']
+        entry['cache_cold'] = single['cache_cold'] and parallel['cache_cold']
+        print(f"   {entry['path']:<28} {entry['fstype'] or '?':<8} {entry['single_stream_mbps']:>10.1f} "
+              f"{entry['alone_mbps']:>11.1f}")
+    ready = [entry for entry in ready if 'error' not in entry]
+
+    aggregate = None
+    if len(ready) > 1:
+        print(f"TESTING: All {len(ready)} mounts at once ({workers} streams each)...")
+        drop_page_cache()
+        with ThreadPoolExecutor(max_workers=len(ready)) as executor:
+            futures = [executor.submit(run_parallel_config, entry['dataset'], 'seq', workers, 1,
+                                       duration=duration) for entry in ready]
+            for entry, future in zip(ready, futures):
+                try:
+                    entry['contended_mbps'] = future.result()['throughput_mbps']
+                except OSError as e:
+                    entry['contended_mbps'] = None
+                    entry['error'] = str(e)
+        contended = [entry['contended_mbps'] for entry in ready if entry.get('contended_mbps') is not None]
+        aggregate = round(sum(contended), 2)
+        for entry in ready:
+            if entry.get('contended_mbps') is not None and entry['alone_mbps']:
+                entry['contention_ratio'] = round(entry['contended_mbps'] / entry['alone_mbps'], 3)
+                print(f"   {entry['path']:<28} {entry['contended_mbps']:>10.1f} MB/s contended "
+                      f"({entry['contention_ratio']:.0%} of alone)")
+        print(f"   Aggregate: {aggregate:.1f} MB/s (sum of solo runs {sum(e['alone_mbps'] for e in ready):.1f} MB/s)")
+
+    if not keep:
+        for entry in entries:
+            shutil.rmtree(os.path.join(entry['path'], SURVEY_DIR), ignore_errors=True)
+            entry.pop('dataset', None)
+
+    ranking = sorted((entry for entry in entries if entry.get('alone_mbps') is not None),
+                     key=lambda entry: entry['alone_mbps'], reverse=True)
+    for rank, entry in enumerate(ranking, 1):
+        entry['rank'] = rank
+    return {
+        'dataset_size_bytes': size_bytes,
+        'workers': workers,
+        'duration_seconds': duration,
+        'aggregate_mbps': aggregate,
+        'ranking': [entry['path'] for entry in ranking],
+        'mounts': ranking + [entry for entry in entries if entry.get('alone_mbps') is None]
+    }
+
+def test_disk_read_speed(parallel=False, workers_list=PARALLEL_WORKERS,
+                         queue_depths=PARALLEL_QUEUE_DEPTHS, patterns=list(ACCESS_PATTERNS),
+                         engines=PARALLEL_ENGINES, worker_type='thread',
+                         duration=PARALLEL_DURATION, dataset_path=DATASET_FILE,
+                         size_mb=None, ram_multiple=None, rebuild=False, keep_dataset=True,
+                         mounts=None, survey_size_mb=SURVEY_DATASET_MB, survey_workers=SURVEY_WORKERS,
+                         keep_survey=False):
+    """Test disk read speed, optionally followed by the parallel I/O sweep"""
     print("STORAGE: Disk Read Speed Test")
     print("=======================")
     
-    temp_file = "temp_test_file_1gb.dat"
-    test_size_mb = 1024
-    test_size_bytes = test_size_mb * 1024 * 1024
+    try:
+        test_size_bytes = dataset_size_bytes(size_mb, ram_multiple)
+    except ValueError as e:
+        print(f"ERROR: Error: {e}")
+        return
+    test_size_mb = test_size_bytes // (1024 * 1024)
+    dataset_dir = os.path.dirname(os.path.abspath(dataset_path))
+    reuse = not rebuild and dataset_is_valid(dataset_path, test_size_bytes)
     
     # Check disk space
     print("STATUS: Checking disk space...")
-    disk_info = get_disk_info()
+    disk_info = get_disk_info(dataset_dir)
     if not disk_info:
         print("ERROR: Error: Could not get disk information")
         return
     
-    required_bytes = test_size_bytes + (100 * 1024 * 1024)  # 100MB buffer
-    if disk_info['free_bytes'] < required_bytes:
-        print(f"ERROR: Error: Insufficient disk space")
-        print(f"   Required: {required_bytes / (1024**3):.2f}GB")
-        print(f"   Available: {disk_info['free_gb']:.2f}GB")
-        return
+    if not reuse:
+        required_bytes = test_size_bytes + (100 * 1024 * 1024)  # 100MB buffer
+        if os.path.exists(dataset_path):
+            required_bytes -= os.path.getsize(dataset_path)
+        if disk_info['free_bytes'] < required_bytes:
+            print(f"ERROR: Error: Insufficient disk space")
+            print(f"   Required: {required_bytes / (1024**3):.2f}GB")
+            print(f"   Available: {disk_info['free_gb']:.2f}GB")
+            return
     
     print(f"SUCCESS: Disk space check passed ({disk_info['free_gb']:.2f}GB available)")
     
     # Cleanup function
     def cleanup():
-        if os.path.exists(temp_file):
-            print("CLEANUP: Cleaning up temporary file...")
-            os.remove(temp_file)
+        if not keep_dataset and os.path.exists(dataset_path):
+            print("CLEANUP: Removing test dataset...")
+            os.remove(dataset_path)
     
     try:
-        # Create test file
-        print("CREATING: Creating 1GB test file with random data...")
-        print("   This may take a moment...")
-        
-        start_time = time.time()
-        stdout, stderr, returncode = run_command(f"dd if=/dev/urandom of={temp_file} bs=1M count={test_size_mb}")
-        
-        if returncode != 0:
-            print(f"ERROR: Error: Failed to create test file: {stderr}")
-            return
-        
-        create_time = time.time() - start_time
-        print(f"SUCCESS: Test file created successfully ({create_time:.2f}s)")
-        
-        # Sync to ensure data is written to disk
-        os.sync()
+        write_result = None
+        if reuse:
+            print(f"SUCCESS: Reusing existing {test_size_mb}MB test dataset ({dataset_path})")
+        else:
+            print(f"CREATING: Writing {test_size_mb}MB test dataset ({dataset_path})...")
+            print("   This may take a moment...")
+            try:
+                write_result = write_dataset(dataset_path, test_size_bytes)
+            except OSError as e:
+                print(f"ERROR: Error: Failed to create test dataset: {e}")
+                return
+            print(f"SUCCESS: Test dataset written ({write_result['total_seconds']:.2f}s)")
+            print(f"   Write speed: {write_result['write_speed_mbps']:.2f} MB/s "
+                  f"(buffered {write_result['buffered_speed_mbps']:.2f} MB/s, "
+                  f"fsync {write_result['fsync_seconds']:.2f}s)")
         
-        # Clear filesystem cache (best effort)
+        # Clear filesystem cache (best effort), the read engine evicts the
+        # test file itself when O_DIRECT is unavailable
         print("PROCESSING: Clearing filesystem cache...")
         try:
             with open('/proc/sys/vm/drop_caches', 'w') as f:
@@ -93,18 +695,35 @@ def test_disk_read_speed():
         
         # Perform read test
         print("TESTING: Performing read speed test...")
-        print("   Reading 1GB file...")
-        
-        start_time = time.time()
-        stdout, stderr, returncode = run_command(f"dd if={temp_file} of=/dev/null bs=1M")
-        read_time = time.time() - start_time
+        print(f"   Reading {test_size_mb}MB dataset...")
         
-        if returncode != 0:
-            print(f"ERROR: Error: Read test failed: {stderr}")
+        try:
+            headline = read_file(dataset_path, HEADLINE_BLOCK_SIZE)
+        except OSError as e:
+            print(f"ERROR: Error: Read test failed: {e}")
             return
         
-        # Calculate speed
-        speed_mbps = test_size_bytes / read_time / (1024 * 1024)
+        read_time = headline['time_seconds']
+        speed_mbps = headline['speed_mbps']
+        
+        if not headline['cache_cold']:
+            print("WARNING:  Page cache could not be bypassed, result may reflect RAM speed")
+        
+        print("TESTING: Sweeping read block sizes...")
+        block_sweep = sweep_block_sizes(dataset_path)
+        
+        parallel_sweep = None
+        if parallel:
+            print(f"TESTING: Parallel read sweep ({worker_type} workers, {duration:g}s per configuration)...")
+            parallel_sweep = sweep_parallel(dataset_path, workers_list, queue_depths, patterns,
+                                            engines, worker_type, duration)
+        
+        mount_survey = None
+        if mounts is not None:
+            directories = discover_mounts() if mounts == ['auto'] else mounts
+            print(f"TESTING: Surveying {len(directories)} mount(s): {', '.join(directories)}")
+            mount_survey = survey_mounts(directories, survey_size_mb, survey_workers, duration,
+                                         keep=keep_survey)
         
         # Display results
         print("")
@@ -113,6 +732,7 @@ def test_disk_read_speed():
         print(f"File size: {test_size_mb}MB ({test_size_bytes:,} bytes)")
         print(f"Read time: {read_time:.2f}s")
         print(f"Read speed: {speed_mbps:.2f} MB/s")
+        print(f"I/O mode: {headline['io_mode']} ({'cache-cold' if headline['cache_cold'] else 'cache-warm'})")
         
         # Performance classification
         if speed_mbps > 500:
@@ -135,7 +755,7 @@ def test_disk_read_speed():
         print(f"Available space: {disk_info['free_gb']:.2f}GB")
         
         # Get filesystem info
-        stdout, stderr, returncode = run_command("df -T .")
+        stdout, stderr, returncode = run_command(f"df -T {shlex.quote(dataset_dir)}")
         if returncode == 0:
             lines = stdout.strip().split('\n')
             if len(lines) >= 2:
@@ -150,18 +770,102 @@ def test_disk_read_speed():
             'test_size_bytes': test_size_bytes,
             'read_time_seconds': round(read_time, 2),
             'read_speed_mbps': round(speed_mbps, 2),
+            'read_io_mode': headline['io_mode'],
+            'dataset': {
+                'path': os.path.abspath(dataset_path),
+                'size_bytes': test_size_bytes,
+                'reused': reuse
+            },
+            'write': write_result,
+            'read_cache_cold': headline['cache_cold'],
+            'block_size_sweep': block_sweep,
             'performance_category': performance,
             'disk_info': disk_info
         }
+        if parallel_sweep is not None:
+            results['parallel_sweep'] = parallel_sweep
+        if mount_survey is not None:
+            results['mount_survey'] = mount_survey
+            print("")
+            print("RESULTS: Mount ranking (parallel sequential read, alone):")
+            for entry in mount_survey['mounts']:
+                if entry.get('rank'):
+                    contended = (f", {entry['contended_mbps']:.1f} MB/s contended"
+                                 if entry.get('contended_mbps') is not None else "")
+                    print(f"   {entry['rank']}. {entry['path']} ({entry['fstype']} on {entry['device']}): "
+                          f"{entry['alone_mbps']:.1f} MB/s{contended}")
         
-        with open('disk_read_speed_results.json', 'w') as f:
+        output = results_path('disk_read_speed_results.json')
+        with open(output, 'w') as f:
             json.dump(results, f, indent=2)
         
-        print(f"\nSTORAGE: Results saved to: disk_read_speed_results.json")
+        print(f"\nSTORAGE: Results saved to: {output}")
         print("SUCCESS: Disk read speed test completed")
         
     finally:
         cleanup()
 
+def parse_int_list(value):
+    """Parse a comma separated list of integers"""
+    return [int(v) for v in value.split(',') if v.strip()]
+
+def choice_list(choices):
+    """argparse type for a comma separated list limited to choices"""
+    def parse(value):
+        items = [v for v in value.split(',') if v.strip()]
+        unknown = [item for item in items if item not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"invalid choice {', '.join(unknown)} "
+                                             f"(choose from {', '.join(choices)})")
+        return items
+    return parse
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk Read Speed Test")
+    parser.add_argument('--parallel', action='store_true',
+                        help='Also run the multi-worker queue-depth / random I/O sweep')
+    parser.add_argument('--workers', type=parse_int_list, default=PARALLEL_WORKERS,
+                        help='Comma separated worker counts (default: %(default)s)')
+    parser.add_argument('--queue-depths', type=parse_int_list, default=PARALLEL_QUEUE_DEPTHS,
+                        help='Comma separated outstanding I/Os per worker (default: %(default)s)')
+    parser.add_argument('--patterns', type=choice_list(list(ACCESS_PATTERNS)), default=list(ACCESS_PATTERNS),
+                        help=f"Comma separated access patterns from {', '.join(ACCESS_PATTERNS)}")
+    parser.add_argument('--engines', type=choice_list(PARALLEL_ENGINES), default=PARALLEL_ENGINES,
+                        help='Comma separated read paths: pread, mmap (default: %(default)s)')
+    parser.add_argument('--worker-type', choices=['thread', 'process'], default='thread',
+                        help='Run workers as threads or processes (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=PARALLEL_DURATION,
+                        help='Seconds per parallel configuration (default: %(default)s)')
+    parser.add_argument('--dataset', default=DATASET_FILE,
+                        help='Path of the persistent test dataset (default: %(default)s)')
+    size_group = parser.add_mutually_exclusive_group()
+    size_group.add_argument('--size-mb', type=int,
+                            help=f'Dataset size in MB (default: {DEFAULT_DATASET_MB})')
+    size_group.add_argument('--size-ram-multiple', type=float,
+                            help='Dataset size as a multiple of physical RAM, e.g. 2')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Rewrite the dataset even if a valid one exists')
+    parser.add_argument('--cleanup', action='store_true',
+                        help='Delete the dataset after the test instead of keeping it')
+    parser.add_argument('--mounts', type=lambda v: v.split(','),
+                        help="Also survey these comma separated directories, or 'auto' for every "
+                             "writable data mount in /proc/mounts")
+    parser.add_argument('--survey-size-mb', type=int, default=SURVEY_DATASET_MB,
+                        help='Dataset size per surveyed mount in MB (default: %(default)s)')
+    parser.add_argument('--survey-workers', type=int, default=SURVEY_WORKERS,
+                        help='Parallel read streams per surveyed mount (default: %(default)s)')
+    parser.add_argument('--keep-survey', action='store_true',
+                        help=f'Leave the survey datasets ({SURVEY_DIR}/) on each mount for the next run')
+    args = parser.parse_args()
+
+    test_disk_read_speed(parallel=args.parallel, workers_list=args.workers,
+                         queue_depths=args.queue_depths, patterns=args.patterns,
+                         engines=args.engines, worker_type=args.worker_type,
+                         duration=args.duration, dataset_path=args.dataset,
+                         size_mb=args.size_mb, ram_multiple=args.size_ram_multiple,
+                         rebuild=args.rebuild, keep_dataset=not args.cleanup,
+                         mounts=args.mounts, survey_size_mb=args.survey_size_mb,
+                         survey_workers=args.survey_workers, keep_survey=args.keep_survey)
+
 if __name__ == "__main__":
-    test_disk_read_speed()
+    main()
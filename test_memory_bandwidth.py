@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Host Memory Bandwidth Test - GPU Benchmark v3
+STREAM-style copy/scale/add/triad per NUMA node, local and remote, next to the GPUs' NUMA affinity
+"""
+
+import os
+import sys
+import json
+import time
+import ctypes
+import argparse
+import platform
+import multiprocessing
+from queue import Empty
+from datetime import datetime
+
+import numpy as np
+
+import system_inventory
+from results_dir import results_path
+
+RESULTS_FILE = "memory_bandwidth_results.json"
+# Default memory across all workers' arrays, capped to a quarter of MemAvailable
+DEFAULT_MEMORY_GB = 8
+# Each array stays well beyond any last-level cache share
+MIN_ARRAY_MB = 64
+# STREAM reports the best of several passes, the first one only warms up
+DEFAULT_PASSES = 6
+SCALAR = 3.0
+# Triad runs in chunks this big so its intermediate stays in cache
+TRIAD_CHUNK_ELEMENTS = 32 * 1024
+# Bytes moved per element, counted the way STREAM does
+KERNEL_ARRAYS = {'copy': 2, 'scale': 2, 'add': 3, 'triad': 3}
+# Nodes below this fraction of the best node's local triad are suspect (DIMMs, BIOS)
+SLOW_NODE_FRACTION = 0.8
+ELEMENT_BYTES = np.dtype(np.float64).itemsize
+# set_mempolicy(2) has no libc wrapper without libnuma, call it by number
+SET_MEMPOLICY_SYSCALLS = {'x86_64': 238, 'aarch64': 237, 'ppc64le': 261}
+MPOL_BIND = 2
+NUMA_BALANCING_PATH = '/proc/sys/kernel/numa_balancing'
+# How often to check for a worker that died (OOM killer, signal) while waiting for reports
+REPORT_POLL_SECONDS = 1
+
+
+def numa_layout():
+    """NUMA node -> CPUs this process may use, a single node 0 without NUMA sysfs"""
+    allowed = os.sched_getaffinity(0)
+    nodes = {node: [cpu for cpu in cpus if cpu in allowed]
+             for node, cpus in system_inventory.read_numa_nodes().items()}
+    nodes = {node: cpus for node, cpus in nodes.items() if cpus}
+    return nodes or {0: sorted(allowed)}
+
+
+def core_order(cpus):
+    """CPUs with one hardware thread per core first, their siblings after"""
+    first, siblings = [], []
+    seen = set()
+    for cpu in cpus:
+        try:
+            with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list') as f:
+                core = tuple(system_inventory.parse_cpulist(f.read()))
+        except (OSError, ValueError):
+            core = (cpu,)
+        (siblings if core in seen else first).append(cpu)
+        seen.add(core)
+    return first + siblings
+
+
+def worker_counts(cpus, limit=None):
+    """1, 2, 4, ... up to every CPU of the node"""
+    top = min(len(cpus), limit or len(cpus))
+    counts = []
+    count = 1
+    while count < top:
+        counts.append(count)
+        count *= 2
+    return counts + [top]
+
+
+def bind_memory(node):
+    """Bind this process's future allocations to one NUMA node, False where unsupported
+
+    Unlike first-touch placement alone, MPOL_BIND pages are not migrated
+    by automatic NUMA balancing, so remote cells stay remote.
+    """
+    number = SET_MEMPOLICY_SYSCALLS.get(platform.machine())
+    if number is None:
+        return False
+    mask = (ctypes.c_ulong * (node // 64 + 1))()
+    mask[node // 64] = 1 << (node % 64)
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall(number, MPOL_BIND, mask, ctypes.c_ulong(len(mask) * 64 + 1)) == 0
+
+
+def numa_balancing():
+    """kernel.numa_balancing setting, None if the kernel has no such knob"""
+    try:
+        with open(NUMA_BALANCING_PATH) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def run_kernel(a, b, c, scratch, kernel):
+    """One STREAM kernel over preallocated arrays, no temporaries"""
+    if kernel == 'copy':
+        np.copyto(c, a)
+    elif kernel == 'scale':
+        np.multiply(c, SCALAR, out=b)
+    elif kernel == 'add':
+        np.add(a, b, out=c)
+    else:
+        for start in range(0, len(a), TRIAD_CHUNK_ELEMENTS):
+            end = min(start + TRIAD_CHUNK_ELEMENTS, len(a))
+            part = scratch[:end - start]
+            np.multiply(c[start:end], SCALAR, out=part)
+            np.add(b[start:end], part, out=a[start:end])
+
+
+def stream_worker(run_cpu, memory_cpu, memory_node, elements, passes, barrier, queue):
+    """Bind to and touch the arrays from memory_node, then time kernels from run_cpu
+
+    First touch from memory_cpu still places the arrays where binding is
+    unavailable.
+    """
+    try:
+        bound = bind_memory(memory_node)
+        os.sched_setaffinity(0, {memory_cpu})
+        a = np.empty(elements)
+        b = np.empty(elements)
+        c = np.empty(elements)
+        a.fill(1.0)
+        b.fill(2.0)
+        c.fill(0.0)
+        scratch = np.empty(TRIAD_CHUNK_ELEMENTS)
+        os.sched_setaffinity(0, {run_cpu})
+        timings = {kernel: [] for kernel in KERNEL_ARRAYS}
+        for _ in range(passes):
+            for kernel in KERNEL_ARRAYS:
+                barrier.wait()
+                start = time.perf_counter()
+                run_kernel(a, b, c, scratch, kernel)
+                timings[kernel].append((start, time.perf_counter()))
+        timings['bound'] = bound
+        queue.put(timings)
+    except Exception as e:
+        barrier.abort()
+        queue.put({'error': str(e)})
+
+
+def collect_reports(workers, run_cpus, barrier, queue):
+    """One report per worker; a worker that dies without one becomes an error record"""
+    reports = []
+    while len(reports) < len(workers):
+        try:
+            reports.append(queue.get(timeout=REPORT_POLL_SECONDS))
+        except Empty:
+            # A worker that exits cleanly has always sent its report, even an error one
+            dead = [(worker, cpu) for worker, cpu in zip(workers, run_cpus) if worker.exitcode not in (None, 0)]
+            if dead:
+                # Release the workers still waiting for the dead one at the barrier
+                barrier.abort()
+                worker, cpu = dead[0]
+                reports.append({'error': f"worker on CPU {cpu} exited with code {worker.exitcode}"})
+                break
+    return reports
+
+
+def measure(run_cpus, memory_cpus, memory_nodes, elements, passes):
+    """Aggregate GB/s per kernel for workers pinned to run_cpus with memory on memory_nodes
+
+    All workers start each kernel together; a pass takes from the first
+    start to the last finish, and the best pass after the warm-up counts.
+    """
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(len(run_cpus))
+    queue = context.Queue()
+    workers = [context.Process(target=stream_worker,
+                               args=(run_cpu, memory_cpu, memory_node, elements, passes, barrier, queue))
+               for run_cpu, memory_cpu, memory_node in zip(run_cpus, memory_cpus, memory_nodes)]
+    for worker in workers:
+        worker.start()
+    reports = collect_reports(workers, run_cpus, barrier, queue)
+    for worker in workers:
+        worker.join()
+    errors = [report['error'] for report in reports if 'error' in report]
+    if errors:
+        return {'error': errors[0]}
+
+    results = {'memory_bound': all(report['bound'] for report in reports)}
+    for kernel, arrays in KERNEL_ARRAYS.items():
+        spans = np.array([report[kernel] for report in reports])  # workers x passes x (start, end)
+        elapsed = spans[:, :, 1].max(axis=0) - spans[:, :, 0].min(axis=0)
+        best = elapsed[1:].min() if passes > 1 else elapsed[0]
+        results[f"{kernel}_gbps"] = round(len(run_cpus) * arrays * elements * ELEMENT_BYTES / best / 1e9, 2)
+    return results
+
+
+def elements_per_worker(memory_gb, workers):
+    """Array length per worker so all workers together stay within the memory budget"""
+    array_bytes = max(MIN_ARRAY_MB * 1024 * 1024, memory_gb * 1024 ** 3 / (3 * workers))
+    return int(array_bytes // ELEMENT_BYTES)
+
+
+def workers_within_budget(memory_gb):
+    """Most workers whose MIN_ARRAY_MB arrays still fit the memory budget"""
+    return max(1, int(memory_gb * 1024 // (3 * MIN_ARRAY_MB)))
+
+
+def memory_budget_gb(requested):
+    available_kb = system_inventory.read_meminfo().get('MemAvailable')
+    if available_kb is None:
+        return requested
+    return min(requested, available_kb / (1024 * 1024) / 4)
+
+
+def gpu_numa_affinity():
+    """GPU -> NUMA node from gpu_detection_results.json, else straight from sysfs"""
+    try:
+        with open(results_path('gpu_detection_results.json')) as f:
+            gpus = json.load(f).get('gpu_info', [])
+        affinity = {f"GPU{gpu['index']}": gpu.get('numa_node') for gpu in gpus
+                    if gpu.get('vendor') == 'NVIDIA' and 'index' in gpu}
+        if any(node is not None for node in affinity.values()):
+            return affinity
+    except (OSError, ValueError):
+        pass
+    return {device['pci_id']: device['numa_node'] for device in system_inventory.list_display_controllers()
+            if device['vendor'] == 'NVIDIA'}
+
+
+def display_row(label, result):
+    if 'error' in result:
+        print(f"   {label:<24} ERROR: {result['error']}")
+        return
+    print(f"   {label:<24} " + " ".join(f"{result[f'{kernel}_gbps']:>11.1f}" for kernel in KERNEL_ARRAYS))
+
+
+def test_memory_bandwidth(memory_gb=DEFAULT_MEMORY_GB, passes=DEFAULT_PASSES, max_workers=None,
+                          matrix_workers=None, skip_matrix=False):
+    print("Host Memory Bandwidth Test (STREAM)")
+    print("=" * 50)
+    nodes = {node: core_order(cpus) for node, cpus in numa_layout().items()}
+    budget = memory_budget_gb(memory_gb)
+    gpus = gpu_numa_affinity()
+    balancing = numa_balancing()
+    warnings = []
+    # More workers than this would need arrays below MIN_ARRAY_MB to fit the budget
+    budget_workers = workers_within_budget(budget)
+    if budget_workers < max(len(cpus) for cpus in nodes.values()):
+        warnings.append(f"{budget:.1f} GB of arrays fits {budget_workers} workers of {3 * MIN_ARRAY_MB} MB, "
+                        f"worker counts are capped there (raise --memory-gb to use every CPU)")
+    max_workers = min(max_workers or budget_workers, budget_workers)
+    print(f"STATUS: {len(nodes)} NUMA node(s), {sum(len(cpus) for cpus in nodes.values())} CPUs, "
+          f"{budget:.1f} GB of arrays per measurement, best of {passes - 1 if passes > 1 else 1} passes")
+    header = f"   {'':<24} " + " ".join(f"{kernel.capitalize() + ' GB/s':>11}" for kernel in KERNEL_ARRAYS)
+
+    sweep = {}
+    for node, cpus in nodes.items():
+        print(f"\nTESTING: Node {node} worker sweep (local memory)")
+        print(header)
+        sweep[node] = []
+        for count in worker_counts(cpus, max_workers):
+            run_cpus = cpus[:count]
+            result = measure(run_cpus, run_cpus, [node] * count, elements_per_worker(budget, count), passes)
+            result['workers'] = count
+            sweep[node].append(result)
+            display_row(f"{count} worker(s)", result)
+
+    per_node = max(1, min(max_workers, budget_workers // len(nodes)))
+    all_cpus = [cpu for node in nodes for cpu in nodes[node][:per_node]]
+    all_nodes = [node for node in nodes for _ in nodes[node][:per_node]]
+    system = {}
+    if len(nodes) > 1:
+        print("\nTESTING: All nodes at once (each worker on local memory)")
+        print(header)
+        system = measure(all_cpus, all_cpus, all_nodes, elements_per_worker(budget, len(all_cpus)), passes)
+        system['workers'] = len(all_cpus)
+        display_row(f"{len(all_cpus)} workers", system)
+
+    matrix = None
+    if len(nodes) > 1 and not skip_matrix:
+        print("\nTESTING: CPU node x memory node triad matrix")
+        node_ids = list(nodes)
+        matrix = {'nodes': node_ids, 'triad_gbps': [], 'copy_gbps': []}
+        corner = 'CPU \\ memory'
+        print(f"   {corner:<14}" + "".join(f"{'node ' + str(node):>12}" for node in node_ids))
+        for cpu_node in node_ids:
+            count = min(len(nodes[cpu_node]), matrix_workers or len(nodes[cpu_node]), budget_workers)
+            run_cpus = nodes[cpu_node][:count]
+            row_triad, row_copy = [], []
+            for memory_node in node_ids:
+                memory_cpus = [nodes[memory_node][i % len(nodes[memory_node])] for i in range(count)]
+                result = measure(run_cpus, memory_cpus, [memory_node] * count,
+                                 elements_per_worker(budget, count), passes)
+                matrix['memory_bound'] = matrix.get('memory_bound', True) and result.get('memory_bound', False)
+                row_triad.append(result.get('triad_gbps'))
+                row_copy.append(result.get('copy_gbps'))
+            matrix['triad_gbps'].append(row_triad)
+            matrix['copy_gbps'].append(row_copy)
+            print(f"   {'node ' + str(cpu_node):<14}" +
+                  "".join(f"{value:>12.1f}" if value is not None else f"{'ERROR':>12}" for value in row_triad))
+
+    peaks = {}
+    for node, results in sweep.items():
+        valid = [result for result in results if 'error' not in result]
+        if valid:
+            best = max(valid, key=lambda result: result['triad_gbps'])
+            peaks[node] = {'triad_gbps': best['triad_gbps'], 'copy_gbps': best['copy_gbps'],
+                           'workers': best['workers']}
+
+    print("\nRESULTS: Peak local bandwidth per NUMA node")
+    best_triad = max((peak['triad_gbps'] for peak in peaks.values()), default=0)
+    for node, peak in peaks.items():
+        attached = [gpu for gpu, gpu_node in gpus.items() if gpu_node == node]
+        print(f"   Node {node}: {peak['triad_gbps']:.1f} GB/s triad, {peak['copy_gbps']:.1f} GB/s copy "
+              f"({peak['workers']} workers)" + (f" - {', '.join(attached)}" if attached else ""))
+        if best_triad and peak['triad_gbps'] < SLOW_NODE_FRACTION * best_triad:
+            warnings.append(f"Node {node} reaches {peak['triad_gbps'] / best_triad:.0%} of the best node's triad"
+                            + (f", GPUs staging through it: {', '.join(attached)}" if attached else ""))
+    if matrix:
+        for i, cpu_node in enumerate(matrix['nodes']):
+            local = matrix['triad_gbps'][i][i]
+            for j, memory_node in enumerate(matrix['nodes']):
+                if i != j and local and matrix['triad_gbps'][i][j]:
+                    print(f"   Node {cpu_node} -> node {memory_node} memory: "
+                          f"{matrix['triad_gbps'][i][j] / local:.0%} of local")
+        if not matrix['memory_bound'] and balancing:
+            warnings.append("Memory binding unavailable and kernel.numa_balancing is on: remote cells relied on "
+                            "first-touch placement and may have drifted toward local")
+    for warning in warnings:
+        print(f"WARNING:  {warning}")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'memory_gb': round(budget, 2),
+        'passes': passes,
+        'numa_balancing': balancing,
+        'nodes': {str(node): cpus for node, cpus in nodes.items()},
+        'gpu_numa_affinity': gpus,
+        'sweep': {str(node): results for node, results in sweep.items()},
+        'peaks': {str(node): peak for node, peak in peaks.items()},
+        'system': system or None,
+        'matrix': matrix,
+        'warnings': warnings
+    }
+    output = results_path(RESULTS_FILE)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STREAM-style host memory bandwidth per NUMA node")
+    parser.add_argument('--memory-gb', type=float, default=DEFAULT_MEMORY_GB,
+                        help='Memory for all workers\' arrays per measurement (default: %(default)s)')
+    parser.add_argument('--passes', type=int, default=DEFAULT_PASSES,
+                        help='Timed passes per kernel, the first is warm-up (default: %(default)s)')
+    parser.add_argument('--max-workers', type=int, help='Largest worker count per node in the sweep')
+    parser.add_argument('--matrix-workers', type=int, help='Workers per cell of the node matrix (default: every CPU)')
+    parser.add_argument('--no-matrix', action='store_true', help='Skip the local/remote node matrix')
+    args = parser.parse_args()
+
+    results = test_memory_bandwidth(args.memory_gb, max(1, args.passes), args.max_workers,
+                                    args.matrix_workers, args.no_matrix)
+    if not results['peaks']:
+        print("ERROR: Error: No memory bandwidth measurement succeeded")
+        sys.exit(1)
+    print("SUCCESS: Memory bandwidth test completed")
+
+
+if __name__ == "__main__":
+    main()
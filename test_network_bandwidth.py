@@ -2,97 +2,342 @@
 """
 Network Bandwidth Test - GPU Benchmark v3
 Measures network bandwidth between all nodes in a cluster using iperf3
+or the built-in asyncio engine (netbench.py)
 """
 
-import subprocess
-import shlex
+import os
 import json
+import time
+import base64
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from transport import create_transport, TRANSPORTS, MAX_PER_HOST, MAX_WORKERS
+from results_dir import results_path
 
 # Configuration
 PORT = 5201
 TIMEOUT = 5
+CLIENT_TIMEOUT = 30
 THRESHOLD_GBPS = 10.0  # Threshold for highlighting low-performance links
+SCHEDULE_MODES = ['shift', 'congestion-free', 'bisection']
+SERVER_LOG = "/tmp/gpubench-iperf3-{port}.log"
+# The built-in engine is shipped to every host and run with its python3
+NETBENCH_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'netbench.py')
+NETBENCH_REMOTE = "/tmp/gpubench-netbench.py"
+NETBENCH_LOG = "/tmp/gpubench-netbench-{port}.log"
+DIRECTIONS = ['forward', 'reverse', 'bidir']
+IPERF_DEFAULTS = {
+    'streams': 8,  # A single TCP stream cannot fill a 100-400 GbE link
+    'duration': 10,
+    'window': None,
+    'direction': 'forward'
+}
+LOG_TAIL_LINES = 20
+
+
+def start_iperf_server(transport, host, port=PORT):
+    """Start a daemonized iperf3 server on a given host, returns a Future"""
+    return transport.submit(host, f"iperf3 -s -D -p {port} --logfile {SERVER_LOG.format(port=port)}",
+                            timeout=TIMEOUT)
+
+
+def stop_iperf_server(transport, host, port=PORT):
+    """Stop iperf3 server on a given host, returns a Future"""
+    # Best effort, ignore failure
+    return transport.submit(host, f"pkill -f 'iperf3 -s -D -p {port}'", timeout=TIMEOUT)
+
+
+def collect_server_logs(transport, endpoints, log=SERVER_LOG):
+    """Fetch the tail of the server log for each (host, port)"""
+    futures = {(host, port): transport.submit(host, f"tail -n {LOG_TAIL_LINES} {log.format(port=port)}",
+                                              timeout=TIMEOUT)
+               for host, port in endpoints}
+    logs = {}
+    for (host, port), future in futures.items():
+        stdout, stderr, returncode = future.result()
+        if returncode == 0 and stdout:
+            logs.setdefault(host, {})[str(port)] = stdout.strip().splitlines()
+    return logs
+
+
+def iperf_client_command(server, port, streams=1, duration=10, window=None, direction='forward'):
+    """Build the iperf3 client command line, always with JSON output"""
+    command = f"iperf3 -c {server} -p {port} -J -P {streams} -t {duration}"
+    if window:
+        command += f" -w {window}"
+    if direction == 'reverse':
+        command += " -R"
+    elif direction == 'bidir':
+        command += " --bidir"
+    return command
+
 
+def _direction_summary(sent, received, intervals):
+    """Totals and per-interval series for one direction of a test"""
+    sent = sent or {}
+    received = received or {}
+    return {
+        'sent_gbps': sent['bits_per_second'] / 1e9 if 'bits_per_second' in sent else None,
+        'received_gbps': received['bits_per_second'] / 1e9 if 'bits_per_second' in received else None,
+        'bytes_sent': sent.get('bytes'),
+        'bytes_received': received.get('bytes'),
+        'retransmits': sent.get('retransmits'),
+        'intervals_gbps': [round(interval['bits_per_second'] / 1e9, 3) for interval in intervals
+                           if 'bits_per_second' in interval]
+    }
 
-def run_command(cmd):
-    """Run shell command with timeout"""
+
+def parse_iperf_json(text, direction='forward'):
+    """Parse `iperf3 -J` client output into per-direction results
+
+    Returns (result, error). 'forward' is client -> server traffic and
+    'reverse' is server -> client; with -R only the reverse direction is
+    measured, with --bidir both are, and they are reported separately.
+    """
     try:
-        process = subprocess.run(shlex.split(cmd), capture_output=True, text=True, timeout=TIMEOUT)
-        return process.stdout, process.stderr, process.returncode
-    except subprocess.TimeoutExpired:
-        return None, "Timed out", -1
+        report = json.loads(text)
+    except (TypeError, ValueError):
+        return None, "Failed to parse iperf3 JSON output"
+    if report.get('error'):
+        return None, report['error']
 
+    end = report.get('end', {})
+    intervals = report.get('intervals', [])
+    primary = _direction_summary(end.get('sum_sent'), end.get('sum_received'),
+                                 [interval.get('sum', {}) for interval in intervals])
+    result = {'forward': None, 'reverse': None}
+    if direction == 'reverse':
+        result['reverse'] = primary
+    else:
+        result['forward'] = primary
+    if direction == 'bidir':
+        result['reverse'] = _direction_summary(end.get('sum_sent_bidir_reverse'),
+                                               end.get('sum_received_bidir_reverse'),
+                                               [interval.get('sum_bidir_reverse', {}) for interval in intervals])
+    cpu = end.get('cpu_utilization_percent', {})
+    result['cpu_percent'] = {'client': cpu.get('host_total'), 'server': cpu.get('remote_total')}
+    if primary['received_gbps'] is None:
+        return None, "iperf3 JSON output has no receiver totals"
+    return result, None
 
-def start_iperf_server(host):
-    """Start iperf3 server on a given host"""
-    cmd = f"ssh {host} iperf3 -s -p {PORT}"
-    return run_command(cmd)
 
+def run_iperf_client(transport, client, server, port=PORT, iperf=None):
+    """Run an iperf3 client against server, returns (result, error)"""
+    iperf = dict(IPERF_DEFAULTS, **(iperf or {}))
+    stdout, stderr, returncode = transport.run(client, iperf_client_command(server, port, **iperf),
+                                               timeout=iperf['duration'] + CLIENT_TIMEOUT)
+    if returncode != 0 and not (stdout or '').lstrip().startswith('{'):
+        return None, stderr or "iperf3 failed"
+    # iperf3 -J reports its own errors inside the JSON
+    return parse_iperf_json(stdout, iperf['direction'])
 
-def stop_iperf_server(host):
-    """Stop iperf3 server on a given host"""
-    # Best effort, ignore failure
-    cmd = f"ssh {host} pkill -f 'iperf3 -s -p {PORT}'"
-    run_command(cmd)
+
+def deploy_netbench(transport, host):
+    """Copy the built-in engine to a host, returns a Future"""
+    with open(NETBENCH_SOURCE, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return transport.submit(host, f"echo {encoded} | base64 -d > {NETBENCH_REMOTE}", timeout=TIMEOUT)
+
+
+def start_netbench_server(transport, host, port=PORT):
+    """Start the built-in engine's server in the background, returns a Future"""
+    return transport.submit(host, f"nohup python3 {NETBENCH_REMOTE} server --port {port} "
+                                  f"> {NETBENCH_LOG.format(port=port)} 2>&1 < /dev/null &", timeout=TIMEOUT)
+
+
+def stop_netbench_server(transport, host, port=PORT):
+    """Stop the built-in engine's server, returns a Future"""
+    return transport.submit(host, f"pkill -f '{NETBENCH_REMOTE} server --port {port}'", timeout=TIMEOUT)
+
+
+def run_netbench_client(transport, client, server, port=PORT, iperf=None):
+    """Run the built-in engine's client against server, returns (result, error)
+
+    The result has the same shape as parse_iperf_json() plus ping-pong latency.
+    """
+    iperf = dict(IPERF_DEFAULTS, **(iperf or {}))
+    command = (f"python3 {NETBENCH_REMOTE} client {server} --port {port} -P {iperf['streams']} "
+               f"-t {iperf['duration']} --direction {iperf['direction']}")
+    stdout, stderr, returncode = transport.run(client, command, timeout=iperf['duration'] * 2 + CLIENT_TIMEOUT)
+    try:
+        result = json.loads(stdout)
+    except (TypeError, ValueError):
+        return None, stderr or "Failed to parse built-in engine output"
+    if result.get('error'):
+        return None, result['error']
+    return result, None
+
+
+# engine -> (start server, stop server, run client, server log)
+ENGINES = {
+    'iperf3': (start_iperf_server, stop_iperf_server, run_iperf_client, SERVER_LOG),
+    'builtin': (start_netbench_server, stop_netbench_server, run_netbench_client, NETBENCH_LOG)
+}
+
+
+def shift_rounds(hosts):
+    """Round r pairs host i with host i+r: every host is one client and one server"""
+    n = len(hosts)
+    return [[(hosts[i], hosts[(i + r) % n]) for i in range(n)] for r in range(1, n)]
+
+
+def matching_rounds(hosts):
+    """Circle-method matchings, each run once per direction
+
+    Every host takes part in at most one flow per round, so no NIC carries
+    more than one test in either direction.
+    """
+    players = list(hosts)
+    if len(players) % 2:
+        players.append(None)
+    n = len(players)
+    rounds = []
+    for _ in range(n - 1):
+        matching = [(players[i], players[n - 1 - i]) for i in range(n // 2)
+                    if players[i] is not None and players[n - 1 - i] is not None]
+        rounds.append([(a, b) for a, b in matching])
+        rounds.append([(b, a) for a, b in matching])
+        players = [players[0], players[-1]] + players[1:-1]
+    return rounds
+
+
+def bisection_rounds(hosts):
+    """Full-bisection stress: every cross-half pair in both directions at once
+
+    Each round pairs every host in the smaller half with a distinct host
+    in the other half, both directions simultaneously. Pairs within a
+    half follow, with both halves running their shift rounds side by side.
+    """
+    half = len(hosts) // 2
+    left, right = hosts[:half], hosts[half:]
+    rounds = []
+    for r in range(len(right)):
+        round_ = []
+        for i, a in enumerate(left):
+            b = right[(i + r) % len(right)]
+            round_.extend([(a, b), (b, a)])
+        rounds.append(round_)
+    left_rounds, right_rounds = shift_rounds(left), shift_rounds(right)
+    for i in range(max(len(left_rounds), len(right_rounds))):
+        round_ = []
+        if i < len(left_rounds):
+            round_.extend(left_rounds[i])
+        if i < len(right_rounds):
+            round_.extend(right_rounds[i])
+        rounds.append(round_)
+    return rounds
 
 
-def run_iperf_client(client, server):
-    """Run iperf3 client to measure bandwidth to server"""
-    cmd = f"ssh {client} iperf3 -c {server} -p {PORT}"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode != 0:
-        return None, stderr
+def plan_rounds(hosts, mode='shift'):
+    """Plan tournament rounds covering every ordered client -> server pair"""
+    if len(hosts) < 2:
+        return []
+    if mode == 'congestion-free':
+        return matching_rounds(hosts)
+    if mode == 'bisection':
+        return bisection_rounds(hosts)
+    return shift_rounds(hosts)
 
-    # Parse output
-    for line in stdout.splitlines():
-        if "receiver" in line or "sender" in line:
-            parts = line.split()
-            try:
-                # Extract bits/sec and convert to Gbps
-                bps = float(parts[-2])
-                gbps = bps / 1e9
-                return gbps, None
-            except (ValueError, IndexError):
-                continue
 
-    return None, "Failed to parse iperf3 output"
+def measure_pair(transport, client, server, port, iperf=None, engine='iperf3'):
+    """Run one client -> server measurement and describe it
 
+    'gbps' is the receiver throughput of the measured direction (reverse
+    when only -R was run), both directions are kept separately.
+    """
+    started = datetime.now().isoformat()
+    start_time = time.time()
+    run_client = ENGINES[engine][2]
+    result, error = run_client(transport, client, server, port, iperf)
+    result = result or {'forward': None, 'reverse': None, 'cpu_percent': None}
+    primary = result['forward'] or result['reverse']
+    return {
+        'client': client,
+        'server': server,
+        'port': port,
+        'start': started,
+        'duration_seconds': round(time.time() - start_time, 2),
+        'gbps': primary['received_gbps'] if primary else None,
+        'forward': result['forward'],
+        'reverse': result['reverse'],
+        'cpu_percent': result['cpu_percent'],
+        'latency': result.get('latency'),
+        'error': error.strip() if error else None
+    }
 
-def test_network_bandwidth(hosts):
+
+def test_network_bandwidth(hosts, mode='shift', parallel_rounds=1, transport=None, base_port=PORT, iperf=None,
+                           engine='iperf3'):
     """Test network bandwidth across all nodes"""
     print("🌐 Network Bandwidth Test")
     print("========================")
 
-    # Start iperf3 servers
-    with ThreadPoolExecutor() as executor:
-        print("🔧 Starting iperf3 servers...")
-        servers_future = {executor.submit(start_iperf_server, host): host for host in hosts}
-        for future in as_completed(servers_future):
-            host = servers_future[future]
-            stdout, stderr, _ = future.result()
-            if stderr.strip():
-                print(f"❌ Error starting server on {host}: {stderr.strip()}")
-        print("✅ Servers started")
-
-    # Measure bandwidth
-    results = {host: {} for host in hosts}
+    iperf = dict(IPERF_DEFAULTS, **(iperf or {}))
+
+    owns_transport = transport is None
+    transport = transport or create_transport('ssh')
+    rounds = plan_rounds(hosts, mode)
+    ports = [base_port + k for k in range(parallel_rounds)]
+    print(f"📋 Schedule: {len(rounds)} rounds ({mode}), {parallel_rounds} in parallel on ports {ports[0]}-{ports[-1]}")
+    print(f"📋 {engine}: {iperf['streams']} streams, {iperf['duration']}s, {iperf['direction']}"
+          f"{', window ' + str(iperf['window']) if iperf['window'] else ''}")
+    start_server, stop_server, _, server_log = ENGINES[engine]
 
-    with ThreadPoolExecutor() as executor:
+    if engine == 'builtin':
+        if iperf['window']:
+            print("⚠️  The built-in engine ignores --window")
+        print("📦 Shipping the built-in engine...")
+        for future, host in [(deploy_netbench(transport, host), host) for host in hosts]:
+            stdout, stderr, returncode = future.result()
+            if returncode != 0:
+                print(f"❌ Error shipping the engine to {host}: {(stderr or '').strip()}")
+
+    # Start servers, one per port so parallel rounds never share a server
+    print(f"🔧 Starting {engine} servers...")
+    servers_future = {start_server(transport, host, port): (host, port)
+                      for host in hosts for port in ports}
+    for future, (host, port) in servers_future.items():
+        stdout, stderr, returncode = future.result()
+        if returncode != 0:
+            print(f"❌ Error starting server on {host}:{port}: {(stderr or '').strip()}")
+    print("✅ Servers started")
+
+    # Measure bandwidth round by round
+    pairs = []
+    round_seconds = []
+    start_time = time.time()
+    try:
         print("📊 Measuring bandwidth...")
-        client_server_pairs = [(client, server) for client in hosts for server in hosts if client != server]
-        futures = {executor.submit(run_iperf_client, client, server): (client, server) for client, server in client_server_pairs}
-        for future in as_completed(futures):
-            client, server = futures[future]
-            gbps, error = future.result()
-            results[client][server] = gbps if gbps is not None else error
-
-    # Stop iperf3 servers
-    with ThreadPoolExecutor() as executor:
-        print("🛑 Stopping iperf3 servers...")
-        for host in hosts:
-            executor.submit(stop_iperf_server, host)
+        for batch_start in range(0, len(rounds), parallel_rounds):
+            batch = rounds[batch_start:batch_start + parallel_rounds]
+            batch_time = time.time()
+            # Every pair of every round in the batch runs at once, multiplexed per host
+            futures = [(batch_start + offset + 1,
+                        transport.submit_call(measure_pair, transport, client, server, port, iperf, engine))
+                       for offset, (round_, port) in enumerate(zip(batch, ports))
+                       for client, server in round_]
+            for round_number, future in futures:
+                pair = future.result()
+                pair['round'] = round_number
+                pairs.append(pair)
+            round_seconds.append(round(time.time() - batch_time, 2))
+            print(f"   Rounds {batch_start + 1}-{batch_start + len(batch)} of {len(rounds)} "
+                  f"({round_seconds[-1]:.1f}s)")
+        # Pull server-side logs for failed pairs before the servers go away
+        failed = {(pair['server'], pair['port']) for pair in pairs if pair['gbps'] is None}
+        server_logs = collect_server_logs(transport, sorted(failed), server_log) if failed else {}
+    finally:
+        # Stop servers
+        print(f"🛑 Stopping {engine} servers...")
+        for future in [stop_server(transport, host, port) for host in hosts for port in ports]:
+            future.result()
+        if owns_transport:
+            transport.close()
+
+    results = {host: {} for host in hosts}
+    for pair in pairs:
+        results[pair['client']][pair['server']] = pair['gbps'] if pair['gbps'] is not None else pair['error']
 
     # Print results matrix
     print("\n🚀 Network Bandwidth Matrix (Gbps)")
@@ -104,7 +349,7 @@ def test_network_bandwidth(hosts):
             if client == server:
                 row += "  X    "
             else:
-                bw = results[client][server]
+                bw = results[client].get(server)
                 if isinstance(bw, float):
                     if bw < THRESHOLD_GBPS:
                         row += f"\033[91m{bw:.1f}\033[0m  "  # Red text for low bandwidth
@@ -115,21 +360,95 @@ def test_network_bandwidth(hosts):
         print(row)
 
     # Save results
-    results_json = {client: {server: results[client][server] for server in hosts if client != server}
-                    for client in hosts}
+    # Server -> client throughput measured by the same bidirectional tests
+    reverse_matrix = None
+    if iperf['direction'] == 'bidir':
+        reverse_matrix = {host: {} for host in hosts}
+        for pair in pairs:
+            reverse_matrix[pair['client']][pair['server']] = (pair['reverse'] or {}).get('received_gbps')
+
+    # Ping-pong RTT per pair from the built-in engine
+    latency_matrix = None
+    if engine == 'builtin':
+        latency_matrix = {host: {} for host in hosts}
+        for pair in pairs:
+            latency = pair['latency'] or {}
+            latency_matrix[pair['client']][pair['server']] = {'p50_us': latency.get('p50_us'),
+                                                              'p99_us': latency.get('p99_us')}
 
-    with open('network_bandwidth_results.json', 'w') as f:
+    results_json = {
+        'timestamp': datetime.now().isoformat(),
+        'hosts': hosts,
+        'schedule': {
+            'mode': mode,
+            'rounds': len(rounds),
+            'parallel_rounds': parallel_rounds,
+            'ports': ports
+        },
+        'matrix': {client: {server: results[client].get(server) for server in hosts if client != server}
+                   for client in hosts},
+        'engine': engine,
+        'iperf': iperf,
+        'reverse_matrix': reverse_matrix,
+        'latency_matrix': latency_matrix,
+        'pairs': pairs,
+        'server_logs': server_logs,
+        'batch_seconds': round_seconds,
+        'total_seconds': round(time.time() - start_time, 2)
+    }
+
+    output = results_path('network_bandwidth_results.json')
+    with open(output, 'w') as f:
         json.dump(results_json, f, indent=2)
 
-    print("\n💾 Results saved to: network_bandwidth_results.json")
+    print(f"\n💾 Results saved to: {output}")
     print("✅ Network bandwidth test completed")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Network Bandwidth Test Using iperf3")
+    parser = argparse.ArgumentParser(description="Network Bandwidth Test Using iperf3 or the built-in engine")
     parser.add_argument('hosts', metavar='H', type=str, nargs='+', help='List of hostnames or IP addresses')
+    parser.add_argument('--mode', choices=SCHEDULE_MODES, default='shift',
+                        help='shift: each host one client and one server per round; '
+                             'congestion-free: each host in at most one flow per round; '
+                             'bisection: all cross-half flows at once (stress)')
+    parser.add_argument('--parallel-rounds', type=int, default=1,
+                        help='Rounds to run at once, each on its own port (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=PORT, help='First iperf3 port (default: %(default)s)')
+    parser.add_argument('--streams', '-P', type=int, default=IPERF_DEFAULTS['streams'],
+                        help='Parallel TCP streams per pair (default: %(default)s)')
+    parser.add_argument('--duration', '-t', type=int, default=IPERF_DEFAULTS['duration'],
+                        help='Seconds per measurement (default: %(default)s)')
+    parser.add_argument('--window', '-w', help='TCP window / socket buffer size, e.g. 4M')
+    parser.add_argument('--direction', choices=DIRECTIONS, default=IPERF_DEFAULTS['direction'],
+                        help='forward: client -> server; reverse: -R; bidir: --bidir, both '
+                             'directions at once and reported separately (default: %(default)s)')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='iperf3',
+                        help='iperf3, or builtin: the bundled asyncio engine (netbench.py) shipped to each '
+                             'host, no iperf3 needed, adds ping-pong RTT (default: %(default)s)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='ssh',
+                        help='ssh: one multiplexed connection per host; ssh-plain: a new session per '
+                             'command; local: run on this machine (default: %(default)s)')
+    parser.add_argument('--ssh-command', help='ssh client command line, e.g. to add options or a stand-in')
+    parser.add_argument('--max-per-host', type=int, default=MAX_PER_HOST,
+                        help='Concurrent commands per host (default: %(default)s)')
     args = parser.parse_args()
-    test_network_bandwidth(args.hosts)
+
+    parallel_rounds = max(1, args.parallel_rounds)
+    options = {
+        # A host can be a client in every parallel round at once
+        'max_per_host': max(args.max_per_host, parallel_rounds),
+        'max_workers': max(MAX_WORKERS, len(args.hosts) * parallel_rounds)
+    }
+    if args.ssh_command and args.transport != 'local':
+        options['ssh_command'] = args.ssh_command
+    with create_transport(args.transport, **options) as transport:
+        test_network_bandwidth(args.hosts, args.mode, parallel_rounds, transport, args.port, {
+            'streams': max(1, args.streams),
+            'duration': max(1, args.duration),
+            'window': args.window,
+            'direction': args.direction
+        }, args.engine)
 
 
 if __name__ == "__main__":
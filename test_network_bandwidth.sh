@@ -14,6 +14,7 @@ echo "========================"
 if ! command -v iperf3 &> /dev/null; then
     echo "❌ Error: iperf3 is not installed"
     echo "   Please install with: sudo apt install iperf3"
+    echo "   or run: python3 test_network_bandwidth.py --engine builtin <hosts>"
     exit 1
 fi
 
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Small-File Metadata Throughput Test - GPU Benchmark v3
+Measures create/stat/open+read/unlink rates over a tree of small files
+"""
+
+import os
+import math
+import time
+import json
+import random
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from test_disk_read_speed import get_disk_info, percentile, run_command
+from results_dir import results_path
+
+# Configuration
+DEFAULT_FILE_COUNT = 20000
+FILES_PER_DIR = 1000
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+DEFAULT_SIZE_SPEC = "lognormal:110k,0.6"  # roughly the size spread of ImageNet JPEGs
+TREE_DIR = "smallfile_tree"
+PHASES = ['create', 'stat', 'read', 'unlink']
+SIZE_UNITS = {'k': 1024, 'm': 1024 * 1024}
+
+def parse_size(value):
+    """Parse a byte count with an optional k/m suffix"""
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+def parse_size_spec(spec):
+    """Parse a size distribution spec into a sampling function
+
+    Supported forms:
+      fixed:SIZE             every file is SIZE bytes
+      uniform:MIN-MAX        uniformly distributed between MIN and MAX
+      lognormal:MEDIAN,SIGMA log-normal around MEDIAN with shape SIGMA
+    """
+    kind, _, args = spec.partition(':')
+    if kind == 'fixed':
+        size = parse_size(args)
+        return lambda rng: size
+    if kind == 'uniform':
+        low, high = (parse_size(v) for v in args.split('-'))
+        return lambda rng: rng.randint(low, high)
+    if kind == 'lognormal':
+        median, sigma = args.split(',')
+        mu = math.log(parse_size(median))
+        sigma = float(sigma)
+        return lambda rng: max(1, int(rng.lognormvariate(mu, sigma)))
+    raise ValueError(f"Unknown size distribution: {spec}")
+
+def plan_tree(root, file_count, size_spec, seed=0):
+    """Return the list of (path, size) pairs making up the test tree"""
+    if file_count < 1:
+        raise ValueError(f"File count must be at least 1, got {file_count}")
+    sample_size = parse_size_spec(size_spec)
+    rng = random.Random(seed)
+    files = []
+    for i in range(file_count):
+        directory = os.path.join(root, f"d{i // FILES_PER_DIR:05d}")
+        files.append((os.path.join(directory, f"f{i:08d}.bin"), sample_size(rng)))
+    return files
+
+def _create(path, size, payload, fsync):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        os.write(fd, payload[:size])
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    return size
+
+def _stat(path, size, payload, fsync):
+    os.stat(path)
+    return 0
+
+def _read(path, size, payload, fsync):
+    with open(path, 'rb', buffering=0) as f:
+        return len(f.read())
+
+def _unlink(path, size, payload, fsync):
+    os.unlink(path)
+    return 0
+
+PHASE_OPS = {
+    'create': _create,
+    'stat': _stat,
+    'read': _read,
+    'unlink': _unlink
+}
+
+def _phase_worker(op, files, payload, fsync):
+    """Run one phase over a strided slice of the tree"""
+    latencies = []
+    total_bytes = 0
+    for path, size in files:
+        start = time.perf_counter()
+        total_bytes += op(path, size, payload, fsync)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies, total_bytes
+
+def run_phase(phase, files, concurrency, payload, fsync=False):
+    """Run one metadata phase with a thread pool and return its rates"""
+    op = PHASE_OPS[phase]
+    slices = [files[i::concurrency] for i in range(concurrency)]
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda part: _phase_worker(op, part, payload, fsync), slices))
+    elapsed = time.perf_counter() - start_time
+
+    latencies = sorted(lat for worker_latencies, _ in results for lat in worker_latencies)
+    total_bytes = sum(worker_bytes for _, worker_bytes in results)
+    result = {
+        'files': len(files),
+        'seconds': round(elapsed, 3),
+        'files_per_sec': round(len(files) / elapsed, 1) if elapsed > 0 else 0.0,
+        'latency_us': {
+            'p50': round(percentile(latencies, 0.50), 1) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 1) if latencies else None
+        }
+    }
+    if total_bytes:
+        result['throughput_mbps'] = round(total_bytes / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0.0
+    return result
+
+def drop_caches():
+    """Best effort drop of the page, dentry and inode caches"""
+    try:
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3')
+        return True
+    except OSError:
+        return False
+
+def test_small_files(target_dir=".", file_count=DEFAULT_FILE_COUNT, size_spec=DEFAULT_SIZE_SPEC,
+                     concurrency_levels=CONCURRENCY_LEVELS, fsync=False):
+    """Benchmark small-file metadata throughput at several concurrency levels"""
+    print("STORAGE: Small-File Metadata Throughput Test")
+    print("============================================")
+
+    try:
+        files = plan_tree(os.path.join(target_dir, TREE_DIR), file_count, size_spec)
+    except ValueError as e:
+        print(f"ERROR: Error: {e}")
+        return
+
+    total_bytes = sum(size for _, size in files)
+    max_size = max(size for _, size in files)
+
+    print("STATUS: Checking disk space...")
+    disk_info = get_disk_info(target_dir)
+    if not disk_info:
+        print("ERROR: Error: Could not get disk information")
+        return
+
+    required_bytes = total_bytes + (100 * 1024 * 1024)  # 100MB buffer
+    if disk_info['free_bytes'] < required_bytes:
+        print(f"ERROR: Error: Insufficient disk space")
+        print(f"   Required: {required_bytes / (1024**3):.2f}GB")
+        print(f"   Available: {disk_info['free_gb']:.2f}GB")
+        return
+
+    print(f"SUCCESS: Disk space check passed ({disk_info['free_gb']:.2f}GB available)")
+    print(f"   Tree: {file_count:,} files, {total_bytes / (1024**2):.1f}MB total ({size_spec})")
+
+    payload = os.urandom(max_size)
+    tree_root = os.path.join(target_dir, TREE_DIR)
+    directories = sorted({os.path.dirname(path) for path, _ in files})
+
+    def cleanup():
+        if os.path.exists(tree_root):
+            shutil.rmtree(tree_root, ignore_errors=True)
+
+    levels = []
+    caches_dropped = True
+    try:
+        print(f"\n   {'threads':>7} " + " ".join(f"{phase + '/s':>12}" for phase in PHASES))
+        for concurrency in concurrency_levels:
+            cleanup()
+            for directory in directories:
+                os.makedirs(directory)
+
+            phases = {}
+            for phase in PHASES:
+                # Metadata served from the dentry/inode cache says nothing
+                # about the filesystem, so drop it before the read-side phases
+                if phase in ('stat', 'read'):
+                    os.sync()
+                    caches_dropped = drop_caches() and caches_dropped
+                phases[phase] = run_phase(phase, files, concurrency, payload, fsync)
+
+            levels.append({'concurrency': concurrency, 'phases': phases})
+            print(f"   {concurrency:>7} " + " ".join(f"{phases[phase]['files_per_sec']:>12.0f}" for phase in PHASES))
+    except OSError as e:
+        print(f"ERROR: Error: Small-file test failed: {e}")
+        return
+    finally:
+        cleanup()
+
+    if not caches_dropped:
+        print("\n   Cache drop skipped (no root privileges), stat/read rates may be cache-warm")
+
+    filesystem = None
+    stdout, stderr, returncode = run_command(["df", "-T", target_dir], shell=False)
+    if returncode == 0:
+        lines = stdout.strip().split('\n')
+        if len(lines) >= 2:
+            fs_info = lines[1].split()
+            if len(fs_info) >= 2:
+                filesystem = fs_info[1]
+                print(f"Filesystem: {filesystem}")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'target_dir': os.path.abspath(target_dir),
+        'filesystem': filesystem,
+        'file_count': file_count,
+        'files_per_dir': FILES_PER_DIR,
+        'size_distribution': size_spec,
+        'total_bytes': total_bytes,
+        'fsync_on_create': fsync,
+        'cache_cold': caches_dropped,
+        'levels': levels,
+        'disk_info': disk_info
+    }
+
+    output = results_path('small_file_results.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nSTORAGE: Results saved to: {output}")
+    print("SUCCESS: Small-file metadata test completed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Small-File Metadata Throughput Test")
+    parser.add_argument('--path', default='.', help='Directory to build the test tree in (default: %(default)s)')
+    parser.add_argument('--files', type=int, default=DEFAULT_FILE_COUNT,
+                        help='Number of files in the tree (default: %(default)s)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZE_SPEC,
+                        help='Size distribution: fixed:SIZE, uniform:MIN-MAX or lognormal:MEDIAN,SIGMA '
+                             '(default: %(default)s)')
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')],
+                        default=CONCURRENCY_LEVELS,
+                        help='Comma separated thread counts (default: %(default)s)')
+    parser.add_argument('--fsync', action='store_true', help='fsync every file on create')
+    args = parser.parse_args()
+    test_small_files(args.path, args.files, args.sizes, args.concurrency, args.fsync)
+
+if __name__ == "__main__":
+    main()
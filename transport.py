@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Remote Command Transport - GPU Benchmark v3
+Pluggable ways of running a shell command on a cluster host
+"""
+
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+TIMEOUT = 30
+MAX_PER_HOST = 8
+MAX_WORKERS = 64
+CONTROL_PERSIST = 600
+
+
+def _run(argv, timeout, shell=False):
+    try:
+        process = subprocess.run(argv, shell=shell, capture_output=True, text=True, timeout=timeout)
+        return process.stdout, process.stderr, process.returncode
+    except subprocess.TimeoutExpired:
+        return None, "Timed out", -1
+    except OSError as e:
+        return None, str(e), -1
+
+
+class Transport:
+    """Base class: blocking run(), async submit() and per-host concurrency limits
+
+    Subclasses implement _execute(host, command, timeout).
+    """
+
+    def __init__(self, timeout=TIMEOUT, max_per_host=MAX_PER_HOST, max_workers=MAX_WORKERS):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._executor = None
+
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[host]
+
+    def run(self, host, command, timeout=None):
+        """Run a shell command on host, returns (stdout, stderr, returncode)"""
+        with self._host_slot(host):
+            return self._execute(host, command, timeout or self.timeout)
+
+    def submit(self, host, command, timeout=None):
+        """Run a command asynchronously, returns a Future of run()'s result"""
+        return self.submit_call(self.run, host, command, timeout)
+
+    def submit_call(self, fn, *args):
+        """Run fn(*args) on the transport's pool, for work wrapping blocking run() calls"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor.submit(fn, *args)
+
+    def read_file(self, host, path, timeout=None):
+        """Fetch a remote text file, None if it cannot be read"""
+        stdout, stderr, returncode = self.run(host, f"cat {shlex.quote(path)}", timeout)
+        return stdout if returncode == 0 else None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _execute(self, host, command, timeout):
+        raise NotImplementedError
+
+
+class SSHTransport(Transport):
+    """Runs every command in a fresh ssh session"""
+
+    def __init__(self, ssh_command="ssh -o BatchMode=yes", **options):
+        super().__init__(**options)
+        self.ssh_command = shlex.split(ssh_command)
+
+    def _execute(self, host, command, timeout):
+        return _run(self.ssh_command + [host, command], timeout)
+
+
+class MultiplexedSSHTransport(SSHTransport):
+    """Keeps one long-lived ssh master connection per host
+
+    The first command to a host starts an OpenSSH ControlMaster in the
+    background. Every later command, from any thread, is multiplexed over
+    that connection, so N hosts cost N handshakes instead of one per
+    command. If the master cannot be started, commands fall back to
+    ControlMaster=auto and still reach the host. close() stops all masters.
+    """
+
+    def __init__(self, ssh_command="ssh -o BatchMode=yes", control_persist=CONTROL_PERSIST, **options):
+        super().__init__(ssh_command, **options)
+        self.control_persist = control_persist
+        self.control_dir = tempfile.mkdtemp(prefix='gpubench-ssh-')
+        self._masters = {}
+        self._master_locks = {}
+
+    def _control_options(self):
+        return ['-o', f"ControlPath={os.path.join(self.control_dir, '%C')}"]
+
+    def connect(self, host):
+        """Start the master connection for host once, returns True if it is up"""
+        with self._lock:
+            lock = self._master_locks.setdefault(host, threading.Lock())
+        with lock:
+            if host not in self._masters:
+                stdout, stderr, returncode = _run(
+                    self.ssh_command + self._control_options() +
+                    ['-o', 'ControlMaster=yes', '-o', f'ControlPersist={self.control_persist}',
+                     '-N', '-f', host], self.timeout)
+                self._masters[host] = returncode == 0
+            return self._masters[host]
+
+    def _execute(self, host, command, timeout):
+        options = self._control_options()
+        if not self.connect(host):
+            options += ['-o', 'ControlMaster=auto']
+        return _run(self.ssh_command + options + [host, command], timeout)
+
+    def close(self):
+        super().close()
+        for host, up in self._masters.items():
+            if up:
+                _run(self.ssh_command + self._control_options() + ['-O', 'exit', host], self.timeout)
+        self._masters = {}
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+
+class LocalTransport(Transport):
+    """Runs commands on this machine through a shell, standing in for ssh
+
+    The host name is ignored, which lets the orchestration code be tested
+    on a single box (e.g. with several loopback addresses as hosts).
+    """
+
+    def _execute(self, host, command, timeout):
+        return _run(command, timeout, shell=True)
+
+
+TRANSPORTS = {
+    'ssh': MultiplexedSSHTransport,
+    'ssh-plain': SSHTransport,
+    'local': LocalTransport
+}
+
+
+def create_transport(name='ssh', **options):
+    """Build a transport by name"""
+    return TRANSPORTS[name](**options)